@@ -0,0 +1,271 @@
+import os
+import threading
+import time
+import urllib.parse
+from typing import Dict, Iterable, Optional
+
+import requests
+
+from metrics import THROTTLED_SECONDS
+
+BANDWIDTH_ENV = "NEXUS_MAX_BANDWIDTH"
+REQUESTS_ENV = "NEXUS_MAX_REQUESTS"
+ANY_HOST = "*"
+
+
+def parse_limits(spec: Optional[str], sizes: bool = True) -> Dict[str, float]:
+    """
+    Per-host limits from '50MB', 'nexus.example.com=50MB,*=10MB' or (sizes=False) '20'.
+
+    A value without a host applies to every host ('*'). Sizes take B/KB/MB/GB.
+    """
+    limits: Dict[str, float] = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        host, _, value = part.rpartition("=")
+        value = value.strip().upper()
+        factor = 1
+        if sizes:
+            for suffix, size in (("GB", 1 << 30), ("MB", 1 << 20), ("KB", 1 << 10), ("B", 1)):
+                if value.endswith(suffix):
+                    value, factor = value[:-len(suffix)], size
+                    break
+        rate = float(value) * factor
+        if rate <= 0:
+            raise ValueError(f"Limit must be positive: {part}")
+        limits[host.strip().lower() or ANY_HOST] = rate
+    return limits
+
+
+class TokenBucket:
+    """
+    `rate` tokens per second, holding at most `burst` (so an idle client may
+    burst). acquire() takes the tokens immediately and sleeps off any debt,
+    so amounts larger than the burst still pass, just at the average rate.
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, amount: float) -> float:
+        """Returns the seconds slept"""
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+
+class BandwidthLimiter:
+    """
+    Bytes/s and requests/s budgets per host, shared by every session in the process.
+
+    Hosts without their own limit use the '*' limit, if there is one.
+    Buckets hold `burst_seconds` worth of tokens.
+    """
+
+    def __init__(self, bytes_per_second: Optional[Dict[str, float]] = None,
+                 requests_per_second: Optional[Dict[str, float]] = None, burst_seconds: float = 2.0):
+        self.bytes_per_second = dict(bytes_per_second or {})
+        self.requests_per_second = dict(requests_per_second or {})
+        self.burst_seconds = burst_seconds
+        self.stats: Dict[str, Dict[str, float]] = {}
+        self._buckets: Dict[tuple, Optional[TokenBucket]] = {}
+        self._lock = threading.Lock()
+
+    # ----------------------------
+    # Helper methods
+    # ----------------------------
+
+    def _bucket(self, host: str, budget: str) -> Optional[TokenBucket]:
+        key = (host, budget)
+        with self._lock:
+            if key not in self._buckets:
+                limits = self.bytes_per_second if budget == "bytes" else self.requests_per_second
+                rate = limits.get(host, limits.get(ANY_HOST))
+                # at least one request, or one 64 KiB read, must fit in the bucket
+                burst = max(rate * self.burst_seconds, 1.0 if budget == "requests" else 65536.0) if rate else 0
+                self._buckets[key] = TokenBucket(rate, burst) if rate else None
+            return self._buckets[key]
+
+    def _take(self, host: str, budget: str, amount: float):
+        bucket = self._bucket(host, budget)
+        waited = bucket.acquire(amount) if bucket else 0.0
+        with self._lock:
+            stats = self.stats.setdefault(host, {"requests": 0, "bytes": 0, "throttled_s": 0.0})
+            stats[budget] += amount
+            stats["throttled_s"] += waited
+        if waited:
+            THROTTLED_SECONDS.inc(waited, host=host, budget=budget)
+
+    # ----------------------------
+    # Public functions
+    # ----------------------------
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.bytes_per_second or self.requests_per_second)
+
+    def request(self, host: str):
+        self._take(host.lower(), "requests", 1)
+
+    def transfer(self, host: str, size: int):
+        if size:
+            self._take(host.lower(), "bytes", size)
+
+    def throttled_seconds(self) -> float:
+        with self._lock:
+            return sum(stats["throttled_s"] for stats in self.stats.values())
+
+    def print_stats(self):
+        for host, stats in sorted(self.stats.items()):
+            print(f"🚦 {host}: {int(stats['requests'])} request(s), {stats['bytes'] / (1 << 20):.1f} MB, "
+                  f"throttled {stats['throttled_s']:.1f}s")
+
+
+class ThrottledSession:
+    """
+    requests.Session wrapper that charges every request and every body byte
+    (streamed responses as they are read, uploads as they are sent) to the
+    limiter's budget for the URL's host. Everything else is passed to the
+    wrapped session, so it can be handed to any `session=` parameter.
+    """
+
+    def __init__(self, session=None, limiter: Optional[BandwidthLimiter] = None):
+        self.session = session or requests.Session()
+        self.limiter = limiter or get_limiter()
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+    # ----------------------------
+    # Helper methods
+    # ----------------------------
+
+    def _upload(self, host: str, data):
+        if isinstance(data, (bytes, bytearray, str)):
+            self.limiter.transfer(host, len(data))
+            return data
+        if hasattr(data, "read"):
+            # charged up front, so requests can still send the file with its Content-Length
+            try:
+                self.limiter.transfer(host, os.fstat(data.fileno()).st_size - data.tell())
+            except (AttributeError, OSError, ValueError):
+                pass
+            return data
+        if data is None or isinstance(data, dict):
+            return data  # form fields are small
+
+        def chunks(iterable: Iterable[bytes]):
+            for chunk in iterable:
+                self.limiter.transfer(host, len(chunk))
+                yield chunk
+        return chunks(data)
+
+    def _download(self, host: str, response: requests.Response):
+        iter_content = response.iter_content
+
+        def throttled(chunk_size=1, decode_unicode=False):
+            for chunk in iter_content(chunk_size=chunk_size, decode_unicode=decode_unicode):
+                self.limiter.transfer(host, len(chunk))
+                yield chunk
+        response.iter_content = throttled
+
+    # ----------------------------
+    # Public functions
+    # ----------------------------
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        host = urllib.parse.urlsplit(url).hostname or ""
+        self.limiter.request(host)
+        if "data" in kwargs:
+            kwargs["data"] = self._upload(host, kwargs["data"])
+        response = self.session.request(method, url, **kwargs)
+        if kwargs.get("stream"):
+            self._download(host, response)
+        else:
+            # body already read: charge it afterwards, which still holds the average rate
+            self.limiter.transfer(host, len(response.content or b""))
+        return response
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("allow_redirects", True)
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("allow_redirects", False)
+        return self.request("HEAD", url, **kwargs)
+
+    def put(self, url: str, data=None, **kwargs) -> requests.Response:
+        return self.request("PUT", url, data=data, **kwargs)
+
+    def post(self, url: str, data=None, json=None, **kwargs) -> requests.Response:
+        return self.request("POST", url, data=data, json=json, **kwargs)
+
+    def print_stats(self):
+        self.limiter.print_stats()
+        inner = getattr(self.session, "print_stats", None)
+        if inner:
+            inner()
+
+    def close(self):
+        self.session.close()
+
+
+_limiter: Optional[BandwidthLimiter] = None
+_limiter_lock = threading.Lock()
+_shared_session: Optional[ThrottledSession] = None
+
+
+def _build(bandwidth: Optional[str], requests_per_second: Optional[str], burst_seconds: float) -> BandwidthLimiter:
+    return BandwidthLimiter(parse_limits(bandwidth), parse_limits(requests_per_second, sizes=False), burst_seconds)
+
+
+def configure(bandwidth: Optional[str] = None, requests_per_second: Optional[str] = None,
+              burst_seconds: float = 2.0) -> BandwidthLimiter:
+    """Replace the process-wide limiter (specs as for parse_limits)"""
+    global _limiter
+    with _limiter_lock:
+        _limiter = _build(bandwidth, requests_per_second, burst_seconds)
+        return _limiter
+
+
+def get_limiter() -> BandwidthLimiter:
+    """The process-wide limiter; configured from $NEXUS_MAX_BANDWIDTH / $NEXUS_MAX_REQUESTS on first use"""
+    global _limiter
+    with _limiter_lock:
+        if _limiter is None:
+            _limiter = _build(os.environ.get(BANDWIDTH_ENV), os.environ.get(REQUESTS_ENV), 2.0)
+        return _limiter
+
+
+def limited(session=None):
+    """
+    `session` going through the process-wide limiter.
+
+    Returns the session unchanged (None stays None) when no limit is set or
+    it is already limited. Without a session, every caller gets the same
+    process-wide one, so its connections are reused instead of leaked.
+    """
+    global _shared_session
+    limiter = get_limiter()
+    if not limiter.enabled or getattr(session, "limiter", None) is not None:
+        return session
+    if session is not None:
+        return ThrottledSession(session, limiter)
+    with _limiter_lock:
+        if _shared_session is None or _shared_session.limiter is not limiter:
+            if _shared_session is not None:
+                _shared_session.close()  # configure() replaced the limiter
+            _shared_session = ThrottledSession(requests.Session(), limiter)
+        return _shared_session
@@ -0,0 +1,289 @@
+"""
+End-to-end run of the post-release flow on any machine (no Nexus, Dynatrace, Xcode or fastlane needed).
+
+    python bench_e2e.py --ios 2 --android 4 --max-seconds 60
+
+Starts FakeNexus and FakeDynatrace, puts stub `mdfind`, `xcode-select`,
+`xcodebuild` and `fastlane` executables on PATH, seeds metadata.json, dSYM
+and mapping artifacts plus a Dynatrace agent zip, then runs every release
+through ReleaseFlow/run_batch: metadata download and MetadataParser, the
+artifact download, the symbol client install (download, Xcode selection,
+LLDB link) and the mapping/fastlane uploaders. It checks that Dynatrace
+received exactly the expected uploads and writes timings to bench-e2e.json;
+--max-seconds turns it into a performance regression gate.
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import plistlib
+import shutil
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Dict, List
+
+from bench_nexus import git_revision, parse_size
+from bench_upload import write_mapping_file, write_stub_fastlane
+from dsym_packager import package_dsym
+from fake_dynatrace import FakeDynatrace
+from fake_nexus import FakeNexus
+from release_batch import BatchResults, run_batch
+from release_flow import ReleaseFlow
+from tracing import get_tracer
+from upload_ledger import UploadLedger
+
+REPOSITORY = "maven-releases"
+AGENT_REPOSITORY = "dynatrace-agent"
+GROUP_ID = "com.example.e2e"
+API_TOKEN = "dt0c01.E2E"
+CLIENT_VERSION = "8.287.2.1009"
+XCODES = {"Xcode-15.2.app": "15C500b", "Xcode-15.4.app": "15F31d"}  # bundle -> build
+AGENT_XCODE_BUILD = "15F31d"
+
+
+# ----------------------------
+# Fixtures
+# ----------------------------
+
+def write_stub_tools(work_dir: Path) -> Path:
+    """Fake Xcode installs plus mdfind/xcode-select on a bin dir; returns the bin dir"""
+    bin_dir = work_dir / "bin"
+    bin_dir.mkdir(parents=True, exist_ok=True)
+    apps = work_dir / "Applications"
+    for bundle, build in XCODES.items():
+        developer = apps / bundle / "Contents" / "Developer"
+        xcodebuild = developer / "usr" / "bin" / "xcodebuild"
+        xcodebuild.parent.mkdir(parents=True, exist_ok=True)
+        xcodebuild.write_text(f"#!/bin/sh\necho 'Xcode {bundle[6:-4]}'\necho 'Build version {build}'\n")
+        xcodebuild.chmod(0o755)
+        (apps / bundle / "Contents" / "SharedFrameworks" / "LLDB.framework").mkdir(parents=True, exist_ok=True)
+
+    stubs = {
+        "mdfind": "".join(f"echo '{apps / bundle}'\n" for bundle in XCODES),
+        "xcode-select": f"echo '{apps / next(iter(XCODES)) / 'Contents' / 'Developer'}'\n",
+    }
+    for name, body in stubs.items():
+        path = bin_dir / name
+        path.write_text(f"#!/bin/sh\n{body}")
+        path.chmod(0o755)
+    write_stub_fastlane(bin_dir)
+    return bin_dir
+
+
+def agent_zip() -> bytes:
+    """Minimal dynatrace-mobile-agent-ios zip: the Info.plist the client install reads"""
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as zf:
+        zf.writestr("ios/agent/Dynatrace.framework/Info.plist",
+                    plistlib.dumps({"CFBundleShortVersionString": CLIENT_VERSION,
+                                    "DTPlatformBuild": AGENT_XCODE_BUILD}))
+    return buffer.getvalue()
+
+
+def dsym_zip(work_dir: Path, name: str, size: int) -> bytes:
+    """A .app.dSYM bundle zipped the way builds publish it"""
+    bundle = work_dir / "fixtures" / f"{name}.app.dSYM"
+    dwarf = bundle / "Contents" / "Resources" / "DWARF" / name
+    dwarf.parent.mkdir(parents=True, exist_ok=True)
+    (bundle / "Contents" / "Info.plist").write_bytes(plistlib.dumps({"CFBundleIdentifier": f"{GROUP_ID}.{name}"}))
+    with dwarf.open("wb") as f:
+        written, n = 0, 0
+        while written < size:
+            line = f"_$s{name}{n}ViewController7viewDidLoadyyF DW_TAG_subprogram {n:08x}\n".encode()
+            f.write(line)
+            written += len(line)
+            n += 1
+    output = work_dir / "fixtures" / f"{name}.app.dSYM.zip"
+    package_dsym([str(bundle)], str(output), verbose=False)
+    return output.read_bytes()
+
+
+def metadata_json(artifact_id: str, version: str, platform_name: str, index: int) -> bytes:
+    return json.dumps({
+        "versionCode": str(100 + index),
+        "versionName": version,
+        "packageName": f"{GROUP_ID}.{artifact_id}",
+        "symbolization": {"groupId": GROUP_ID, "artifactId": artifact_id, "versionId": version},
+        "dynatrace": {"applicationId": f"e2e-app-{index}", "as": platform_name.upper()},
+    }, indent=2).encode("utf-8")
+
+
+def seed(nexus: FakeNexus, work_dir: Path, ios: int, android: int, symbol_size: int,
+         mapping_size: int) -> List[Dict]:
+    """Publish fixture releases to FakeNexus; returns the manifest entries"""
+    nexus.add_file(AGENT_REPOSITORY, f"ios/{CLIENT_VERSION}/dynatrace-mobile-agent-ios-{CLIENT_VERSION}.zip",
+                   data=agent_zip())
+    releases = []
+    for index in range(ios + android):
+        platform_name = "ios" if index < ios else "android"
+        artifact_id = f"{platform_name}-app{index}"
+        version = f"1.{index}.0"
+        nexus.add_artifact(REPOSITORY, GROUP_ID, artifact_id, version, f"{artifact_id}-{version}.json",
+                           data=metadata_json(artifact_id, version, platform_name, index))
+        if platform_name == "ios":
+            data = dsym_zip(work_dir, f"App{index}", symbol_size)
+            nexus.add_artifact(REPOSITORY, GROUP_ID, artifact_id, version, f"{artifact_id}-{version}.zip", data=data)
+        else:
+            mapping = work_dir / "fixtures" / f"mapping-{index}.txt"
+            mapping.parent.mkdir(parents=True, exist_ok=True)
+            write_mapping_file(mapping, mapping_size)
+            nexus.add_artifact(REPOSITORY, GROUP_ID, artifact_id, version, f"{artifact_id}-{version}.txt",
+                               data=mapping.read_bytes())
+        releases.append({"group_id": GROUP_ID, "artifact_id": artifact_id, "version_id": version,
+                         "platform": platform_name, "client_version": CLIENT_VERSION})
+    return releases
+
+
+@contextlib.contextmanager
+def simulated_environment(work_dir: Path, bin_dir: Path, agent_url: str):
+    """cwd, PATH and the agent download URL pointed at the fixtures; restored afterwards"""
+    saved_cwd, saved_env = os.getcwd(), dict(os.environ)
+    os.chdir(work_dir)
+    os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}"
+    os.environ["DYNATRACE_AGENT_DOWNLOAD_URL"] = agent_url
+    try:
+        yield
+    finally:
+        os.chdir(saved_cwd)
+        os.environ.clear()
+        os.environ.update(saved_env)
+
+
+# ----------------------------
+# Run
+# ----------------------------
+
+def run_pass(name: str, nexus: FakeNexus, dynatrace: FakeDynatrace, work_dir: Path, releases: List[Dict],
+             max_parallel: int, quiet: bool) -> Dict:
+    dynatrace.reset()
+    ledger = UploadLedger(str(work_dir / ".upload-ledger.json"))
+    flow = ReleaseFlow(nexus.url, "dev", API_TOKEN, repository=REPOSITORY, client_version=CLIENT_VERSION,
+                       work_dir=str(work_dir / "downloads"), ledger=ledger,
+                       stage_cache=str(work_dir / ".stage-cache.json"), dynatrace_url=dynatrace.url)
+    tracer = get_tracer()
+    first_span = len(tracer.spans)
+
+    output = io.StringIO()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(output) if quiet else contextlib.nullcontext():
+        report = run_batch(flow, releases, BatchResults(str(work_dir / f"results-{name}.json")),
+                           max_parallel=max_parallel)
+    wall = time.perf_counter() - started
+
+    stage_seconds: Dict[str, List[float]] = {}
+    for event in tracer.spans[first_span:]:
+        stage_seconds.setdefault(event["name"], []).append(event["dur"] / 1e6)
+    failed = [r for r in report if r["status"] != "ok"]
+    return {
+        "pass": name,
+        "releases": len(releases),
+        "failed": len(failed),
+        "errors": [f"{r['artifact_id']}: {r['error']}" for r in failed],
+        "wall_seconds": round(wall, 3),
+        "releases_per_minute": round(len(releases) / wall * 60, 1) if wall else None,
+        "uploads": len(dynatrace.uploads),
+        "upload_bytes": dynatrace.counts["bytes"],
+        "token_lookups": dynatrace.counts["lookups"],
+        "symbol_lists": dynatrace.counts["lists"],
+        "nexus_requests": dict(nexus.request_counts),
+        "spans": {name: {"count": len(values), "total_s": round(sum(values), 3), "max_s": round(max(values), 3)}
+                  for name, values in sorted(stage_seconds.items())},
+        "log_tail": output.getvalue()[-2000:] if failed else "",
+    }
+
+
+def check(result: Dict, expected_uploads: int) -> List[str]:
+    problems = [f"{result['pass']}: {error}" for error in result["errors"]]
+    if result["uploads"] != expected_uploads:
+        problems.append(f"{result['pass']}: Dynatrace received {result['uploads']} upload(s), "
+                        f"expected {expected_uploads}")
+    return problems
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run the whole post-release flow against local stand-ins")
+    parser.add_argument("--ios", type=int, default=2, help="iOS releases to simulate")
+    parser.add_argument("--android", type=int, default=2, help="Android releases to simulate")
+    parser.add_argument("--symbol-size", default="4MB", help="Size of each dSYM's DWARF file")
+    parser.add_argument("--mapping-size", default="2MB", help="Size of each mapping file")
+    parser.add_argument("--max-parallel", type=int, default=4, help="Releases processed at the same time")
+    parser.add_argument("--latency", type=float, default=0.01, help="Stub Nexus/Dynatrace latency per request")
+    parser.add_argument("--warm", action="store_true",
+                        help="Run a second pass with the caches, ledger and client install from the first")
+    parser.add_argument("--max-seconds", type=float, help="Fail if the cold pass takes longer than this")
+    parser.add_argument("--keep-work-dir", action="store_true", help="Leave fixtures and downloads for inspection")
+    parser.add_argument("--verbose", action="store_true", help="Show the flow's own output")
+    parser.add_argument("--output", default="bench-e2e.json", help="Results JSON path")
+    args = parser.parse_args(argv)
+
+    output_path = os.path.abspath(args.output)
+    work_dir = Path(tempfile.mkdtemp(prefix="bench-e2e-"))
+    results, problems = [], []
+    try:
+        bin_dir = write_stub_tools(work_dir)
+        with FakeNexus(latency=args.latency) as nexus, \
+                FakeDynatrace(latency=args.latency, api_token=API_TOKEN) as dynatrace:
+            releases = seed(nexus, work_dir, args.ios, args.android, parse_size(args.symbol_size),
+                            parse_size(args.mapping_size))
+            with simulated_environment(work_dir, bin_dir, f"{nexus.url}/repository/{AGENT_REPOSITORY}"):
+                passes = [("cold", len(releases))]
+                if args.warm:
+                    passes.append(("warm", 0))  # mappings are skipped by the ledger, symbols by the Dynatrace pre-check
+                for name, expected in passes:
+                    nexus.request_counts.clear()
+                    result = run_pass(name, nexus, dynatrace, work_dir, releases, args.max_parallel,
+                                      quiet=not args.verbose)
+                    results.append(result)
+                    problems += check(result, expected)
+                    print(f"{name:<5} {result['releases']} release(s) in {result['wall_seconds']:.2f}s "
+                          f"({result['releases_per_minute']} /min)  uploads={result['uploads']}  "
+                          f"failed={result['failed']}  token lookups={result['token_lookups']}  "
+                          f"listings={result['symbol_lists']}")
+                    for span_name, stats in result["spans"].items():
+                        print(f"    {span_name:<32} x{stats['count']:<3} total {stats['total_s']:7.3f}s  "
+                              f"max {stats['max_s']:6.3f}s")
+                    if result["log_tail"]:
+                        print(result["log_tail"])
+    finally:
+        if args.keep_work_dir:
+            print(f"📁 Work dir kept: {work_dir}")
+        else:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    cold = results[0] if results else None
+    if cold and args.max_seconds and cold["wall_seconds"] > args.max_seconds:
+        problems.append(f"cold pass took {cold['wall_seconds']:.2f}s, limit {args.max_seconds:.2f}s")
+
+    report = {
+        "meta": {
+            "benchmark": "end-to-end",
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "ios": args.ios,
+            "android": args.android,
+            "symbol_size": args.symbol_size,
+            "mapping_size": args.mapping_size,
+            "max_parallel": args.max_parallel,
+            "latency_s": args.latency,
+        },
+        "results": results,
+        "problems": problems,
+    }
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"📝 Results written to {output_path}")
+
+    for problem in problems:
+        print(f"❌ {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,230 @@
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+from fake_nexus import FakeNexus
+from script_loader import load_script
+
+REPOSITORY = "maven-releases"
+GROUP_ID = "com.example.bench"
+ARTIFACT_ID = "bench-app"
+
+
+def parse_size(text: str) -> int:
+    """'64KB', '16MB', '1GB' or plain bytes"""
+    text = text.strip().upper()
+    for suffix, factor in (("GB", 1 << 30), ("MB", 1 << 20), ("KB", 1 << 10), ("B", 1)):
+        if text.endswith(suffix):
+            return int(float(text[:-len(suffix)]) * factor)
+    return int(text)
+
+
+def current_rss_kb() -> int:
+    """Resident set size of this process right now (falls back to the peak where /proc is missing)"""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, IndexError):
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak // 1024 if sys.platform == "darwin" else peak
+
+
+class RssSampler:
+    """Track peak RSS during one benchmark case"""
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.baseline_kb = 0
+        self.peak_kb = 0
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.peak_kb = max(self.peak_kb, current_rss_kb())
+            self._stop.wait(self.interval)
+
+    def __enter__(self):
+        self.baseline_kb = self.peak_kb = current_rss_kb()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        self.peak_kb = max(self.peak_kb, current_rss_kb())
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    # nearest-rank
+    index = min(len(ordered) - 1, max(0, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True, cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run_case(fetch, function: str, nexus: FakeNexus, version: str, size: int, chunk_size: int,
+             concurrency: int, requests_per_worker: int) -> Dict:
+    """Download one artifact `concurrency * requests_per_worker` times and collect stats"""
+    latencies: List[float] = []
+    lock = threading.Lock()
+    out_root = tempfile.mkdtemp(prefix="bench-nexus-")
+
+    def worker(index: int):
+        out_dir = os.path.join(out_root, str(index))
+        for _ in range(requests_per_worker):
+            start = time.perf_counter()
+            if function == "download_from_nexus3":
+                result = fetch.download_from_nexus3(nexus.url, REPOSITORY, GROUP_ID, ARTIFACT_ID, version,
+                                                    packaging="zip", download_path=out_dir,
+                                                    chunk_size=chunk_size)
+            else:
+                result = fetch.download_from_nexus(nexus.url, REPOSITORY, GROUP_ID, ARTIFACT_ID, version,
+                                                   packaging="zip", output_dir=out_dir,
+                                                   chunk_size=chunk_size)
+            elapsed = time.perf_counter() - start
+            if not result:
+                raise RuntimeError(f"{function} failed for {version}")
+            with lock:
+                latencies.append(elapsed)
+
+    # The fetch functions print per download; silence them for the whole case
+    # (redirect_stdout swaps a process-wide object, so not per worker thread)
+    try:
+        with RssSampler() as rss, contextlib.redirect_stdout(io.StringIO()):
+            wall_start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                for future in [executor.submit(worker, i) for i in range(concurrency)]:
+                    future.result()
+            wall = time.perf_counter() - wall_start
+    finally:
+        shutil.rmtree(out_root, ignore_errors=True)
+
+    total_bytes = size * len(latencies)
+    return {
+        "function": function,
+        "size_bytes": size,
+        "chunk_size": chunk_size,
+        "concurrency": concurrency,
+        "downloads": len(latencies),
+        "wall_seconds": round(wall, 4),
+        "throughput_mb_s": round(total_bytes / wall / (1 << 20), 2) if wall else 0.0,
+        "latency_p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "latency_p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "peak_rss_kb": rss.peak_kb,
+        "rss_growth_kb": rss.peak_kb - rss.baseline_kb,
+    }
+
+
+def case_key(result: Dict) -> tuple:
+    return (result["function"], result["size_bytes"], result["chunk_size"], result["concurrency"])
+
+
+def compare(results: List[Dict], baseline_path: str, threshold: float) -> List[str]:
+    """Return a line per case whose throughput or p99 got worse than the baseline by more than threshold %"""
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {case_key(r): r for r in json.load(f)["results"]}
+
+    regressions = []
+    for result in results:
+        old = baseline.get(case_key(result))
+        if not old:
+            continue
+        if old["throughput_mb_s"] and result["throughput_mb_s"] < old["throughput_mb_s"] * (1 - threshold / 100):
+            regressions.append(f"{case_key(result)} throughput {old['throughput_mb_s']} -> {result['throughput_mb_s']} MB/s")
+        if old["latency_p99_ms"] and result["latency_p99_ms"] > old["latency_p99_ms"] * (1 + threshold / 100):
+            regressions.append(f"{case_key(result)} p99 {old['latency_p99_ms']} -> {result['latency_p99_ms']} ms")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the Nexus fetch path against a local stand-in server")
+    parser.add_argument("--sizes", default="64KB,4MB,32MB", help="Comma-separated artifact sizes")
+    parser.add_argument("--chunk-sizes", default="8192,65536,1048576", help="Comma-separated download chunk sizes")
+    parser.add_argument("--concurrency", default="1,4", help="Comma-separated parallel download counts")
+    parser.add_argument("--requests", type=int, default=3, help="Downloads per worker per case")
+    parser.add_argument("--functions", default="download_from_nexus,download_from_nexus3")
+    parser.add_argument("--latency", type=float, default=0.005, help="Server latency per response in seconds")
+    parser.add_argument("--bandwidth", default="0", help="Per-connection bandwidth cap, e.g. 50MB (0 = unlimited)")
+    parser.add_argument("--output", default="bench-nexus.json", help="Results JSON path")
+    parser.add_argument("--compare", help="Baseline results JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent")
+    args = parser.parse_args(argv)
+
+    fetch = load_script("fetch-artifact.py")
+    sizes = [parse_size(s) for s in args.sizes.split(",")]
+    chunk_sizes = [parse_size(s) for s in args.chunk_sizes.split(",")]
+    concurrency_levels = [int(c) for c in args.concurrency.split(",")]
+    functions = [f.strip() for f in args.functions.split(",")]
+    bandwidth = parse_size(args.bandwidth) or None
+
+    results = []
+    with FakeNexus(latency=args.latency, bandwidth=bandwidth) as nexus:
+        for size in sizes:
+            version = f"1.0.{size}"
+            nexus.add_artifact(REPOSITORY, GROUP_ID, ARTIFACT_ID, version, f"{ARTIFACT_ID}-{version}.zip", size=size)
+
+        for function in functions:
+            for size in sizes:
+                for chunk_size in chunk_sizes:
+                    for concurrency in concurrency_levels:
+                        result = run_case(fetch, function, nexus, f"1.0.{size}", size, chunk_size,
+                                          concurrency, args.requests)
+                        results.append(result)
+                        print(f"{function:<22} size={size:>10} chunk={chunk_size:>8} conc={concurrency:>2}  "
+                              f"{result['throughput_mb_s']:8.2f} MB/s  p50={result['latency_p50_ms']:8.2f}ms  "
+                              f"p99={result['latency_p99_ms']:8.2f}ms  rss+={result['rss_growth_kb']}KB")
+
+    report = {
+        "meta": {
+            "benchmark": "nexus-download",
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "latency_s": args.latency,
+            "bandwidth_bytes_s": bandwidth,
+            "requests_per_worker": args.requests,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"📝 Results written to {args.output}")
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        for line in regressions:
+            print(f"❌ Regression: {line}")
+        if regressions:
+            return 1
+        print(f"✅ No regressions beyond {args.threshold}% against {args.compare}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
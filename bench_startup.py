@@ -0,0 +1,122 @@
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from typing import Dict, List
+
+from bench_nexus import git_revision
+from script_loader import REPO_DIR
+
+# Modules each post_release subcommand loads when it runs
+SUBCOMMAND_MODULES = {
+    "fetch": ["fetch-artifact.py"],
+    "parse": ["parse-json.py"],
+    "install-client": ["gaixie.py"],
+    "select-xcode": ["gaixie.py"],
+    "package-dsym": ["dsym_packager.py"],
+    "thin-dsym": ["macho_thin.py"],
+    "upload": ["mapping_uploader.py", "py-fastlane.py"],
+    "promote": ["nexus_ops.py"],
+    "cleanup": ["nexus_ops.py"],
+    "reconcile": ["reconcile.py", "nexus_ops.py"],
+    "queue": ["job_queue.py", "release_flow.py"],
+}
+
+
+def case_code(modules: List[str]) -> str:
+    """Python source that starts the CLI (parser built) and loads the given modules"""
+    loads = "".join(f"load_script({name!r}); " for name in modules)
+    return ("import post_release; post_release.build_parser(); "
+            f"from script_loader import load_script; {loads}")
+
+
+def parse_importtime(stderr: str) -> Dict:
+    """
+    Sum -X importtime output.
+
+    Lines look like 'import time:   self [us] | cumulative | imported package';
+    top-level entries (no indentation before the package name) add up to the total.
+    """
+    total_us, modules = 0, 0
+    slowest = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, package = line[len("import time:"):].split("|", 2)
+        modules += 1
+        # the package column is " name" at top level and indented by two spaces per nesting level
+        if not package.startswith("  "):
+            total_us += int(cumulative)
+            slowest.append((int(cumulative), package.strip()))
+    slowest.sort(reverse=True)
+    return {"import_ms": total_us / 1000.0, "modules": modules,
+            "slowest": [{"module": name, "ms": us / 1000.0} for us, name in slowest[:5]]}
+
+
+def measure(code: str, runs: int) -> Dict:
+    walls, imports = [], []
+    for _ in range(runs):
+        start = time.perf_counter()
+        proc = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=str(REPO_DIR),
+                              capture_output=True, text=True)
+        walls.append((time.perf_counter() - start) * 1000)
+        if proc.returncode != 0:
+            raise RuntimeError(f"Startup case failed:\n{proc.stderr[-2000:]}")
+        imports.append(parse_importtime(proc.stderr))
+    best = min(imports, key=lambda r: r["import_ms"])
+    return {
+        "wall_ms_median": round(statistics.median(walls), 2),
+        "wall_ms_min": round(min(walls), 2),
+        "import_ms_median": round(statistics.median(r["import_ms"] for r in imports), 2),
+        "import_ms_min": round(best["import_ms"], 2),
+        "modules": best["modules"],
+        "slowest_imports": best["slowest"],
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Compare post_release startup: lazy subcommands vs eager imports")
+    parser.add_argument("--runs", type=int, default=10, help="Interpreter starts per case")
+    parser.add_argument("--output", default="bench-startup.json", help="Results JSON path")
+    args = parser.parse_args(argv)
+
+    every_module = sorted({name for names in SUBCOMMAND_MODULES.values() for name in names})
+    cases = [("interpreter", "pass"), ("cli_only", case_code([])), ("eager_all", case_code(every_module))]
+    cases += [(f"lazy_{command}", case_code(names)) for command, names in SUBCOMMAND_MODULES.items()]
+
+    results = []
+    eager = None
+    for name, code in cases:
+        result = dict(case=name, **measure(code, args.runs))
+        results.append(result)
+        if name == "eager_all":
+            eager = result
+        saving = ""
+        if eager and name.startswith("lazy_"):
+            # min is the least noisy estimate of fixed import cost
+            saving = f"  saves {eager['import_ms_min'] - result['import_ms_min']:7.1f} ms of imports"
+        print(f"{name:<22} wall={result['wall_ms_median']:8.1f} ms  imports(min)={result['import_ms_min']:8.1f} ms  "
+              f"modules={result['modules']:>4}{saving}")
+
+    report = {
+        "meta": {
+            "benchmark": "cli-startup",
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "runs": args.runs,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"📝 Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+from bench_nexus import RssSampler, git_revision, parse_size, percentile
+from concurrency import AdaptiveLimiter
+from fake_dynatrace import FakeDynatrace
+from mapping_uploader import MappingUploader
+from script_loader import load_script
+
+APP_ID = "bench-app-id"
+PACKAGE_NAME = "com.example.bench"
+API_TOKEN = "dt0c01.BENCH"
+
+# Stand-in for `fastlane`: PUTs the symbol file to the stub API the way DTXDssClient would.
+# Handles both `fastlane run dynatrace_process_symbols k:v ...` and the generated batch lane.
+STUB_FASTLANE = '''
+import json, sys, time, urllib.error, urllib.request
+
+def upload(p):
+    url = "%s/api/config/v1/symfiles/%s/%s/%s/%s/%s" % (p["server"], p["appId"], p["bundleName"], p["os"], p["version"], p["versionStr"])
+    with open(p["symbolIsFile"], "rb") as f:
+        req = urllib.request.Request(url, data=f.read(), method="PUT", headers={"Authorization": "Api-Token " + p["apitoken"]})
+    try:
+        urllib.request.urlopen(req).read()
+    except urllib.error.HTTPError as e:
+        retry = e.headers.get("Retry-After")
+        raise RuntimeError("HTTP %d %s%s" % (e.code, e.reason, " Retry-After: " + retry if retry else ""))
+
+args = sys.argv[1:]
+if args[0] == "run":
+    try:
+        upload(dict(a.split(":", 1) for a in args[2:]))
+    except RuntimeError as e:
+        print(e)
+        sys.exit(1)
+else:
+    opts = dict(a.split(":", 1) for a in args[1:])
+    results = []
+    for job in json.load(open(opts["jobs_file"])):
+        started = time.time()
+        try:
+            upload(job["params"])
+            results.append({"id": job["id"], "status": "ok", "seconds": time.time() - started})
+        except RuntimeError as e:
+            results.append({"id": job["id"], "status": "failed", "error": str(e), "seconds": time.time() - started})
+        json.dump(results, open(opts["results_file"], "w"))
+'''
+
+
+def write_stub_fastlane(directory: Path) -> str:
+    path = directory / "fastlane"
+    path.write_text(f"#!{sys.executable}\n{STUB_FASTLANE}", encoding="utf-8")
+    path.chmod(0o755)
+    return str(path)
+
+
+def write_mapping_file(path: Path, size: int):
+    """Write a syntactically valid R8 mapping file of roughly `size` bytes"""
+    with path.open("w", encoding="utf-8") as f:
+        written, n = 0, 0
+        while written < size:
+            block = (
+                f"com.example.bench.Class{n} -> a.a{n}:\n"
+                f"    int field{n} -> a\n"
+                f"    1:10:void method{n}(int,java.lang.String):20:29 -> b\n"
+                f"    11:11:boolean equals(java.lang.Object):0:0 -> equals\n"
+            )
+            f.write(block)
+            written += len(block)
+            n += 1
+
+
+def write_symbol_file(path: Path, size: int):
+    with path.open("wb") as f:
+        remaining = size
+        while remaining > 0:
+            chunk = os.urandom(min(remaining, 1 << 20))
+            f.write(chunk)
+            remaining -= len(chunk)
+
+
+def run_case(kind: str, dynatrace: FakeDynatrace, files: List[Path], concurrency: int,
+             fastlane_path: str, fastlane_mod) -> Dict:
+    dynatrace.reset()
+    limiter = AdaptiveLimiter(initial=concurrency, max_limit=concurrency, base_backoff=0.05, max_backoff=1.0)
+    latencies: List[float] = []
+    child_rss: List[int] = []
+    lock = threading.Lock()
+    failures = 0
+
+    def upload_one(index: int, path: Path):
+        nonlocal failures
+        start = time.perf_counter()
+        try:
+            if kind == "mapping":
+                uploader = MappingUploader("dev", API_TOKEN, base_url=dynatrace.url, limiter=limiter,
+                                           max_attempts=20, verbose=False)
+                uploader.upload(str(path), APP_ID, PACKAGE_NAME, str(index), "1.0.0")
+            else:
+                uploader = fastlane_mod.DynatraceFastlaneUploader(fastlane_path=fastlane_path, limiter=limiter,
+                                                                  max_attempts=20)
+                result = uploader.process_symbols(APP_ID, API_TOKEN, "./DTXDssClient", str(path), PACKAGE_NAME,
+                                                  "1.0.0", str(index), server_url=dynatrace.url, debug_mode=False)
+                with lock:
+                    child_rss.append(result.peak_rss_kb)
+        except Exception:
+            with lock:
+                failures += 1
+            return
+        with lock:
+            latencies.append(time.perf_counter() - start)
+
+    with RssSampler() as rss, contextlib.redirect_stdout(io.StringIO()):
+        wall_start = time.perf_counter()
+        if kind == "fastlane_batch":
+            uploader = fastlane_mod.DynatraceFastlaneUploader(fastlane_path=fastlane_path, limiter=limiter,
+                                                              max_attempts=20)
+            jobs = [fastlane_mod.SymbolJob(APP_ID, API_TOKEN, "./DTXDssClient", str(path), PACKAGE_NAME, "1.0.0",
+                                           str(i), server_url=dynatrace.url) for i, path in enumerate(files)]
+            report = uploader.process_symbols_batch(jobs, dedupe=False, precheck=False)
+            failures = sum(1 for r in report if r["status"] != "ok")
+            latencies = [r["seconds"] for r in report if r["status"] == "ok"]
+        else:
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                for future in [executor.submit(upload_one, i, p) for i, p in enumerate(files)]:
+                    future.result()
+        wall = time.perf_counter() - wall_start
+
+    uploaded = len(latencies)
+    total_bytes = sum(p.stat().st_size for p in files)
+    throttled = dynatrace.counts["throttled"]
+    return {
+        "kind": kind,
+        "file_bytes": files[0].stat().st_size if files else 0,
+        "files": len(files),
+        "concurrency": 1 if kind == "fastlane_batch" else concurrency,
+        "uploaded": uploaded,
+        "failed": failures,
+        "wall_seconds": round(wall, 4),
+        "files_per_minute": round(uploaded / wall * 60, 2) if wall else 0.0,
+        "bytes_per_second": round(total_bytes / wall) if wall else 0,
+        "latency_p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "latency_p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "requests": dynatrace.counts["requests"],
+        "throttled_429": throttled,
+        "retry_overhead": round(throttled / uploaded, 3) if uploaded else 0.0,
+        "final_limit": limiter.limit,
+        "rss_growth_kb": rss.peak_kb - rss.baseline_kb,
+        "rss_per_concurrent_upload_kb": (rss.peak_kb - rss.baseline_kb) // max(1, concurrency),
+        "child_peak_rss_kb": max(child_rss) if child_rss else None,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the upload path against a stub Dynatrace symbol API")
+    parser.add_argument("--kinds", default="mapping,fastlane,fastlane_batch",
+                        help="mapping (MappingUploader), fastlane (process_symbols), fastlane_batch")
+    parser.add_argument("--sizes", default="256KB,8MB", help="Comma-separated file sizes")
+    parser.add_argument("--files", type=int, default=8, help="Files uploaded per case")
+    parser.add_argument("--concurrency", default="1,4", help="Comma-separated concurrent upload counts")
+    parser.add_argument("--latency", type=float, default=0.01, help="Stub API latency per request in seconds")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Fraction of requests answered with 429")
+    parser.add_argument("--retry-after", type=float, default=0.05, help="Retry-After sent with injected 429s")
+    parser.add_argument("--max-body", help="Reject bodies above this size with 413, e.g. 100MB")
+    parser.add_argument("--output", default="bench-upload.json", help="Results JSON path")
+    args = parser.parse_args(argv)
+
+    fastlane_mod = load_script("py-fastlane.py")
+    kinds = [k.strip() for k in args.kinds.split(",")]
+    sizes = [parse_size(s) for s in args.sizes.split(",")]
+    concurrency_levels = [int(c) for c in args.concurrency.split(",")]
+
+    results = []
+    work_dir = Path(tempfile.mkdtemp(prefix="bench-upload-"))
+    try:
+        fastlane_path = write_stub_fastlane(work_dir)
+        with FakeDynatrace(latency=args.latency, throttle_rate=args.throttle_rate, retry_after=args.retry_after,
+                           max_body_bytes=parse_size(args.max_body) if args.max_body else None) as dynatrace:
+            for size in sizes:
+                mapping_files, symbol_files = [], []
+                for i in range(args.files):
+                    mapping = work_dir / f"mapping-{size}-{i}.txt"
+                    write_mapping_file(mapping, size)
+                    mapping_files.append(mapping)
+                    symbol = work_dir / f"Bench{i}-{size}.app.dSYM.zip"
+                    write_symbol_file(symbol, size)
+                    symbol_files.append(symbol)
+
+                for kind in kinds:
+                    files = mapping_files if kind == "mapping" else symbol_files
+                    levels = [1] if kind == "fastlane_batch" else concurrency_levels
+                    for concurrency in levels:
+                        result = run_case(kind, dynatrace, files, concurrency, fastlane_path, fastlane_mod)
+                        results.append(result)
+                        print(f"{kind:<15} size={size:>9} conc={result['concurrency']:>2}  "
+                              f"{result['files_per_minute']:9.1f} files/min  "
+                              f"{result['bytes_per_second'] / (1 << 20):8.2f} MB/s  "
+                              f"429s={result['throttled_429']:<3} failed={result['failed']}")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    report = {
+        "meta": {
+            "benchmark": "dynatrace-upload",
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+            "latency_s": args.latency,
+            "throttle_rate": args.throttle_rate,
+            "retry_after_s": args.retry_after,
+            "max_body": args.max_body,
+        },
+        "results": results,
+    }
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"📝 Results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
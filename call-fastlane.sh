@@ -12,4 +12,21 @@ uploader.process_symbols(
     version="100",
     server_url="https://yourtenant.live.dynatrace.com/e/abc123",
     debug_mode=True
-)
\ No newline at end of file
+)
+# 批量模式：一次 fastlane 启动处理多个 dSYM
+from dynatrace_fastlane import SymbolJob
+
+jobs = [
+    SymbolJob(
+        app_id="eab451f3-5208-4c52-b06a-df09f86c2cb3",
+        api_token="dt0c01.ABCDEF1234567890",
+        dtx_client_path="./DTXDssClient",
+        symbol_file=symbol_file,
+        bundle_name="com.mycompany.myapp",
+        version_str="1.0.0",
+        version="100",
+        server_url="https://yourtenant.live.dynatrace.com/e/abc123"
+    )
+    for symbol_file in ["./MyApp.app.dSYM.zip", "./MyWidget.appex.dSYM.zip"]
+]
+results = uploader.process_symbols_batch(jobs)
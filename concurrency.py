@@ -0,0 +1,234 @@
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from typing import Callable, Dict, Optional, Tuple, TypeVar
+
+from metrics import RETRIES, UPLOAD_LIMIT, UPLOADS_IN_FLIGHT, UPLOADS_QUEUED
+
+T = TypeVar("T")
+
+_THROTTLE_PATTERN = re.compile(r"\b429\b|Too Many Requests", re.IGNORECASE)
+_RETRY_AFTER_PATTERN = re.compile(r"Retry-After\s*[:=]\s*\"?([^\"\r\n]+)", re.IGNORECASE)
+
+
+class ThrottledError(Exception):
+    """Raised by an upload when Dynatrace answers 429 Too Many Requests"""
+
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """Parse a Retry-After header (delta-seconds or HTTP-date) into seconds"""
+    if not value:
+        return None
+    value = value.strip()
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def detect_throttle(output: str) -> Tuple[bool, Optional[float]]:
+    """
+    Look for a 429 in tool output (fastlane / DTXDssClient / shell script).
+
+    Returns:
+        (throttled, retry_after seconds or None)
+    """
+    if not output or not _THROTTLE_PATTERN.search(output):
+        return False, None
+    match = _RETRY_AFTER_PATTERN.search(output)
+    return True, parse_retry_after(match.group(1)) if match else None
+
+
+class AdaptiveLimiter:
+    """
+    AIMD concurrency limiter for Dynatrace uploads.
+
+    Healthy responses grow the limit additively (about +1 per window of
+    `limit` successes); a 429 halves it and pauses new uploads until the
+    Retry-After delay (or a jittered exponential backoff) has passed.
+    Like TCP with losses in flight, 429s for uploads that started before the
+    last decrease belong to the same congestion event and do not halve again.
+
+    Limit, in-flight and queued uploads are exported as gauges labelled `name`.
+    """
+
+    def __init__(self, initial: int = 4, min_limit: int = 1, max_limit: int = 16,
+                 decrease_factor: float = 0.5, base_backoff: float = 1.0, max_backoff: float = 60.0,
+                 name: str = "dynatrace"):
+        self.name = name
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease_factor = decrease_factor
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+        self._limit = float(max(min_limit, min(initial, max_limit)))
+        self._in_flight = 0
+        self._waiting = 0
+        self._blocked_until = 0.0
+        self._consecutive_throttles = 0
+        self._throttle_count = 0
+        self._last_decrease = float("-inf")
+        self._cond = threading.Condition()
+        self._publish()
+
+    def _publish(self):
+        """Update the gauges (called with the condition held, or from __init__)"""
+        UPLOAD_LIMIT.set(int(self._limit), limiter=self.name)
+        UPLOADS_IN_FLIGHT.set(self._in_flight, limiter=self.name)
+        UPLOADS_QUEUED.set(self._waiting, limiter=self.name)
+
+    # ----------------------------
+    # Slot management
+    # ----------------------------
+
+    def acquire(self) -> float:
+        """Wait for a slot; returns the time.monotonic() it was granted at (pass to on_throttle)"""
+        with self._cond:
+            self._waiting += 1
+            self._publish()
+            try:
+                while True:
+                    pause = self._blocked_until - time.monotonic()
+                    if pause > 0:
+                        self._cond.wait(pause)
+                        continue
+                    if self._in_flight < int(self._limit):
+                        self._in_flight += 1
+                        return time.monotonic()
+                    self._cond.wait()
+            finally:
+                self._waiting -= 1
+                self._publish()
+
+    def release(self):
+        with self._cond:
+            self._in_flight -= 1
+            self._publish()
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self):
+        """Hold a slot; yields the time it was granted"""
+        started = self.acquire()
+        try:
+            yield started
+        finally:
+            self.release()
+
+    # ----------------------------
+    # Feedback
+    # ----------------------------
+
+    def on_success(self):
+        """Additive increase after a healthy response"""
+        with self._cond:
+            self._consecutive_throttles = 0
+            self._limit = min(float(self.max_limit), self._limit + 1.0 / max(self._limit, 1.0))
+            self._publish()
+            self._cond.notify_all()
+
+    def on_throttle(self, retry_after: Optional[float] = None, started: Optional[float] = None) -> float:
+        """
+        Multiplicative decrease after a 429, at most once per congestion event.
+
+        Args:
+            retry_after: Retry-After from the response, in seconds
+            started: When the throttled upload got its slot (from acquire/slot); a 429 for an
+                     upload started before the last decrease does not decrease the limit again
+
+        Returns:
+            float: seconds new uploads are held back
+        """
+        with self._cond:
+            self._throttle_count += 1
+            if started is None or started >= self._last_decrease:
+                self._consecutive_throttles += 1
+                self._limit = max(float(self.min_limit), self._limit * self.decrease_factor)
+                self._last_decrease = time.monotonic()
+                self._publish()
+
+            if retry_after is not None:
+                # Spread retries a little so waiting uploads do not all fire at once
+                delay = retry_after + random.uniform(0, min(1.0, retry_after * 0.1 + 0.1))
+            else:
+                cap = min(self.max_backoff, self.base_backoff * 2 ** (self._consecutive_throttles - 1))
+                delay = random.uniform(cap / 2, cap)
+
+            self._blocked_until = max(self._blocked_until, time.monotonic() + delay)
+            self._cond.notify_all()
+            return delay
+
+    # ----------------------------
+    # Metrics
+    # ----------------------------
+
+    @property
+    def limit(self) -> int:
+        return int(self._limit)
+
+    @property
+    def queue_depth(self) -> int:
+        return self._waiting
+
+    def metrics(self) -> Dict[str, float]:
+        with self._cond:
+            return {
+                "limit": int(self._limit),
+                "in_flight": self._in_flight,
+                "queue_depth": self._waiting,
+                "throttled_total": self._throttle_count,
+                "paused_seconds": max(0.0, self._blocked_until - time.monotonic()),
+            }
+
+
+_default_limiter: Optional[AdaptiveLimiter] = None
+_default_lock = threading.Lock()
+
+
+def get_limiter() -> AdaptiveLimiter:
+    """Process-wide limiter shared by all Dynatrace uploads"""
+    global _default_limiter
+    with _default_lock:
+        if _default_limiter is None:
+            _default_limiter = AdaptiveLimiter()
+        return _default_limiter
+
+
+def run_throttled(func: Callable[[], T], limiter: Optional[AdaptiveLimiter] = None, max_attempts: int = 5) -> T:
+    """
+    Run an upload under the limiter, retrying when it raises ThrottledError.
+
+    Args:
+        func: Callable performing one upload attempt
+        limiter: Limiter to use (defaults to the process-wide one)
+        max_attempts: Give up after this many throttled attempts
+    """
+    if max_attempts < 1:
+        raise ValueError("max_attempts must be at least 1")
+    limiter = limiter or get_limiter()
+    for attempt in range(1, max_attempts + 1):
+        try:
+            with limiter.slot() as started:
+                result = func()
+        except ThrottledError as e:
+            delay = limiter.on_throttle(e.retry_after, started)
+            if attempt == max_attempts:
+                raise
+            RETRIES.inc(reason="throttled")
+            print(f"⏳ Dynatrace throttled the upload (429), retrying in {delay:.1f}s "
+                  f"(attempt {attempt}/{max_attempts}, limit now {limiter.limit})")
+            continue
+        limiter.on_success()
+        return result
@@ -0,0 +1,343 @@
+import argparse
+import os
+import stat
+import struct
+import sys
+import time
+import zlib
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import BinaryIO, Deque, Iterable, List, Optional, Tuple
+
+from tracing import traced
+
+ZIP_STORED = 0
+ZIP_DEFLATED = 8
+ZIP64_LIMIT = 0xFFFFFFFF
+ZIP_FILECOUNT_LIMIT = 0xFFFF
+DEFAULT_VERSION = 20
+ZIP64_VERSION = 45
+CREATE_SYSTEM_UNIX = 3
+
+# Members with these extensions are already compressed; deflating them again only costs time
+STORED_EXTENSIONS = frozenset({
+    ".zip", ".gz", ".tgz", ".bz2", ".xz", ".zst", ".lz4", ".7z", ".jar", ".apk", ".ipa",
+    ".png", ".jpg", ".jpeg", ".gif", ".heic", ".webp", ".car", ".mp3", ".mp4", ".m4a", ".mov",
+})
+
+CHUNK_SIZE = 1024 * 1024
+WINDOW = 32 * 1024  # deflate history carried into the next chunk
+SAMPLE_SIZE = 64 * 1024
+INCOMPRESSIBLE_RATIO = 0.95
+
+
+class PackageReport:
+    """Outcome of one packaging run"""
+
+    def __init__(self, output: str, level: int, workers: int):
+        self.output = output
+        self.level = level
+        self.workers = workers
+        self.files = 0
+        self.directories = 0
+        self.stored_files = 0
+        self.input_bytes = 0
+        self.output_bytes = 0
+        self.seconds = 0.0
+
+    @property
+    def ratio(self) -> float:
+        """Compressed size / original size (lower is better)"""
+        return self.output_bytes / self.input_bytes if self.input_bytes else 1.0
+
+    def to_dict(self) -> dict:
+        return {
+            "output": self.output,
+            "level": self.level,
+            "workers": self.workers,
+            "files": self.files,
+            "directories": self.directories,
+            "stored_files": self.stored_files,
+            "input_bytes": self.input_bytes,
+            "output_bytes": self.output_bytes,
+            "ratio": round(self.ratio, 4),
+            "seconds": round(self.seconds, 3),
+        }
+
+    def print_report(self) -> None:
+        mb = 1024 * 1024
+        rate = self.input_bytes / mb / self.seconds if self.seconds else 0.0
+        print(f"📦 {self.output}: {self.files} file(s), {self.input_bytes / mb:.1f} MB -> "
+              f"{self.output_bytes / mb:.1f} MB (ratio {self.ratio:.3f}), {self.stored_files} stored, "
+              f"{self.seconds:.2f}s at {rate:.1f} MB/s (level {self.level}, {self.workers} workers)")
+
+
+class _Member:
+    def __init__(self, arcname: str, path: Optional[Path], st: os.stat_result, is_dir: bool):
+        self.arcname = arcname
+        self.path = path
+        self.is_dir = is_dir
+        self.size = 0 if is_dir else st.st_size
+        self.mode = st.st_mode
+        self.mtime = st.st_mtime
+        self.method = ZIP_STORED
+        self.crc = 0
+        self.compress_size = 0
+        self.header_offset = 0
+        self.zip64 = False
+
+    @property
+    def filename_bytes(self) -> bytes:
+        return self.arcname.encode("utf-8")
+
+    @property
+    def flags(self) -> int:
+        return 0x800 if not self.arcname.isascii() else 0  # UTF-8 name
+
+    @property
+    def dos_time(self) -> Tuple[int, int]:
+        t = time.localtime(max(self.mtime, 315532800))  # zip cannot represent dates before 1980
+        return ((t.tm_hour << 11) | (t.tm_min << 5) | (t.tm_sec // 2),
+                ((t.tm_year - 1980) << 9) | (t.tm_mon << 5) | t.tm_mday)
+
+
+def _collect(sources: Iterable[str]) -> List[_Member]:
+    """Walk each source (a .dSYM directory or a file) into zip members named relative to its parent"""
+    members = []
+    for source in sources:
+        root = Path(source)
+        if not root.exists():
+            raise FileNotFoundError(f"Not found: {source}")
+        if root.is_file():
+            members.append(_Member(root.name, root, root.stat(), False))
+            continue
+        base = root.parent
+        for dirpath, dirnames, filenames in os.walk(root):
+            dirnames.sort()
+            directory = Path(dirpath)
+            members.append(_Member(directory.relative_to(base).as_posix() + "/", None, directory.stat(), True))
+            for name in sorted(filenames):
+                path = directory / name
+                members.append(_Member(path.relative_to(base).as_posix(), path, path.stat(), False))
+    return members
+
+
+def _should_store(member: _Member, level: int) -> bool:
+    if member.size == 0 or level == 0:
+        return True
+    if member.path.suffix.lower() in STORED_EXTENSIONS:
+        return True
+    with member.path.open("rb") as f:
+        sample = f.read(SAMPLE_SIZE)
+    return len(zlib.compress(sample, 1)) > len(sample) * INCOMPRESSIBLE_RATIO
+
+
+def _deflate_chunk(data: bytes, history: bytes, level: int, final: bool) -> bytes:
+    """
+    Raw-deflate one chunk so chunks can be concatenated into a single stream.
+
+    The previous chunk's last 32 KiB is used as the preset dictionary, so matches
+    may still reach back across the boundary. Non-final chunks end with a sync flush
+    (byte aligned, not marked last).
+    """
+    if history:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15, 8, zlib.Z_DEFAULT_STRATEGY, history)
+    else:
+        compressor = zlib.compressobj(level, zlib.DEFLATED, -15)
+    return compressor.compress(data) + compressor.flush(zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH)
+
+
+def _done(value) -> Future:
+    future = Future()
+    future.set_result(value)
+    return future
+
+
+class _ZipWriter:
+    """Hand-written zip records (local headers patched after the data, no data descriptors)"""
+
+    def __init__(self, fp: BinaryIO):
+        self.fp = fp
+        self.members: List[_Member] = []
+
+    def begin(self, member: _Member):
+        member.header_offset = self.fp.tell()
+        # Reserve a zip64 extra when the member might not fit 32-bit sizes (deflate can expand slightly)
+        member.zip64 = member.size * 1.05 > ZIP64_LIMIT
+        self.fp.write(self._local_header(member))
+
+    def end(self, member: _Member):
+        position = self.fp.tell()
+        if not member.zip64 and (member.compress_size > ZIP64_LIMIT or member.size > ZIP64_LIMIT):
+            raise RuntimeError(f"{member.arcname} grew past 4 GiB without a zip64 header")
+        self.fp.seek(member.header_offset)
+        self.fp.write(self._local_header(member))
+        self.fp.seek(position)
+        self.members.append(member)
+
+    def _local_header(self, member: _Member) -> bytes:
+        dostime, dosdate = member.dos_time
+        name = member.filename_bytes
+        if member.zip64:
+            extra = struct.pack("<HHQQ", 0x0001, 16, member.size, member.compress_size)
+            sizes = (ZIP64_LIMIT, ZIP64_LIMIT)
+            version = ZIP64_VERSION
+        else:
+            extra = b""
+            sizes = (member.compress_size, member.size)
+            version = DEFAULT_VERSION
+        return struct.pack("<IHHHHHIIIHH", 0x04034B50, version, member.flags, member.method, dostime, dosdate,
+                           member.crc, sizes[0], sizes[1], len(name), len(extra)) + name + extra
+
+    def close(self):
+        cd_offset = self.fp.tell()
+        for member in self.members:
+            dostime, dosdate = member.dos_time
+            name = member.filename_bytes
+            zip64_fields = []
+            size, compress_size, offset = member.size, member.compress_size, member.header_offset
+            if size > ZIP64_LIMIT or compress_size > ZIP64_LIMIT:
+                zip64_fields += [size, compress_size]
+                size = compress_size = ZIP64_LIMIT
+            if offset > ZIP64_LIMIT:
+                zip64_fields.append(offset)
+                offset = ZIP64_LIMIT
+            extra = struct.pack(f"<HH{len(zip64_fields)}Q", 0x0001, 8 * len(zip64_fields),
+                                *zip64_fields) if zip64_fields else b""
+            version = ZIP64_VERSION if zip64_fields or member.zip64 else DEFAULT_VERSION
+            external = (member.mode & 0xFFFF) << 16 | (0x10 if member.is_dir else 0)
+            self.fp.write(struct.pack("<IHHHHHHIIIHHHHHII", 0x02014B50, (CREATE_SYSTEM_UNIX << 8) | version,
+                                      version, member.flags, member.method, dostime, dosdate, member.crc,
+                                      compress_size, size, len(name), len(extra), 0, 0, 0, external, offset)
+                          + name + extra)
+        cd_size = self.fp.tell() - cd_offset
+        count = len(self.members)
+
+        if count > ZIP_FILECOUNT_LIMIT or cd_offset > ZIP64_LIMIT or cd_size > ZIP64_LIMIT:
+            zip64_eocd = self.fp.tell()
+            self.fp.write(struct.pack("<IQHHIIQQQQ", 0x06064B50, 44, (CREATE_SYSTEM_UNIX << 8) | ZIP64_VERSION,
+                                      ZIP64_VERSION, 0, 0, count, count, cd_size, cd_offset))
+            self.fp.write(struct.pack("<IIQI", 0x07064B50, 0, zip64_eocd, 1))
+            count = min(count, ZIP_FILECOUNT_LIMIT)
+            cd_size = min(cd_size, ZIP64_LIMIT)
+            cd_offset = min(cd_offset, ZIP64_LIMIT)
+        self.fp.write(struct.pack("<IHHHHIIH", 0x06054B50, 0, 0, count, count, cd_size, cd_offset, 0))
+
+
+@traced("dsym.package")
+def package_dsym(sources: Iterable[str], output: str, level: int = 6, workers: Optional[int] = None,
+                 chunk_size: int = CHUNK_SIZE, verbose: bool = True) -> PackageReport:
+    """
+    Zip one or more .dSYM bundles (e.g. into MyApp.app.dSYM.zip) compressing on all cores.
+
+    Large members are split into chunks deflated in parallel and joined into one
+    deflate stream; already-compressed members are stored. The result is a plain
+    zip (deflate/stored, zip64 only when needed) like `zip -r` produces.
+
+    Args:
+        sources: .dSYM directories and/or files; entries are named relative to each source's parent
+        output: Zip file to write
+        level: Deflate level 0-9 (0 stores everything)
+        workers: Compression threads (default: CPU count)
+        chunk_size: Bytes per compression job
+
+    Returns:
+        PackageReport: sizes, compression ratio and time
+    """
+    if not 0 <= level <= 9:
+        raise ValueError("level must be between 0 and 9")
+    workers = workers or os.cpu_count() or 1
+    report = PackageReport(output, level, workers)
+    started = time.perf_counter()
+    members = _collect(sources)
+
+    tmp_output = f"{output}.partial"
+    try:
+        report.output_bytes = _write_zip(members, tmp_output, level, workers, chunk_size, report)
+        os.replace(tmp_output, output)
+    except BaseException:
+        if os.path.exists(tmp_output):
+            os.remove(tmp_output)
+        raise
+
+    report.seconds = time.perf_counter() - started
+    if verbose:
+        report.print_report()
+    return report
+
+
+def _write_zip(members: List[_Member], path: str, level: int, workers: int, chunk_size: int,
+               report: PackageReport) -> int:
+    max_in_flight = workers * 4
+    with open(path, "wb") as fp, ThreadPoolExecutor(max_workers=workers, thread_name_prefix="deflate") as pool:
+        writer = _ZipWriter(fp)
+        # Ordered queue of ("begin", member) / ("data", member, future) / ("end", member); zlib releases
+        # the GIL, so chunks compress concurrently while this thread reads ahead and writes in order
+        queue: Deque[tuple] = deque()
+        in_flight = 0
+
+        def drain_one():
+            nonlocal in_flight
+            item = queue.popleft()
+            if item[0] == "begin":
+                writer.begin(item[1])
+            elif item[0] == "data":
+                data = item[2].result()
+                item[1].compress_size += len(data)
+                fp.write(data)
+                in_flight -= 1
+            else:
+                writer.end(item[1])
+
+        for member in members:
+            if member.is_dir:
+                report.directories += 1
+                queue.append(("begin", member))
+                queue.append(("end", member))
+                continue
+
+            report.files += 1
+            report.input_bytes += member.size
+            store = _should_store(member, level)
+            member.method = ZIP_STORED if store else ZIP_DEFLATED
+            report.stored_files += 1 if store else 0
+            queue.append(("begin", member))
+
+            with member.path.open("rb") as f:
+                history = b""
+                chunk = f.read(chunk_size)
+                while True:
+                    following = f.read(chunk_size) if chunk else b""
+                    final = not following
+                    member.crc = zlib.crc32(chunk, member.crc)
+                    if store:
+                        future = _done(chunk)
+                    else:
+                        future = pool.submit(_deflate_chunk, chunk, history, level, final)
+                        history = chunk[-WINDOW:]
+                    queue.append(("data", member, future))
+                    in_flight += 1
+                    while in_flight > max_in_flight:
+                        drain_one()
+                    if final:
+                        break
+                    chunk = following
+            queue.append(("end", member))
+
+        while queue:
+            drain_one()
+        writer.close()
+        return fp.tell()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Zip .dSYM bundles for upload, compressing on all cores")
+    parser.add_argument("sources", nargs="+", help=".dSYM directories or files")
+    parser.add_argument("-o", "--output", required=True, help="Zip to write, e.g. MyApp.app.dSYM.zip")
+    parser.add_argument("--level", type=int, default=6, help="Deflate level 0-9")
+    parser.add_argument("--workers", type=int, help="Compression threads (default: CPU count)")
+    args = parser.parse_args()
+
+    package_dsym(args.sources, args.output, level=args.level, workers=args.workers)
+    sys.exit(0)
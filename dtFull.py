@@ -20,10 +20,23 @@ It supports both iOS and Android platforms and integrates directly with the CH08
 h2. Key Features
 * Fetches metadata JSON from Nexus3.  
 * Downloads artifacts (symbol or mapping files) from Nexus3.  
+* Resolves `LATEST`, `RELEASE` and timestamped `-SNAPSHOT` versions from the cached `maven-metadata.xml` and downloads them by repository path. The search API is only used when the metadata is missing.
+* Optional request hedging for Nexus downloads (`--hedge` on `fetch`, `release` and `batch`). A GET still waiting after the recent p95 response time is sent again, and the first response wins. Hedges are capped at 10% of requests, and the hedge rate and wins are printed and exported as metrics.
 * Pre-processes iOS symbol files before upload.  
 * Supports both Android and iOS builds.  
 * Dynamically determines Dynatrace environment URL.  
 * Uploads files using Dynatrace REST API.
+* Skips files already uploaded for the same environment, application ID, version code and content (local upload ledger, override with `--force`).
+* Records timing spans for metadata parsing, download, client install, Xcode selection, preprocessing and upload; writes a Chrome trace when `POST_RELEASE_TRACE` is set and a timing table to the GitHub Actions job summary.
+* Exports counters and histograms (bytes transferred, retries, cache hits/misses, subprocess, stage and HTTP response times) to a Prometheus textfile or OpenMetrics file named by `POST_RELEASE_METRICS` at exit.
+* One CLI for every step (`post_release.py fetch|parse|install-client|select-xcode|package-dsym|upload|promote|cleanup`); each subcommand imports only the modules it needs.
+* Packages .dSYM bundles into a standard zip using all cores (`package-dsym`): large members are compressed in parallel chunks, already-compressed members are stored, and the compression level, ratio and time are reported.
+* Architecture thinning for dSYMs (`--arch arm64` on `upload`, `release` and `batch`, or `post_release.py thin-dsym`). Fat Mach-O headers are parsed in pure Python and only the requested slices are written, straight from a memory map, so simulator and x86_64 slices are neither preprocessed nor uploaded. `lipo` is not needed, so this also runs on Linux. Binaries without any requested slice are uploaded unchanged.
+* Pre-checks Dynatrace before uploading. The symbol file list is fetched once per environment for a whole batch and shared for a minute. Mappings and dSYMs whose app, package, OS and version are already listed are skipped (mappings only when the size matches too). Skip the check with `--no-precheck` or `--force`. If the list cannot be read, files are uploaded as before.
+* Reconciliation (`post_release.py reconcile`). It lists every release whose metadata.json is in Nexus but which has no upload in Dynatrace (symbol file list API) or in the upload ledger. Only the gaps are printed, optionally as a CSV manifest for `batch`. Parsed metadata is indexed by checksum, so reruns over thousands of versions only download new files.
+* Bandwidth limit for Nexus (`--max-bandwidth 50MB`, `--max-requests 20`, or `NEXUS_MAX_BANDWIDTH` / `NEXUS_MAX_REQUESTS`). Every Nexus download, upload and metadata request in the process shares one token bucket per host, so parallel releases do not saturate Nexus for other teams. Budgets can differ per host (`nexus.example.com=50MB,*=10MB`), short bursts are allowed, and time spent throttled is reported and exported as a metric.
+* Durable job queue for release crunch (`post_release.py queue add|work|status`). Release, fetch, preprocess and upload jobs are stored in SQLite and run prod first, then pat, then dev. Workers lease jobs and heartbeat; jobs of a crashed worker are picked up again once the lease lapses, failed jobs retry with backoff. Queue depth and wait times are shown by `queue status` and exported as metrics.
+* End-to-end simulation on any machine (`bench_e2e.py`). It uses a local fake Nexus and fake Dynatrace, stub `mdfind`, `xcodebuild`, `xcode-select` and `fastlane`, and seeded metadata, dSYM and mapping fixtures. It runs the whole flow, checks the uploads and times every stage. `--max-seconds` makes it a performance regression gate.
 
 ----
 
@@ -72,6 +85,10 @@ h2. How It Works
    * iOS → Calls `dynatrace-publish.sh` to pre-process and upload symbol files.  
    * Android → Directly uploads mapping files via Dynatrace API.
 
+The steps run as a stage graph (`release_flow.py`, or `post_release.py release`). On iOS, client install and Xcode selection only depend on the client version, so they run while metadata and the artifact are being downloaded; upload starts once both branches are done. The run ends with a per-stage timing table and the critical path that bounded wall time.
+
+*Batch mode:* `post_release.py batch releases.csv` (or a JSON list) processes many releases in one process, a bounded number at a time (`--max-parallel`). Releases share the HTTP connection pool, the upload ledger, the stage cache and one client install per client version. Per-release status is rewritten to `batch-results.json` after each release; `--resume` skips releases already marked ok.
+
 ----
 
 h2. Script Structure
@@ -98,11 +115,13 @@ Dynatrace environment URLs are dynamically selected based on the `env` value fou
 | pat | https://pat-td-az.live.dynatrace.com |
 | prod | https://prod-td-az.live.dynatrace.com |
 
+The URLs live in `dynatrace_client.py`. It keeps one keep-alive session per environment, which every upload in the process reuses, and it checks the API token once per TTL (default 5 minutes). The check uses `POST /api/v2/apiTokens/lookup` and requires the `DssFileManagement` scope.
+
 ----
 
 h2. Error Handling
 * Validates metadata fields before upload.  
-* Ensures API token validity and handles request errors.  
+* Ensures API token validity (cached per environment, cleared on a 401) and handles request errors.  
 * Logs and surfaces any failure messages for troubleshooting.
 
 ----
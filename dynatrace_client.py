@@ -0,0 +1,267 @@
+import hashlib
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+from metrics import CACHE_LOOKUPS, HTTP_SECONDS
+
+DYNATRACE_URLS = {
+    "dev": "https://dev-td-az.live.dynatrace.com",
+    "pat": "https://pat-td-az.live.dynatrace.com",
+    "prod": "https://prod-td-az.live.dynatrace.com",
+}
+
+SYMFILES_PATH = "/api/config/v1/symfiles"
+TOKEN_LOOKUP_PATH = "/api/v2/apiTokens/lookup"
+SYMFILES_SCOPE = "DssFileManagement"
+
+# What a symbol file upload path identifies: (applicationId, packageName, OS, versionCode, versionName)
+SymbolFileKey = Tuple[str, str, str, str, str]
+
+
+def symbol_file_key(application_id: str, package_name: str, os_name: str, version_code: str,
+                    version_name: str) -> SymbolFileKey:
+    return str(application_id), str(package_name), str(os_name).upper(), str(version_code), str(version_name)
+
+
+class TokenError(Exception):
+    """Raised when Dynatrace reports the API token as invalid, disabled, expired or missing a scope"""
+
+
+class DynatraceClient:
+    """
+    Keep-alive session and token check for one Dynatrace environment.
+
+    Use get_client() instead of creating instances, so every uploader in the
+    process shares the same connections (no repeated TLS handshakes) and the
+    same token cache (one lookup per token per TTL).
+    """
+
+    def __init__(self, environment: str, base_url: Optional[str] = None, pool_size: int = 10,
+                 token_ttl: float = 300.0, listing_ttl: float = 60.0, verbose: bool = True):
+        if environment not in DYNATRACE_URLS and not base_url:
+            raise ValueError(f"Unknown Dynatrace environment: {environment}")
+        self.environment = environment
+        self.base_url = (base_url or DYNATRACE_URLS[environment]).rstrip("/")
+        self.token_ttl = token_ttl
+        self.listing_ttl = listing_ttl
+        self.verbose = verbose
+        self.session = requests.Session()
+        self.pool_size = 0
+        self._mount(pool_size)
+        self._tokens: Dict[str, Tuple[float, Dict]] = {}
+        self._token_locks: Dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._listing: Optional[Tuple[float, Dict[SymbolFileKey, Dict]]] = None
+        self._listing_lock = threading.Lock()
+
+    # ----------------------------
+    # Helper methods
+    # ----------------------------
+
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
+
+    def _mount(self, pool_size: int):
+        # a replaced adapter is not closed: requests still running on it keep their connection
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self.pool_size = pool_size
+
+    @staticmethod
+    def _token_key(api_token: str) -> str:
+        # cache by digest so the token itself is not kept as a dict key
+        return hashlib.sha256(api_token.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def _expires_in(info: Dict) -> Optional[float]:
+        """Seconds until the token's expirationDate, or None if it does not expire"""
+        expiration = info.get("expirationDate")
+        if not expiration:
+            return None
+        expires = datetime.fromisoformat(expiration.replace("Z", "+00:00"))
+        return (expires - datetime.now(timezone.utc)).total_seconds()
+
+    def _lookup(self, api_token: str) -> Dict:
+        started = time.perf_counter()
+        response = self.session.post(self.url(TOKEN_LOOKUP_PATH), json={"token": api_token},
+                                     headers={"Authorization": f"Api-Token {api_token}"})
+        HTTP_SECONDS.observe(time.perf_counter() - started, service="dynatrace", operation="token_lookup",
+                             status=response.status_code)
+
+        if response.status_code in (403, 404, 405):
+            # Token lacks apiTokens.read or the endpoint is not there: cannot check, let the upload decide
+            self._log(f"⚠️ Cannot verify the Dynatrace API token ({response.status_code}), skipping the check")
+            return {"verified": False}
+        if response.status_code == 401:
+            raise TokenError(f"Dynatrace rejected the API token for {self.environment}")
+        response.raise_for_status()
+
+        info = response.json()
+        info["verified"] = True
+        if not info.get("enabled", True):
+            raise TokenError(f"Dynatrace API token {info.get('name') or info.get('id')} is disabled")
+        expires_in = self._expires_in(info)
+        if expires_in is not None and expires_in <= 0:
+            raise TokenError(f"Dynatrace API token expired on {info['expirationDate']}")
+        scopes = info.get("scopes")
+        if scopes is not None and SYMFILES_SCOPE not in scopes:
+            raise TokenError(f"Dynatrace API token is missing the {SYMFILES_SCOPE} scope")
+        return info
+
+    # ----------------------------
+    # Public functions
+    # ----------------------------
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}{path}"
+
+    def configure(self, pool_size: Optional[int] = None, token_ttl: Optional[float] = None,
+                  listing_ttl: Optional[float] = None, verbose: Optional[bool] = None):
+        """
+        Apply options to a client that already exists (see get_client).
+
+        The connection pool is only ever enlarged, so a smaller request from
+        one caller does not starve another; TTLs and verbose are replaced.
+        """
+        with self._lock:
+            if pool_size is not None and pool_size > self.pool_size:
+                self._mount(pool_size)
+            if token_ttl is not None:
+                self.token_ttl = token_ttl
+            if verbose is not None:
+                self.verbose = verbose
+        if listing_ttl is not None:
+            with self._listing_lock:
+                self.listing_ttl = listing_ttl
+
+    def validate_token(self, api_token: str) -> Dict:
+        """
+        Check the API token once per TTL (never past the token's own expiry).
+
+        Concurrent callers with the same token wait for a single lookup.
+
+        Returns:
+            dict: Token details from Dynatrace ("verified": False if it could not be checked)
+
+        Raises:
+            TokenError: if the token is invalid, disabled, expired or lacks the symbol file scope
+        """
+        key = self._token_key(api_token)
+        with self._lock:
+            lock = self._token_locks.setdefault(key, threading.Lock())
+        with lock:
+            cached = self._tokens.get(key)
+            if cached and cached[0] > time.monotonic():
+                CACHE_LOOKUPS.inc(cache="dynatrace_token", result="hit")
+                return cached[1]
+            CACHE_LOOKUPS.inc(cache="dynatrace_token", result="miss")
+
+            info = self._lookup(api_token)
+            ttl = self.token_ttl
+            expires_in = self._expires_in(info) if info["verified"] else None
+            if expires_in is not None:
+                ttl = min(ttl, expires_in)
+            self._tokens[key] = (time.monotonic() + ttl, info)
+            return info
+
+    def list_symbol_files(self, api_token: str) -> List[Dict]:
+        """Every uploaded symbol/mapping file (GET /api/config/v1/symfiles)"""
+        started = time.perf_counter()
+        response = self.session.get(self.url(SYMFILES_PATH), headers={"Authorization": f"Api-Token {api_token}"})
+        HTTP_SECONDS.observe(time.perf_counter() - started, service="dynatrace", operation="list",
+                             status=response.status_code)
+        if response.status_code == 401:
+            self.invalidate_token(api_token)
+            raise TokenError(f"Dynatrace rejected the API token for {self.environment}")
+        response.raise_for_status()
+        return response.json().get("symbolFiles", [])
+
+    def existing_symbol_files(self, api_token: str, keys: Iterable[SymbolFileKey]) -> Dict[SymbolFileKey, Dict]:
+        """
+        Which of `keys` Dynatrace already has a symbol file for.
+
+        A whole batch is answered from one listing request, and the listing is
+        shared by every caller for listing_ttl seconds (concurrent callers wait
+        for the same request). If the listing cannot be fetched, nothing is
+        reported present, so the uploads go ahead.
+
+        Returns:
+            dict: {key: listing entry (with fileSize)} for the keys that are present
+
+        Raises:
+            TokenError: if Dynatrace rejects the token
+        """
+        with self._listing_lock:
+            if self._listing and self._listing[0] > time.monotonic():
+                CACHE_LOOKUPS.inc(cache="dynatrace_listing", result="hit")
+            else:
+                CACHE_LOOKUPS.inc(cache="dynatrace_listing", result="miss")
+                try:
+                    files = self.list_symbol_files(api_token)
+                except requests.RequestException as e:
+                    # remembered as empty for the TTL, so a batch does not retry (and warn) per file
+                    self._log(f"⚠️ Cannot list symbol files in {self.environment} ({e}), uploading without the check")
+                    files = []
+                index = {symbol_file_key(f.get("applicationId"), f.get("packageName"), f.get("os"),
+                                         f.get("versionCode"), f.get("versionName")): f for f in files}
+                self._listing = (time.monotonic() + self.listing_ttl, index)
+            index = self._listing[1]
+        return {key: index[key] for key in keys if key in index}
+
+    def record_symbol_file(self, key: SymbolFileKey, size: Optional[int] = None):
+        """Add a finished upload to the cached listing, so later checks see it without a new request"""
+        with self._listing_lock:
+            if self._listing:
+                self._listing[1][key] = {"fileSize": size}
+
+    def invalidate_token(self, api_token: str):
+        """Forget the cached check, e.g. after a 401 from an upload"""
+        with self._lock:
+            self._tokens.pop(self._token_key(api_token), None)
+
+    def close(self):
+        self.session.close()
+
+
+_clients: Dict[str, DynatraceClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(environment: str, base_url: Optional[str] = None, **kwargs) -> DynatraceClient:
+    """
+    Shared client for an environment (and optional URL override), one per URL.
+
+    Keyword arguments (pool_size, token_ttl, listing_ttl, verbose) are
+    applied to an existing client too (see DynatraceClient.configure).
+    """
+    if environment not in DYNATRACE_URLS and not base_url:
+        raise ValueError(f"Unknown Dynatrace environment: {environment}")
+    key = (base_url or DYNATRACE_URLS[environment]).rstrip("/")
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = DynatraceClient(environment, base_url=base_url, **kwargs)
+        elif kwargs:
+            client.configure(**kwargs)
+        return client
+
+
+def client_for_url(base_url: str, **kwargs) -> DynatraceClient:
+    """Shared client for a server URL, e.g. the fastlane `server` parameter"""
+    base_url = base_url.rstrip("/")
+    environment = next((env for env, url in DYNATRACE_URLS.items() if url == base_url), base_url)
+    return get_client(environment, base_url, **kwargs)
+
+
+def close_all():
+    """Close every shared session"""
+    with _clients_lock:
+        for client in _clients.values():
+            client.close()
+        _clients.clear()
@@ -0,0 +1,162 @@
+import os
+import subprocess
+from pathlib import Path
+
+from concurrency import ThrottledError, detect_throttle, run_throttled
+from gaixie import DynatraceSymbolManager
+from metrics import UPLOAD_BYTES
+from stage_runner import Stage, StageRunner
+from stream_run import run_streaming
+from tracing import span, traced
+
+
+class DynatraceSymbolPublisher:
+    """
+    A Python wrapper to call the existing shell script for Dynatrace symbol upload,
+    passing in dynamic parameters like application_id, version_id, and client_version.
+    """
+
+    def __init__(self, script_path="publish-symbols.sh", ledger=None, force=False, limiter=None, max_attempts=5,
+                 stage_cache=".stage-cache.json", timeout=None):
+        self.script_path = Path(script_path).resolve()
+        if not self.script_path.exists():
+            raise FileNotFoundError(f"Script not found: {self.script_path}")
+        self.ledger = ledger
+        self.force = force
+        self.limiter = limiter
+        self.max_attempts = max_attempts
+        self.stage_cache = stage_cache
+        self.timeout = timeout
+        self.last_runner = None
+
+    def _run_script(self, command, application_id, version_id, client_version, developer_dir=None):
+        """Internal helper to run the shell script with arguments."""
+        cmd = [
+            "bash",
+            str(self.script_path),
+            command,
+            application_id,
+            version_id,
+            client_version
+        ]
+        print(f"🟢 Running: {' '.join(cmd)}")
+
+        env = None
+        if developer_dir:
+            env = dict(os.environ, DEVELOPER_DIR=developer_dir)
+
+        try:
+            # Output is streamed live; only the tail is kept for error reports
+            with span(f"script.{command}", application_id=application_id, version_id=version_id):
+                result = run_streaming(cmd, env=env, timeout=self.timeout)
+            print(f"⏱️ {command} finished in {result.wall_time:.1f}s (peak RSS {result.peak_rss_kb // 1024} MB)")
+            return result.tail
+        except subprocess.TimeoutExpired as e:
+            print(f"❌ Script timed out after {e.timeout}s, process group killed")
+            print(f"last output:\n{e.output}")
+            raise
+        except subprocess.CalledProcessError as e:
+            print(f"❌ Script failed with exit code {e.returncode}")
+            print(f"last output:\n{e.output}")
+            raise
+
+    def select_xcode(self, application_id, version_id, client_version):
+        """Call 'select_xcode' section in the shell script."""
+        return self._run_script("select_xcode", application_id, version_id, client_version)
+
+    def install(self, application_id, version_id, client_version):
+        """Call 'install' section in the shell script."""
+        return self._run_script("install", application_id, version_id, client_version)
+
+    @traced("publisher.upload_symbols", fields=("application_id", "version_id", "environment"))
+    def upload_symbols(self, application_id, version_id, client_version, symbol_file=None, environment="prod",
+                       developer_dir=None):
+        """
+        Call 'upload_symbols' section in the shell script.
+        When a ledger and symbol_file are given, skip files already uploaded for this key.
+        """
+        digest = None
+        if self.ledger and symbol_file:
+            digest = self.ledger.file_digest(symbol_file)
+            if self.ledger.should_skip(environment, application_id, version_id,
+                                       symbol_file, force=self.force, digest=digest):
+                return ""
+
+        def attempt():
+            try:
+                return self._run_script("upload_symbols", application_id, version_id, client_version,
+                                        developer_dir=developer_dir)
+            except subprocess.CalledProcessError as e:
+                throttled, retry_after = detect_throttle(e.output)
+                if throttled:
+                    raise ThrottledError("Dynatrace returned 429 during symbol upload", retry_after) from e
+                raise
+
+        try:
+            output = run_throttled(attempt, self.limiter, self.max_attempts)
+        except (subprocess.CalledProcessError, ThrottledError) as e:
+            if self.ledger and symbol_file:
+                self.ledger.record(environment, application_id, version_id, symbol_file,
+                                   success=False, digest=digest, detail=str(e))
+            raise
+
+        if self.ledger and symbol_file:
+            self.ledger.record(environment, application_id, version_id, symbol_file,
+                               success=True, digest=digest)
+        if symbol_file and os.path.isfile(symbol_file):
+            UPLOAD_BYTES.inc(os.path.getsize(symbol_file), uploader="publisher")
+        return output
+
+    def build_stages(self, manager):
+        """
+        In-process stages for the full pipeline.
+        Client install is cached by its inputs. Xcode selection, the LLDB link and upload always run,
+        since upgrading Xcode in place changes the first two without changing any input.
+        """
+        def install(client_version):
+            return str(manager.download_client())
+
+        def select_xcode(client_version, client_plist):
+            return manager.select_xcode()
+
+        def link_lldb(developer_dir, client_plist):
+            return str(manager.link_lldb(developer_dir))
+
+        def upload(application_id, version_id, client_version, developer_dir, lldb_link,
+                   symbol_file, environment):
+            return self.upload_symbols(application_id, version_id, client_version, symbol_file=symbol_file,
+                                       environment=environment, developer_dir=developer_dir)
+
+        return [
+            Stage("install", install, inputs=["client_version"], outputs=["client_plist"],
+                  validate=lambda out: Path(out["client_plist"]).exists()),
+            Stage("select_xcode", select_xcode, inputs=["client_version", "client_plist"],
+                  outputs=["developer_dir"], cacheable=False),
+            Stage("link_lldb", link_lldb, inputs=["developer_dir", "client_plist"], outputs=["lldb_link"],
+                  cacheable=False),
+            Stage("upload_symbols", upload,
+                  inputs=["application_id", "version_id", "client_version", "developer_dir", "lldb_link",
+                          "symbol_file", "environment"],
+                  outputs=["upload_output"], cacheable=False),
+        ]
+
+    @traced("publisher.run_full_pipeline", fields=("application_id", "version_id"))
+    def run_full_pipeline(self, application_id, version_id, client_version, symbol_file=None, environment="prod"):
+        """
+        Run the full sequence in one process.
+        Xcode and client state are derived once and passed between stages in memory.
+        """
+        manager = DynatraceSymbolManager(client_version=client_version)
+        runner = StageRunner(self.build_stages(manager), cache_path=self.stage_cache)
+        self.last_runner = runner
+        try:
+            context = runner.run(
+                application_id=application_id,
+                version_id=version_id,
+                client_version=client_version,
+                symbol_file=symbol_file,
+                environment=environment,
+            )
+        finally:
+            runner.print_timings()
+        return context["upload_output"]
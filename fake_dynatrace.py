@@ -0,0 +1,204 @@
+import json
+import random
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional
+
+SYMFILES_PREFIX = "/api/config/v1/symfiles/"
+TOKEN_LOOKUP_PATH = "/api/v2/apiTokens/lookup"
+
+
+class FakeDynatrace:
+    """
+    Local stub of the Dynatrace symbol file API.
+
+    Accepts PUT /api/config/v1/symfiles/{appId}/{package}/{os}/{versionCode}/{versionName}
+    and records what was uploaded (sizes only, bodies are discarded).
+    GET /api/config/v1/symfiles lists what was uploaded (plus files seeded
+    with add_symbol_file); POST
+    /api/v2/apiTokens/lookup reports the token with the given scopes.
+    Latency, 429 injection with Retry-After and a body-size limit are configurable.
+    Bodies shorter than their Content-Length are counted as incomplete and not stored.
+
+    Usage:
+        with FakeDynatrace(throttle_rate=0.1) as dynatrace:
+            uploader = MappingUploader("dev", "token", base_url=dynatrace.url)
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 throttle_rate: float = 0.0, throttle_every: int = 0, retry_after: float = 1.0,
+                 max_body_bytes: Optional[int] = None, api_token: Optional[str] = None, seed: int = 0,
+                 token_scopes: Optional[List[str]] = None, token_enabled: bool = True):
+        self.latency = latency
+        self.throttle_rate = throttle_rate
+        self.throttle_every = throttle_every
+        self.retry_after = retry_after
+        self.max_body_bytes = max_body_bytes
+        self.api_token = api_token
+        self.token_scopes = token_scopes if token_scopes is not None else ["DssFileManagement"]
+        self.token_enabled = token_enabled
+        self.uploads: List[Dict] = []
+        self._existing: List[Dict] = []
+        self.counts: Dict[str, int] = {"requests": 0, "throttled": 0, "rejected": 0, "incomplete": 0, "bytes": 0,
+                                       "lookups": 0, "lists": 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeDynatrace":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-dynatrace", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def reset(self):
+        with self._lock:
+            self.uploads.clear()
+            self.counts = {key: 0 for key in self.counts}
+
+    def add_symbol_file(self, application_id: str, package_name: str, os_name: str, version_code: str,
+                        version_name: str, size: int = 0):
+        """Pretend a symbol file was uploaded earlier (listed, but not counted as an upload of this run)"""
+        with self._lock:
+            self._existing.append({"applicationId": application_id, "packageName": package_name, "os": os_name,
+                                   "versionCode": version_code, "versionName": version_name, "bytes": size})
+
+    def _should_throttle(self) -> bool:
+        with self._lock:
+            self.counts["requests"] += 1
+            if self.throttle_every and self.counts["requests"] % self.throttle_every == 0:
+                return True
+            return self.throttle_rate > 0 and self._random.random() < self.throttle_rate
+
+    def _handler_class(self):
+        dynatrace = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, fmt, *args):
+                pass
+
+            def _reply(self, status: int, headers: Optional[Dict[str, str]] = None, body: bytes = b""):
+                self.send_response(status)
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _drain(self) -> int:
+                """Read and discard the request body, returning its size"""
+                remaining = int(self.headers.get("Content-Length") or 0)
+                total = 0
+                while remaining > 0:
+                    chunk = self.rfile.read(min(remaining, 1024 * 1024))
+                    if not chunk:
+                        break
+                    total += len(chunk)
+                    remaining -= len(chunk)
+                return total
+
+            def _authorized(self) -> bool:
+                auth = self.headers.get("Authorization", "")
+                return auth.startswith("Api-Token ") and (not dynatrace.api_token
+                                                          or auth == f"Api-Token {dynatrace.api_token}")
+
+            def do_GET(self):
+                path = urllib.parse.urlsplit(self.path).path.rstrip("/")
+                if path != SYMFILES_PREFIX.rstrip("/"):
+                    return self._reply(404)
+                if not self._authorized():
+                    return self._reply(401)
+                with dynatrace._lock:
+                    dynatrace.counts["lists"] += 1
+                    # a later PUT to the same path replaces the file
+                    latest = {(u["applicationId"], u["packageName"], u["os"], u["versionCode"], u["versionName"]): u
+                              for u in dynatrace._existing + dynatrace.uploads}
+                    files = [{"applicationId": u["applicationId"], "packageName": u["packageName"], "os": u["os"],
+                              "versionCode": u["versionCode"], "versionName": u["versionName"],
+                              "fileSize": u["bytes"]} for u in latest.values()]
+                body = json.dumps({"symbolFiles": files}).encode("utf-8")
+                self._reply(200, {"Content-Type": "application/json"}, body)
+
+            def do_POST(self):
+                path = urllib.parse.urlsplit(self.path).path
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                if path != TOKEN_LOOKUP_PATH:
+                    return self._reply(404)
+                if not self._authorized():
+                    return self._reply(401)
+                with dynatrace._lock:
+                    dynatrace.counts["lookups"] += 1
+                token = json.loads(body or b"{}").get("token")
+                if dynatrace.api_token and token != dynatrace.api_token:
+                    return self._reply(404)
+                info = {"id": "dt0c01.FAKE", "name": "fake", "enabled": dynatrace.token_enabled,
+                        "scopes": dynatrace.token_scopes}
+                self._reply(200, {"Content-Type": "application/json"}, json.dumps(info).encode("utf-8"))
+
+            def do_PUT(self):
+                if dynatrace.latency:
+                    time.sleep(dynatrace.latency)
+                path = urllib.parse.urlsplit(self.path).path
+                parts = [urllib.parse.unquote(p) for p in path[len(SYMFILES_PREFIX):].split("/")]
+                if not path.startswith(SYMFILES_PREFIX) or len(parts) != 5:
+                    self._drain()
+                    return self._reply(404)
+
+                if not self._authorized():
+                    self._drain()
+                    return self._reply(401)
+
+                declared = int(self.headers.get("Content-Length") or 0)
+                if dynatrace.max_body_bytes is not None and declared > dynatrace.max_body_bytes:
+                    with dynatrace._lock:
+                        dynatrace.counts["rejected"] += 1
+                    self.close_connection = True
+                    return self._reply(413)
+
+                size = self._drain()
+                if size < declared:
+                    # client gave up mid-body (e.g. validation failed): nothing is stored
+                    with dynatrace._lock:
+                        dynatrace.counts["incomplete"] += 1
+                    self.close_connection = True
+                    return
+                if dynatrace._should_throttle():
+                    with dynatrace._lock:
+                        dynatrace.counts["throttled"] += 1
+                    return self._reply(429, {"Retry-After": f"{dynatrace.retry_after:g}"}, b"Too Many Requests")
+
+                app_id, package_name, os_name, version_code, version_name = parts
+                with dynatrace._lock:
+                    dynatrace.counts["bytes"] += size
+                    dynatrace.uploads.append({
+                        "applicationId": app_id,
+                        "packageName": package_name,
+                        "os": os_name,
+                        "versionCode": version_code,
+                        "versionName": version_name,
+                        "bytes": size,
+                    })
+                self._reply(204)
+
+        return Handler
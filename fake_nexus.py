@@ -0,0 +1,331 @@
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional
+
+_PATTERN_BLOCK = bytes(range(256)) * 256  # 64 KiB
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class FakeArtifact:
+    """One file in the fake repository; content is either given or a synthesized pattern"""
+
+    def __init__(self, repository: str, group_id: str, artifact_id: str, version: str,
+                 filename: str, data: Optional[bytes] = None, size: Optional[int] = None):
+        self.repository = repository
+        self.group_id = group_id
+        self.artifact_id = artifact_id
+        self.version = version
+        self.filename = filename
+        self.data = data
+        self.size = len(data) if data is not None else int(size or 0)
+        if data is not None:
+            digest = hashlib.sha1(data).hexdigest()
+        else:
+            digest = hashlib.sha1(f"{filename}:{self.size}".encode("utf-8")).hexdigest()
+        self.sha1 = digest
+        self.etag = f'"{digest}"'
+
+    @property
+    def path(self) -> str:
+        group_path = self.group_id.replace(".", "/")
+        return f"{group_path}/{self.artifact_id}/{self.version}/{self.filename}"
+
+    def read(self, start: int, end: int) -> bytes:
+        """Bytes [start, end] inclusive"""
+        if self.data is not None:
+            return self.data[start:end + 1]
+        out = bytearray()
+        pos = start
+        while pos <= end:
+            offset = pos % len(_PATTERN_BLOCK)
+            take = min(len(_PATTERN_BLOCK) - offset, end - pos + 1)
+            out += _PATTERN_BLOCK[offset:offset + take]
+            pos += take
+        return bytes(out)
+
+
+class FakeNexus:
+    """
+    Local stand-in for the Nexus 3 search and repository endpoints.
+
+    Supports Range, ETag/If-None-Match and HEAD, plus per-response latency,
+    a slow tail (tail_rate of responses take tail_latency longer, like a slow
+    node behind the load balancer) and bandwidth shaping so download code can be benchmarked or exercised
+    end to end without a real Nexus. maven-metadata.xml is generated from the
+    added artifacts at artifact level (versions in the order they were added)
+    and, for SNAPSHOT versions, at version level from timestamped file names.
+
+    Usage:
+        with FakeNexus(latency=0.02) as nexus:
+            nexus.add_artifact("maven-releases", "com.example", "demo-app", "1.0.0", "demo-app-1.0.0.zip", size=10_000_000)
+            download_from_nexus(nexus.url, "maven-releases", "com.example", "demo-app", "1.0.0", packaging="zip")
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, latency: float = 0.0,
+                 bandwidth: Optional[int] = None, write_chunk: int = 64 * 1024, tail_rate: float = 0.0,
+                 tail_latency: float = 0.0, seed: int = 0, page_size: int = 50):
+        self.latency = latency
+        self.tail_rate = tail_rate
+        self.tail_latency = tail_latency
+        self.page_size = page_size
+        self._random = random.Random(seed)
+        self.bandwidth = bandwidth
+        self.write_chunk = write_chunk
+        self.artifacts: Dict[str, FakeArtifact] = {}
+        self.request_counts: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), self._handler_class())
+        self._server.daemon_threads = True
+        self._thread: Optional[threading.Thread] = None
+
+    # ----------------------------
+    # Setup
+    # ----------------------------
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def add_artifact(self, repository: str, group_id: str, artifact_id: str, version: str,
+                     filename: str, data: Optional[bytes] = None, size: Optional[int] = None) -> FakeArtifact:
+        artifact = FakeArtifact(repository, group_id, artifact_id, version, filename, data, size)
+        self.artifacts[f"{repository}/{artifact.path}"] = artifact
+        return artifact
+
+    def add_file(self, repository: str, path: str, data: Optional[bytes] = None,
+                 size: Optional[int] = None) -> FakeArtifact:
+        """A file at an arbitrary path, as in a raw repository"""
+        artifact = FakeArtifact(repository, "", "", "", path.rsplit("/", 1)[-1], data, size)
+        self.artifacts[f"{repository}/{path.strip('/')}"] = artifact
+        return artifact
+
+    def start(self) -> "FakeNexus":
+        self._thread = threading.Thread(target=self._server.serve_forever, name="fake-nexus", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _delay(self) -> float:
+        with self._lock:
+            slow = self.tail_rate > 0 and self._random.random() < self.tail_rate
+        return self.latency + (self.tail_latency if slow else 0.0)
+
+    def _count(self, kind: str):
+        with self._lock:
+            self.request_counts[kind] = self.request_counts.get(kind, 0) + 1
+
+    # ----------------------------
+    # Endpoints
+    # ----------------------------
+
+    def _search(self, query: Dict[str, str]):
+        items = []
+        artifacts = list(self.artifacts.values())
+        if query.get("sort") == "version" and query.get("direction", "asc") == "desc":
+            artifacts.reverse()
+        for artifact in artifacts:
+            if query.get("repository") and query["repository"] != artifact.repository:
+                continue
+            if query.get("group") and query["group"] != artifact.group_id:
+                continue
+            if query.get("name") and query["name"] != artifact.artifact_id:
+                continue
+            if query.get("version") and query["version"] != artifact.version:
+                continue
+            if query.get("maven.baseVersion") and query["maven.baseVersion"] != artifact.version:
+                continue
+            if query.get("prerelease") == "false" and artifact.version.endswith("-SNAPSHOT"):
+                continue
+            classifier = query.get("maven.classifier")
+            if classifier and f"-{classifier}." not in artifact.filename:
+                continue
+            extension = artifact.filename.rsplit(".", 1)[-1]
+            if query.get("maven.extension") and query["maven.extension"] != extension:
+                continue
+            items.append({
+                "downloadUrl": f"{self.url}/repository/{artifact.repository}/{artifact.path}",
+                "path": artifact.path,
+                "repository": artifact.repository,
+                "format": "maven2",
+                "checksum": {"sha1": artifact.sha1},
+                "fileSize": artifact.size,
+                "maven2": {"groupId": artifact.group_id, "artifactId": artifact.artifact_id,
+                           "version": artifact.version, "extension": extension},
+            })
+        # Pages of page_size like Nexus; the token is the offset of the next page
+        offset = int(query.get("continuationToken") or 0)
+        end = offset + self.page_size
+        return {"items": items[offset:end], "continuationToken": str(end) if end < len(items) else None}
+
+    def _maven_metadata(self, path: str) -> Optional[bytes]:
+        """maven-metadata.xml for '{repo}/{group path}/{artifact}[/{version}]/maven-metadata.xml'"""
+        parts = path.split("/")[:-1]
+        for with_version in (False, True):
+            if len(parts) < (4 if with_version else 3):
+                continue
+            repository = parts[0]
+            artifact_id, version = (parts[-2], parts[-1]) if with_version else (parts[-1], None)
+            group_id = ".".join(parts[1:-2] if with_version else parts[1:-1])
+            matches = [a for a in self.artifacts.values()
+                       if (a.repository, a.group_id, a.artifact_id) == (repository, group_id, artifact_id)
+                       and (version is None or a.version == version)]
+            if not matches:
+                continue
+            if version is None:
+                versions = list(dict.fromkeys(a.version for a in matches))
+                releases = [v for v in versions if not v.endswith("-SNAPSHOT")]
+                body = (f"<versioning><latest>{versions[-1]}</latest>"
+                        + (f"<release>{releases[-1]}</release>" if releases else "")
+                        + "<versions>" + "".join(f"<version>{v}</version>" for v in versions) + "</versions>"
+                        + "</versioning>")
+            elif version.endswith("-SNAPSHOT"):
+                entries = []
+                prefix = re.escape(f"{artifact_id}-{version[:-len('SNAPSHOT')]}")
+                for a in matches:
+                    m = re.match(rf"^{prefix}(\d{{8}}\.\d{{6}})-(\d+)(?:-(.+?))?\.([^.]+)$", a.filename)
+                    if m:
+                        entries.append((m.group(1), m.group(2), m.group(3) or "", m.group(4)))
+                if not entries:
+                    continue
+                timestamp, build = max((e[0], int(e[1])) for e in entries)
+                body = (f"<versioning><snapshot><timestamp>{timestamp}</timestamp><buildNumber>{build}</buildNumber>"
+                        "</snapshot><snapshotVersions>"
+                        + "".join(f"<snapshotVersion><classifier>{c}</classifier><extension>{ext}</extension>"
+                                  f"<value>{version[:-len('SNAPSHOT')]}{ts}-{b}</value></snapshotVersion>"
+                                  for ts, b, c, ext in sorted(entries, reverse=True))
+                        + "</snapshotVersions></versioning>")
+            else:
+                continue
+            return (f'<?xml version="1.0" encoding="UTF-8"?>\n<metadata><groupId>{group_id}</groupId>'
+                    f"<artifactId>{artifact_id}</artifactId>"
+                    + (f"<version>{version}</version>" if version else "")
+                    + f"{body}</metadata>").encode("utf-8")
+        return None
+
+    def _handler_class(self):
+        nexus = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, fmt, *args):
+                pass
+
+            def _send_body(self, artifact: FakeArtifact, start: int, end: int):
+                pos = start
+                while pos <= end:
+                    chunk_end = min(end, pos + nexus.write_chunk - 1)
+                    chunk = artifact.read(pos, chunk_end)
+                    self.wfile.write(chunk)
+                    if nexus.bandwidth:
+                        time.sleep(len(chunk) / nexus.bandwidth)
+                    pos = chunk_end + 1
+
+            def _send_json(self, payload, status=200):
+                body = json.dumps(payload).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def _not_found(self):
+                self.send_response(404)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+
+            def _serve(self, head: bool):
+                delay = nexus._delay()
+                if delay:
+                    time.sleep(delay)
+                parsed = urllib.parse.urlsplit(self.path)
+                query = dict(urllib.parse.parse_qsl(parsed.query))
+
+                if parsed.path == "/service/rest/v1/search/assets":
+                    nexus._count("search")
+                    return self._send_json(nexus._search(query))
+
+                if not parsed.path.startswith("/repository/"):
+                    return self._not_found()
+                if parsed.path.endswith("/maven-metadata.xml"):
+                    nexus._count("metadata")
+                    body = nexus._maven_metadata(urllib.parse.unquote(parsed.path[len("/repository/"):]))
+                    if body is None:
+                        return self._not_found()
+                    etag = f'"{hashlib.sha1(body).hexdigest()}"'
+                    if self.headers.get("If-None-Match") == etag:
+                        self.send_response(304)
+                        self.send_header("ETag", etag)
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/xml")
+                    self.send_header("ETag", etag)
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    if not head:
+                        self.wfile.write(body)
+                    return
+                nexus._count("download")
+                artifact = nexus.artifacts.get(urllib.parse.unquote(parsed.path[len("/repository/"):]))
+                if artifact is None:
+                    return self._not_found()
+
+                if self.headers.get("If-None-Match") == artifact.etag:
+                    self.send_response(304)
+                    self.send_header("ETag", artifact.etag)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+
+                start, end, status = 0, artifact.size - 1, 200
+                match = _RANGE_RE.match(self.headers.get("Range", ""))
+                if match and (match.group(1) or match.group(2)):
+                    if match.group(1):
+                        start = int(match.group(1))
+                        end = min(int(match.group(2)), artifact.size - 1) if match.group(2) else artifact.size - 1
+                    else:
+                        start = max(0, artifact.size - int(match.group(2)))
+                    if start >= artifact.size or start > end:
+                        self.send_response(416)
+                        self.send_header("Content-Range", f"bytes */{artifact.size}")
+                        self.send_header("Content-Length", "0")
+                        self.end_headers()
+                        return
+                    status = 206
+
+                self.send_response(status)
+                self.send_header("Content-Type", "application/octet-stream")
+                self.send_header("ETag", artifact.etag)
+                self.send_header("Accept-Ranges", "bytes")
+                self.send_header("Content-Length", str(end - start + 1))
+                if status == 206:
+                    self.send_header("Content-Range", f"bytes {start}-{end}/{artifact.size}")
+                self.end_headers()
+                if not head:
+                    self._send_body(artifact, start, end)
+
+            def do_GET(self):
+                self._serve(head=False)
+
+            def do_HEAD(self):
+                self._serve(head=True)
+
+        return Handler
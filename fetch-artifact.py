@@ -1,7 +1,34 @@
+import os
 import requests
+import time
 import urllib.parse
 
-def download_from_nexus3(nexus_url, repository, group_id, artifact_id, version, packaging=None, classifier=None, username=None, password=None, download_path="."):
+from bandwidth import limited
+from maven_metadata import MavenMetadataResolver, MetadataNotFound, is_dynamic
+from metrics import DOWNLOAD_BYTES, HTTP_SECONDS
+from tracing import traced
+
+
+def _download_direct(http, url, auth, file_path, chunk_size):
+    """按仓库路径直接下载；文件不存在时返回 None"""
+    started = time.perf_counter()
+    with http.get(url, auth=auth, stream=True) as r:
+        HTTP_SECONDS.observe(time.perf_counter() - started, service="nexus", operation="download",
+                             status=r.status_code)
+        if r.status_code == 404:
+            return None
+        r.raise_for_status()
+        os.makedirs(os.path.dirname(file_path) or ".", exist_ok=True)
+        with open(file_path, "wb") as f:
+            for chunk in r.iter_content(chunk_size=chunk_size):
+                if chunk:
+                    f.write(chunk)
+                    DOWNLOAD_BYTES.inc(len(chunk), source="nexus")
+    return file_path
+
+
+@traced("nexus.download_from_nexus3", fields=("artifact_id", "version"))
+def download_from_nexus3(nexus_url, repository, group_id, artifact_id, version, packaging=None, classifier=None, username=None, password=None, download_path=".", chunk_size=8192, session=None, use_metadata=True):
     """
     从Nexus 3下载文件
     
@@ -10,17 +37,23 @@ def download_from_nexus3(nexus_url, repository, group_id, artifact_id, version,
     repository: 仓库名称
     group_id: 组ID (例如: com.example)
     artifact_id: 构件ID (例如: my-artifact)
-    version: 版本号
+    version: 版本号 (也可以是 LATEST、RELEASE 或 x.y.z-SNAPSHOT)
     packaging: 文件类型 (例如: jar, war, pom, 默认为jar)
     classifier: 分类器 (例如: sources, javadoc)
     username: Nexus用户名 (可选)
     password: Nexus密码 (可选)
     download_path: 下载目录 (默认为当前目录)
+    chunk_size: 下载时每次读取的字节数 (默认8192)
+    session: 复用连接池的 requests.Session (可选)
+    use_metadata: 先通过 maven-metadata.xml 解析版本并按仓库路径直接下载，搜索 API 仅作后备 (默认True)
     """
     
     # 设置默认值
     if packaging is None:
         packaging = "jar"
+
+    # 设置了带宽限制时 (NEXUS_MAX_BANDWIDTH / NEXUS_MAX_REQUESTS)，所有请求都经过进程级限速器
+    session = limited(session)
     
     # 构建搜索URL
     search_url = f"{nexus_url}/service/rest/v1/search/assets"
@@ -35,15 +68,46 @@ def download_from_nexus3(nexus_url, repository, group_id, artifact_id, version,
     
     if classifier:
         params["maven.classifier"] = classifier
+
+    # 动态版本：搜索 API 按版本倒序返回，取第一个匹配的文件
+    if version.upper() in ("LATEST", "RELEASE"):
+        del params["version"]
+        params.update(sort="version", direction="desc")
+        if version.upper() == "RELEASE":
+            params["prerelease"] = "false"
+    elif version.endswith("-SNAPSHOT"):
+        del params["version"]
+        params.update({"maven.baseVersion": version, "sort": "version", "direction": "desc"})
     
+    http = session or requests
+
     # 认证信息
     auth = None
     if username and password:
         auth = (username, password)
+
+    # 快速路径：maven-metadata.xml 解析出具体文件名后直接下载，避免走搜索 API
+    if use_metadata:
+        try:
+            resolved = MavenMetadataResolver(nexus_url, repository, username, password, session).resolve(
+                group_id, artifact_id, version, packaging, classifier)
+            file_path = _download_direct(http, f"{nexus_url}/repository/{repository}/{resolved.path}", auth,
+                                         os.path.join(download_path, resolved.filename), chunk_size)
+            if file_path:
+                print(f"下载成功: {file_path}")
+                return file_path
+            print(f"仓库路径不存在: {resolved.path}，改用搜索 API")
+        except MetadataNotFound as e:
+            print(f"{e}，改用搜索 API")
+        except requests.exceptions.RequestException as e:
+            print(f"直接下载失败: {e}，改用搜索 API")
     
     try:
         # 搜索构件
-        response = requests.get(search_url, params=params, auth=auth)
+        started = time.perf_counter()
+        response = http.get(search_url, params=params, auth=auth)
+        HTTP_SECONDS.observe(time.perf_counter() - started, service="nexus", operation="search",
+                             status=response.status_code)
         response.raise_for_status()
         
         data = response.json()
@@ -57,12 +121,39 @@ def download_from_nexus3(nexus_url, repository, group_id, artifact_id, version,
             download_url = item["downloadUrl"]
             
             # 检查是否匹配packaging和classifier
-            if packaging and packaging not in download_url:
-                
+            if packaging and not download_url.endswith(f".{packaging}"):
+                continue
+            if classifier and f"-{classifier}." not in download_url:
+                continue
+            
+            # 下载文件
+            os.makedirs(download_path, exist_ok=True)
+            file_path = os.path.join(download_path, download_url.split("/")[-1])
+            started = time.perf_counter()
+            with http.get(download_url, auth=auth, stream=True) as r:
+                HTTP_SECONDS.observe(time.perf_counter() - started, service="nexus", operation="download",
+                                     status=r.status_code)
+                r.raise_for_status()
+                with open(file_path, "wb") as f:
+                    for chunk in r.iter_content(chunk_size=chunk_size):
+                        if chunk:
+                            f.write(chunk)
+                            DOWNLOAD_BYTES.inc(len(chunk), source="nexus")
+            print(f"下载成功: {file_path}")
+            return file_path
+        
+        print(f"未找到匹配的文件: {group_id}:{artifact_id}:{version} ({packaging})")
+        return False
+    
+    except requests.exceptions.RequestException as e:
+        print(f"下载失败: {e}")
+        return False
+
 import requests
 import os
 
-def download_from_nexus(base_url, repository, group_id, artifact_id, version, packaging="jar", classifier=None, username=None, password=None, output_dir="."):
+@traced("nexus.download_from_nexus", fields=("artifact_id", "version"))
+def download_from_nexus(base_url, repository, group_id, artifact_id, version, packaging="jar", classifier=None, username=None, password=None, output_dir=".", chunk_size=8192, session=None):
     """
     从 Nexus3 下载 artifact 文件
 
@@ -70,38 +161,63 @@ def download_from_nexus(base_url, repository, group_id, artifact_id, version, pa
     :param repository: Nexus 仓库名，例如 "maven-releases"
     :param group_id: Maven groupId，例如 "com.example"
     :param artifact_id: Maven artifactId，例如 "demo-app"
-    :param version: 版本号，例如 "1.0.0"
+    :param version: 版本号，例如 "1.0.0"；LATEST、RELEASE 和 SNAPSHOT 通过 maven-metadata.xml 解析
     :param packaging: 文件类型，例如 "jar", "zip" (默认 jar)
     :param classifier: 可选的 classifier，例如 "sources"
     :param username: Nexus 用户名（如需要认证）
     :param password: Nexus 密码（如需要认证）
     :param output_dir: 下载目录，默认当前目录
+    :param chunk_size: 下载时每次读取的字节数，默认 8192
+    :param session: 复用连接池的 requests.Session（可选）
     :return: 下载文件的本地路径
     """
     
+    # 设置了带宽限制时，所有请求都经过进程级限速器
+    session = limited(session)
+
     # groupId 转路径形式
     group_path = group_id.replace(".", "/")
+    version_dir = version
     
     # 构造文件名
-    if classifier:
+    if is_dynamic(version):
+        # LATEST / RELEASE / SNAPSHOT：由 maven-metadata.xml 得到具体文件名，缺失时退回搜索 API
+        try:
+            resolved = MavenMetadataResolver(base_url, repository, username, password, session).resolve(
+                group_id, artifact_id, version, packaging, classifier)
+        except MetadataNotFound as e:
+            print(f"⚠️ {e}，改用搜索 API")
+            file_path = download_from_nexus3(base_url, repository, group_id, artifact_id, version, packaging=packaging,
+                                             classifier=classifier, username=username, password=password,
+                                             download_path=output_dir, chunk_size=chunk_size, session=session,
+                                             use_metadata=False)
+            if not file_path:
+                raise Exception(f"❌ 下载失败: 未找到 {group_id}:{artifact_id}:{version}")
+            return file_path
+        filename, version_dir = resolved.filename, resolved.base_version
+    elif classifier:
         filename = f"{artifact_id}-{version}-{classifier}.{packaging}"
     else:
         filename = f"{artifact_id}-{version}.{packaging}"
     
     # 拼接下载 URL
-    url = f"{base_url}/repository/{repository}/{group_path}/{artifact_id}/{version}/{filename}"
+    url = f"{base_url}/repository/{repository}/{group_path}/{artifact_id}/{version_dir}/{filename}"
 
     # 下载
     auth = (username, password) if username and password else None
-    response = requests.get(url, auth=auth, stream=True)
+    started = time.perf_counter()
+    response = (session or requests).get(url, auth=auth, stream=True)
+    HTTP_SECONDS.observe(time.perf_counter() - started, service="nexus", operation="download",
+                         status=response.status_code)
 
     if response.status_code == 200:
         os.makedirs(output_dir, exist_ok=True)
         file_path = os.path.join(output_dir, filename)
         with open(file_path, "wb") as f:
-            for chunk in response.iter_content(chunk_size=8192):
+            for chunk in response.iter_content(chunk_size=chunk_size):
                 if chunk:
                     f.write(chunk)
+                    DOWNLOAD_BYTES.inc(len(chunk), source="nexus")
         print(f"✅ 下载成功: {file_path}")
         return file_path
     else:
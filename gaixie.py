@@ -5,13 +5,23 @@ import urllib.request
 import plistlib
 from pathlib import Path
 
+from metrics import DOWNLOAD_BYTES
+from tracing import traced
+
+
+# Agent downloads; point DYNATRACE_AGENT_DOWNLOAD_URL at a mirror (or a local stub) to override
+AGENT_DOWNLOAD_URL = "https://mobileagent.downloads.dynatrace.com"
+
 
 class DynatraceSymbolManager:
-    def __init__(self, client_version: str, signature: str = "Dynatrace Installer", verbose: bool = True):
+    def __init__(self, client_version: str, signature: str = "Dynatrace Installer", verbose: bool = True,
+                 download_url: str = None):
         self.client_version = client_version
         self.signature = signature
         self.verbose = verbose
         self.base_build_dir = Path(f"build/Dynatrace/{client_version}")
+        self.download_url = (download_url or os.environ.get("DYNATRACE_AGENT_DOWNLOAD_URL")
+                             or AGENT_DOWNLOAD_URL).rstrip("/")
 
     # ----------------------------
     # Helper methods
@@ -57,6 +67,7 @@ class DynatraceSymbolManager:
     # Public functions
     # ----------------------------
 
+    @traced("xcode.select")
     def select_xcode(self) -> str:
         """Find local Xcode matching Dynatrace DTPlatformBuild"""
         dynatrace_xcode = self._get_dynatrace_xcode_version()
@@ -75,13 +86,16 @@ class DynatraceSymbolManager:
         self._log(f"Using fallback Xcode from xcode-select: {fallback}")
         return fallback
 
+    @traced("client.fetch")
     def _fetch_file(self, url: str, dest: Path):
         """Download file"""
         self._log(f"⬇️  Downloading {url} -> {dest}")
         dest.parent.mkdir(parents=True, exist_ok=True)
         urllib.request.urlretrieve(url, dest)
+        DOWNLOAD_BYTES.inc(dest.stat().st_size, source="dynatrace_client")
         self._log("✅ Download complete.")
 
+    @traced("client.unzip")
     def _unzip_file(self, zip_path: Path, target_dir: Path):
         """Unzip file"""
         self._log(f"📦 Unzipping {zip_path} -> {target_dir}")
@@ -89,28 +103,31 @@ class DynatraceSymbolManager:
             zip_ref.extractall(target_dir)
         self._log("✅ Unzip complete.")
 
-    def install_client(self) -> str:
-        """Install Dynatrace Symbol Service Client and fix LLDB symlink"""
+    @traced("client.download")
+    def download_client(self) -> Path:
+        """Download and unpack Dynatrace Symbol Service Client if missing"""
         client_script = self.base_build_dir / "ios" / "agent" / "Dynatrace.framework" / "Info.plist"
 
-        # Download if missing
         if client_script.exists():
             self._log("✅ Dynatrace symbol service client already installed.")
         else:
             self._log(f"{self.signature}: Installing symbol service client...")
             client_file = Path("SymbolServiceClient.zip")
             client_url = (
-                f"https://mobileagent.downloads.dynatrace.com/ios/"
+                f"{self.download_url}/ios/"
                 f"{self.client_version}/dynatrace-mobile-agent-ios-{self.client_version}.zip"
             )
             self._fetch_file(client_url, client_file)
             self._unzip_file(client_file, self.base_build_dir)
             client_file.unlink(missing_ok=True)
 
-        # Match Xcode
-        developer_dir = self.select_xcode()
+        return client_script
+
+    @traced("client.link_lldb")
+    def link_lldb(self, developer_dir: str) -> Path:
+        """Fix LLDB.framework symlink to point at the selected Xcode"""
+        client_script = self.base_build_dir / "ios" / "agent" / "Dynatrace.framework" / "Info.plist"
 
-        # Fix LLDB.framework link
         self._log("🔗 Fixing LLDB.framework symlink...")
         lldb_framework = Path(developer_dir.replace("/Developer", "/SharedFrameworks/LLDB.framework"))
         target_softlink = client_script.parent.parent / "LLDB.framework"
@@ -120,6 +137,18 @@ class DynatraceSymbolManager:
 
         os.symlink(lldb_framework, target_softlink)
         self._log(f"✅ Linked {lldb_framework} -> {target_softlink}")
+        return target_softlink
+
+    @traced("client.install")
+    def install_client(self) -> str:
+        """Install Dynatrace Symbol Service Client and fix LLDB symlink"""
+        self.download_client()
+
+        # Match Xcode
+        developer_dir = self.select_xcode()
+
+        # We always do this part, since upgrading Xcode will break it
+        self.link_lldb(developer_dir)
 
         return developer_dir
 
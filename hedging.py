@@ -0,0 +1,161 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError, wait
+from typing import Deque, Dict, Optional
+
+import requests
+
+from metrics import HEDGED_REQUESTS
+
+IDEMPOTENT_METHODS = ("GET", "HEAD")
+
+
+class LatencyTracker:
+    """Recent response times; the hedge delay is a percentile of them"""
+
+    def __init__(self, window: int = 200, percentile: float = 0.95, min_samples: int = 20,
+                 initial_delay: float = 0.25, min_delay: float = 0.01):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self._samples: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self._lock:
+            self._samples.append(seconds)
+
+    def delay(self) -> float:
+        """Seconds to wait before hedging (initial_delay until min_samples are recorded)"""
+        with self._lock:
+            if len(self._samples) < self.min_samples:
+                return self.initial_delay
+            ordered = sorted(self._samples)
+        index = min(len(ordered) - 1, int(self.percentile * len(ordered)))
+        return max(self.min_delay, ordered[index])
+
+
+class HedgedSession:
+    """
+    requests.Session wrapper that hedges idempotent requests.
+
+    A GET/HEAD that has not returned within the tracker's percentile of recent
+    response times is sent a second time; the first successful response wins
+    and the other is cancelled (or closed once it arrives). Only time to
+    response headers is hedged, so with stream=True no body is read twice.
+    Hedges are capped at `max_hedge_ratio` of requests so a slow Nexus is not
+    hit with double load. Everything else is passed to the wrapped session,
+    so it can be handed to any `session=` parameter.
+
+    Usage:
+        session = HedgedSession(requests.Session())
+        download_from_nexus(..., session=session)
+        session.print_stats()
+    """
+
+    def __init__(self, session: Optional[requests.Session] = None, tracker: Optional[LatencyTracker] = None,
+                 max_hedge_ratio: float = 0.1, max_workers: int = 16):
+        self.session = session or requests.Session()
+        self.tracker = tracker or LatencyTracker()
+        self.max_hedge_ratio = max_hedge_ratio
+        self.stats: Dict[str, int] = {"requests": 0, "hedged": 0, "hedge_wins": 0, "over_budget": 0}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+    # ----------------------------
+    # Helper methods
+    # ----------------------------
+
+    def _send(self, method: str, url: str, kwargs: dict):
+        started = time.perf_counter()
+        response = self.session.request(method, url, **kwargs)
+        return response, time.perf_counter() - started
+
+    def _record_primary(self, future):
+        # Every primary's time is recorded, won or lost, so the percentile is not skewed by hedging
+        if not future.cancelled() and future.exception() is None:
+            self.tracker.record(future.result()[1])
+
+    @staticmethod
+    def _discard(future):
+        if future.cancel():
+            return
+        future.add_done_callback(lambda f: f.exception() is None and f.result()[0].close())
+
+    def _count(self, outcome: str, *keys: str):
+        with self._lock:
+            self.stats["requests"] += 1
+            for key in keys:
+                self.stats[key] += 1
+        HEDGED_REQUESTS.inc(outcome=outcome)
+
+    def _within_budget(self) -> bool:
+        with self._lock:
+            return self.stats["hedged"] < self.max_hedge_ratio * (self.stats["requests"] + 1)
+
+    # ----------------------------
+    # Public functions
+    # ----------------------------
+
+    def request(self, method: str, url: str, **kwargs) -> requests.Response:
+        if method.upper() not in IDEMPOTENT_METHODS:
+            return self.session.request(method, url, **kwargs)
+
+        primary = self._pool.submit(self._send, method, url, kwargs)
+        primary.add_done_callback(self._record_primary)
+        try:
+            response = primary.result(timeout=self.tracker.delay())[0]
+            self._count("not_hedged")
+            return response
+        except TimeoutError:
+            pass
+
+        if not self._within_budget():
+            self._count("over_budget", "over_budget")
+            return primary.result()[0]
+
+        hedge = self._pool.submit(self._send, method, url, kwargs)
+        pending = {primary, hedge}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            winner = next((f for f in done if f.exception() is None), None)
+            if winner is None:
+                continue
+            for future in (primary, hedge):
+                if future is not winner:
+                    self._discard(future)
+            if winner is hedge:
+                self._count("hedge_won", "hedged", "hedge_wins")
+            else:
+                self._count("primary_won", "hedged")
+            return winner.result()[0]
+
+        # both failed: surface the primary's error
+        self._count("failed", "hedged")
+        return primary.result()[0]
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("allow_redirects", True)
+        return self.request("GET", url, **kwargs)
+
+    def head(self, url: str, **kwargs) -> requests.Response:
+        kwargs.setdefault("allow_redirects", False)
+        return self.request("HEAD", url, **kwargs)
+
+    def hedge_rate(self) -> float:
+        return self.stats["hedged"] / self.stats["requests"] if self.stats["requests"] else 0.0
+
+    def print_stats(self):
+        hedged = self.stats["hedged"]
+        print(f"🔀 Hedging: {self.stats['requests']} request(s), {hedged} hedged ({self.hedge_rate():.1%}), "
+              f"hedge won {self.stats['hedge_wins']}/{hedged}, {self.stats['over_budget']} over budget, "
+              f"delay now {self.tracker.delay() * 1000:.0f} ms")
+
+    def close(self):
+        self._pool.shutdown(wait=False)
+        self.session.close()
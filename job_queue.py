@@ -0,0 +1,520 @@
+import json
+import os
+import socket
+import sqlite3
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from metrics import QUEUE_DEPTH, QUEUE_JOBS, QUEUE_WAIT_SECONDS
+
+# Lower runs first: prod releases are not held up by dev ones
+PRIORITIES = {"prod": 0, "pat": 1, "dev": 2}
+KINDS = ("release", "fetch", "preprocess", "upload")
+STATUSES = ("queued", "leased", "done", "failed")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id            INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind          TEXT    NOT NULL,
+    environment   TEXT    NOT NULL,
+    priority      INTEGER NOT NULL,
+    payload       TEXT    NOT NULL,
+    dedupe_key    TEXT    NOT NULL,
+    status        TEXT    NOT NULL DEFAULT 'queued',
+    attempts      INTEGER NOT NULL DEFAULT 0,
+    max_attempts  INTEGER NOT NULL DEFAULT 3,
+    enqueued_at   REAL    NOT NULL,
+    available_at  REAL    NOT NULL,
+    started_at    REAL,
+    finished_at   REAL,
+    lease_owner   TEXT,
+    lease_expires REAL,
+    result        TEXT,
+    error         TEXT
+);
+CREATE INDEX IF NOT EXISTS jobs_ready ON jobs (status, priority, available_at, id);
+CREATE INDEX IF NOT EXISTS jobs_dedupe ON jobs (dedupe_key, status);
+"""
+
+
+class Job:
+    """One claimed work item"""
+
+    def __init__(self, row: sqlite3.Row):
+        self.id = row["id"]
+        self.kind = row["kind"]
+        self.environment = row["environment"]
+        self.priority = row["priority"]
+        self.payload: Dict[str, Any] = json.loads(row["payload"])
+        self.attempts = row["attempts"]
+        self.max_attempts = row["max_attempts"]
+        self.enqueued_at = row["enqueued_at"]
+        self.available_at = row["available_at"]
+        self.started_at = row["started_at"]
+        self.lease_owner = row["lease_owner"]
+
+    def __repr__(self):
+        return f"Job({self.id}, {self.kind!r}, {self.environment!r}, attempt {self.attempts}/{self.max_attempts})"
+
+
+class JobQueue:
+    """
+    Durable priority queue of upload work in a SQLite file.
+
+    Jobs are claimed with a lease: the claiming worker must heartbeat before
+    the lease expires, otherwise the job is handed to the next claimer (so a
+    crashed or killed worker never strands a job). Claims run in a write
+    transaction, so several processes can share the file safely.
+
+    Only non-secret job parameters are stored; workers take Nexus and
+    Dynatrace credentials from their own environment.
+    """
+
+    def __init__(self, path: str = ".job-queue.db", lease_seconds: float = 300.0, retry_delay: float = 30.0,
+                 verbose: bool = True):
+        self.path = os.path.abspath(path)
+        self.lease_seconds = lease_seconds
+        self.retry_delay = retry_delay
+        self.verbose = verbose
+        self._local = threading.local()
+        self._connection().executescript(SCHEMA)
+
+    # ----------------------------
+    # Helper methods
+    # ----------------------------
+
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
+
+    def _connection(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        db = getattr(self._local, "db", None)
+        if db is None:
+            db = sqlite3.connect(self.path, timeout=30.0, isolation_level=None)
+            db.row_factory = sqlite3.Row
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("PRAGMA synchronous=NORMAL")
+            self._local.db = db
+        return db
+
+    @contextmanager
+    def _transaction(self):
+        db = self._connection()
+        # IMMEDIATE takes the write lock up front, so two claimers never pick the same row
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            yield db
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        db.execute("COMMIT")
+
+    @staticmethod
+    def _dedupe_key(kind: str, environment: str, payload: Dict[str, Any]) -> str:
+        return f"{kind}|{environment}|{json.dumps(payload, sort_keys=True)}"
+
+    def _recover(self, db: sqlite3.Connection, now: float) -> int:
+        """Release expired leases: requeue, or fail once the attempts are used up"""
+        expired = db.execute("SELECT id, attempts, max_attempts, lease_owner FROM jobs "
+                             "WHERE status = 'leased' AND lease_expires < ?", (now,)).fetchall()
+        for row in expired:
+            if row["attempts"] >= row["max_attempts"]:
+                db.execute("UPDATE jobs SET status = 'failed', finished_at = ?, lease_owner = NULL, "
+                           "lease_expires = NULL, error = ? WHERE id = ?",
+                           (now, f"lease expired (worker {row['lease_owner']})", row["id"]))
+                QUEUE_JOBS.inc(outcome="failed")
+            else:
+                db.execute("UPDATE jobs SET status = 'queued', available_at = ?, lease_owner = NULL, "
+                           "lease_expires = NULL WHERE id = ?", (now, row["id"]))
+                QUEUE_JOBS.inc(outcome="recovered")
+            self._log(f"♻️  Job {row['id']}: lease of {row['lease_owner']} expired, "
+                      f"{'giving up' if row['attempts'] >= row['max_attempts'] else 'requeued'}")
+        return len(expired)
+
+    # ----------------------------
+    # Public functions
+    # ----------------------------
+
+    def enqueue(self, kind: str, environment: str, payload: Dict[str, Any], priority: Optional[int] = None,
+                max_attempts: int = 3) -> int:
+        """
+        Add a job unless the same job is already queued or running.
+
+        Args:
+            kind: One of KINDS
+            environment: dev, pat or prod
+            payload: JSON-serializable job parameters (no secrets)
+            priority: Lower runs first; defaults to the environment's PRIORITIES entry
+
+        Returns:
+            int: ID of the new job, or of the identical pending one
+        """
+        if kind not in KINDS:
+            raise ValueError(f"Unknown job kind: {kind}")
+        if priority is None:
+            priority = PRIORITIES.get(environment, max(PRIORITIES.values()) + 1)
+        key = self._dedupe_key(kind, environment, payload)
+        now = time.time()
+        with self._transaction() as db:
+            row = db.execute("SELECT id FROM jobs WHERE dedupe_key = ? AND status IN ('queued', 'leased')",
+                             (key,)).fetchone()
+            if row:
+                self._log(f"⏭️  Job {row['id']} already pending: {kind} {environment}")
+                return row["id"]
+            cursor = db.execute("INSERT INTO jobs (kind, environment, priority, payload, dedupe_key, max_attempts, "
+                                "enqueued_at, available_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                                (kind, environment, priority, json.dumps(payload), key, max_attempts, now, now))
+        QUEUE_JOBS.inc(outcome="enqueued")
+        return cursor.lastrowid
+
+    def claim(self, worker: str, kinds: Optional[List[str]] = None) -> Optional[Job]:
+        """
+        Lease the most urgent ready job (lowest priority, then oldest).
+
+        Returns:
+            Job, or None if nothing is ready
+        """
+        now = time.time()
+        kinds = list(kinds or KINDS)
+        with self._transaction() as db:
+            self._recover(db, now)
+            row = db.execute(f"SELECT * FROM jobs WHERE status = 'queued' AND available_at <= ? "
+                             f"AND kind IN ({', '.join('?' * len(kinds))}) "
+                             f"ORDER BY priority, enqueued_at, id LIMIT 1", (now, *kinds)).fetchone()
+            if row is None:
+                return None
+            db.execute("UPDATE jobs SET status = 'leased', attempts = attempts + 1, lease_owner = ?, "
+                       "lease_expires = ?, started_at = ? WHERE id = ?",
+                       (worker, now + self.lease_seconds, now, row["id"]))
+            row = db.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],)).fetchone()
+        job = Job(row)
+        # from when the job became ready, so retry backoff is not counted as waiting
+        QUEUE_WAIT_SECONDS.observe(now - job.available_at, environment=job.environment, kind=job.kind)
+        return job
+
+    def heartbeat(self, job: Job) -> bool:
+        """Extend the lease; False if the job was already handed to another worker"""
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE jobs SET lease_expires = ? WHERE id = ? AND status = 'leased' "
+                                "AND lease_owner = ?", (time.time() + self.lease_seconds, job.id, job.lease_owner))
+        return cursor.rowcount == 1
+
+    def complete(self, job: Job, result: Any = None) -> bool:
+        """Mark the job done; False if the lease was lost meanwhile"""
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE jobs SET status = 'done', finished_at = ?, result = ?, error = NULL, "
+                                "lease_owner = NULL, lease_expires = NULL "
+                                "WHERE id = ? AND status = 'leased' AND lease_owner = ?",
+                                (time.time(), json.dumps(result, default=str), job.id, job.lease_owner))
+        if cursor.rowcount != 1:
+            return False
+        QUEUE_JOBS.inc(outcome="done")
+        return True
+
+    def fail(self, job: Job, error: str, retry: bool = True) -> str:
+        """
+        Record a failed attempt.
+
+        The job is requeued with exponential backoff until max_attempts,
+        then marked failed.
+
+        Returns:
+            str: The job's new status ('queued' or 'failed'), or 'lost' if the lease was lost meanwhile
+        """
+        now = time.time()
+        status = "queued" if retry and job.attempts < job.max_attempts else "failed"
+        available_at = now + self.retry_delay * 2 ** (job.attempts - 1)
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE jobs SET status = ?, available_at = ?, finished_at = ?, error = ?, "
+                                "lease_owner = NULL, lease_expires = NULL WHERE id = ? AND status = 'leased' "
+                                "AND lease_owner = ?",
+                                (status, available_at, now if status == "failed" else None, error, job.id,
+                                 job.lease_owner))
+        if cursor.rowcount != 1:
+            return "lost"
+        QUEUE_JOBS.inc(outcome="retried" if status == "queued" else "failed")
+        return status
+
+    def recover(self) -> int:
+        """Requeue jobs whose worker stopped heartbeating; returns how many"""
+        with self._transaction() as db:
+            return self._recover(db, time.time())
+
+    def requeue_failed(self) -> int:
+        """Give failed jobs a fresh set of attempts"""
+        now = time.time()
+        with self._transaction() as db:
+            cursor = db.execute("UPDATE jobs SET status = 'queued', attempts = 0, available_at = ?, "
+                                "finished_at = NULL WHERE status = 'failed'", (now,))
+        return cursor.rowcount
+
+    def pending(self) -> int:
+        """Jobs queued or running"""
+        row = self._connection().execute(
+            "SELECT COUNT(*) FROM jobs WHERE status IN ('queued', 'leased')").fetchone()
+        return row[0]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Queue depth and wait times, also published as metrics.
+
+        Returns:
+            dict: {"depth": {env: {status: n}}, "oldest_wait": {env: seconds}, "failed": [...]}
+        """
+        db = self._connection()
+        now = time.time()
+        depth: Dict[str, Dict[str, int]] = {}
+        for row in db.execute("SELECT environment, status, COUNT(*) AS n FROM jobs GROUP BY environment, status"):
+            depth.setdefault(row["environment"], dict.fromkeys(STATUSES, 0))[row["status"]] = row["n"]
+        for environment, counts in depth.items():
+            for status, count in counts.items():
+                QUEUE_DEPTH.set(count, environment=environment, status=status)
+
+        oldest_wait = {row["environment"]: now - row["oldest"] for row in db.execute(
+            "SELECT environment, MIN(enqueued_at) AS oldest FROM jobs WHERE status = 'queued' GROUP BY environment")}
+        waits = {row["environment"]: row["wait"] for row in db.execute(
+            "SELECT environment, AVG(started_at - enqueued_at) AS wait FROM jobs "
+            "WHERE started_at IS NOT NULL AND status = 'done' GROUP BY environment")}
+        failed = [dict(row) for row in db.execute(
+            "SELECT id, kind, environment, attempts, error FROM jobs WHERE status = 'failed' ORDER BY id")]
+        return {"depth": depth, "oldest_wait": oldest_wait, "average_wait": waits, "failed": failed}
+
+    def print_stats(self):
+        stats = self.stats()
+        print("\n=== Job Queue ===")
+        if not stats["depth"]:
+            print("empty")
+        for environment in sorted(stats["depth"], key=lambda e: PRIORITIES.get(e, len(PRIORITIES))):
+            counts = stats["depth"][environment]
+            line = "  ".join(f"{status}: {counts[status]}" for status in STATUSES)
+            oldest = stats["oldest_wait"].get(environment)
+            average = stats["average_wait"].get(environment)
+            print(f"{environment:<5} {line}"
+                  + (f"  oldest queued: {oldest:.0f}s" if oldest is not None else "")
+                  + (f"  avg wait: {average:.1f}s" if average is not None else ""))
+        for job in stats["failed"]:
+            print(f"❌ Job {job['id']} ({job['kind']} {job['environment']}, {job['attempts']} attempt(s)): "
+                  f"{job['error']}")
+
+    def close(self):
+        db = getattr(self._local, "db", None)
+        if db is not None:
+            db.close()
+            self._local.db = None
+
+
+class JobHandlers:
+    """
+    Run queue jobs with the existing flow: one ReleaseFlow per environment,
+    so the Nexus session, ledger and client installs are shared by every job.
+
+    Dynatrace tokens come from $DT_API_TOKEN_<ENV> (e.g. DT_API_TOKEN_PROD),
+    falling back to $DT_API_TOKEN.
+    """
+
+    def __init__(self, nexus_url: str, username: Optional[str] = None, password: Optional[str] = None,
+                 repository: str = "maven-releases", work_dir: str = ".", ledger=None, session=None,
+                 client_version: Optional[str] = None, dynatrace_url: Optional[str] = None):
+        self.nexus_url = nexus_url
+        self.username = username
+        self.password = password
+        self.repository = repository
+        self.work_dir = work_dir
+        self.ledger = ledger
+        self.session = session
+        self.client_version = client_version
+        self.dynatrace_url = dynatrace_url
+        self._flows: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def token_for(environment: str) -> Optional[str]:
+        return os.environ.get(f"DT_API_TOKEN_{environment.upper()}") or os.environ.get("DT_API_TOKEN")
+
+    def flow(self, environment: str):
+        from release_flow import ReleaseFlow
+
+        with self._lock:
+            if environment not in self._flows:
+                token = self.token_for(environment)
+                if not token:
+                    raise ValueError(f"No Dynatrace API token for {environment} "
+                                     f"(DT_API_TOKEN_{environment.upper()} or DT_API_TOKEN)")
+                self._flows[environment] = ReleaseFlow(
+                    self.nexus_url, environment, token, repository=self.repository, username=self.username,
+                    password=self.password, client_version=self.client_version, work_dir=self.work_dir,
+                    ledger=self.ledger, session=self.session, dynatrace_url=self.dynatrace_url)
+            return self._flows[environment]
+
+    # ----------------------------
+    # Job kinds
+    # ----------------------------
+
+    def release(self, job: Job) -> Dict[str, Any]:
+        """Whole flow for one release: group_id, artifact_id, version_id, platform[, client_version]"""
+        p = job.payload
+        flow = self.flow(job.environment)
+        runner = flow.make_runner(p["platform"], p.get("client_version"), p["version_id"])
+        context = runner.run(**flow.initial_inputs(p["group_id"], p["artifact_id"], p["version_id"],
+                                                   p["platform"], p.get("client_version")))
+        return {"uploaded": bool(context.get("uploaded")), "artifact_path": context.get("artifact_path")}
+
+    def fetch(self, job: Job) -> Dict[str, Any]:
+        """Download one artifact: group_id, artifact_id, version_id, packaging[, classifier, output_dir]"""
+        from script_loader import load_script
+
+        p = job.payload
+        path = load_script("fetch-artifact.py").download_from_nexus(
+            self.nexus_url, p.get("repository", self.repository), p["group_id"], p["artifact_id"], p["version_id"],
+            packaging=p.get("packaging", "zip"), classifier=p.get("classifier"), username=self.username,
+            password=self.password, output_dir=p.get("output_dir", self.work_dir), session=self.session)
+        if not path:
+            raise RuntimeError(f"{p['group_id']}:{p['artifact_id']}:{p['version_id']} not downloaded")
+        return {"path": path}
+
+    def preprocess(self, job: Job) -> Dict[str, Any]:
+        """Zip .dSYM bundles for upload: sources, output[, level]"""
+        from dsym_packager import package_dsym
+
+        p = job.payload
+        report = package_dsym(p["sources"], p["output"], level=p.get("level", 6), verbose=False)
+        return report.to_dict()
+
+    def upload(self, job: Job) -> Dict[str, Any]:
+        """
+        Upload a prepared file: platform, file, application_id, package_name,
+        version_code, version_name[, client_version (ios)]
+        """
+        p = job.payload
+        flow = self.flow(job.environment)
+        metadata = {key: p[key] for key in ("application_id", "package_name", "version_code", "version_name")}
+        developer_dir = None
+        if p["platform"] == "ios":
+            client_version = p.get("client_version") or self.client_version
+            if not client_version:
+                raise ValueError("client_version is required for iOS")
+            developer_dir = flow.install_client(client_version)
+        return {"uploaded": bool(flow.upload(metadata, p["file"], p["platform"], developer_dir=developer_dir))}
+
+    def as_dict(self) -> Dict[str, Callable[[Job], Any]]:
+        return {kind: getattr(self, kind) for kind in KINDS}
+
+
+class WorkerPool:
+    """
+    Threads that claim and run jobs until stopped (or, with drain, until the
+    queue is empty). One heartbeat thread keeps every running job's lease
+    alive; if the process dies, the leases lapse and another worker
+    recovers the jobs.
+    """
+
+    def __init__(self, queue: JobQueue, handlers: Dict[str, Callable[[Job], Any]], workers: int = 4,
+                 poll_interval: float = 1.0, permanent_errors: Tuple[type, ...] = (ValueError, KeyError),
+                 verbose: bool = True):
+        self.queue = queue
+        self.handlers = handlers
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.permanent_errors = permanent_errors
+        self.verbose = verbose
+        self.processed = {"done": 0, "retried": 0, "failed": 0, "lost": 0}
+        self._name = f"{socket.gethostname()}:{os.getpid()}"
+        self._running: Dict[int, Job] = {}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
+
+    def _heartbeat(self):
+        interval = max(1.0, self.queue.lease_seconds / 3)
+        while not self._stop.wait(interval):
+            with self._lock:
+                jobs = list(self._running.values())
+            for job in jobs:
+                if not self.queue.heartbeat(job):
+                    self._log(f"⚠️ Job {job.id}: lease lost, another worker may run it again")
+
+    def _run_one(self, job: Job):
+        started = time.perf_counter()
+        with self._lock:
+            self._running[job.id] = job
+        try:
+            result = self.handlers[job.kind](job)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            status = self.queue.fail(job, error, retry=not isinstance(e, self.permanent_errors))
+            status = "retried" if status == "queued" else status
+            if status == "lost":
+                self._log(f"⚠️ Job {job.id}: failed after its lease was lost ({error})")
+            else:
+                icon = "🔁" if status == "retried" else "❌"
+                self._log(f"{icon} Job {job.id} {job.kind} {job.environment}: {error} ({status})")
+        else:
+            if self.queue.complete(job, result):
+                status = "done"
+                self._log(f"✅ Job {job.id} {job.kind} {job.environment} in {time.perf_counter() - started:.1f}s")
+            else:
+                status = "lost"
+                self._log(f"⚠️ Job {job.id}: finished after its lease was lost, another worker may run it again")
+        finally:
+            with self._lock:
+                self._running.pop(job.id, None)
+        with self._lock:
+            self.processed[status] += 1
+
+    def _work(self, index: int, drain: bool):
+        worker = f"{self._name}:{index}"
+        kinds = [kind for kind in KINDS if kind in self.handlers]
+        while not self._stop.is_set():
+            job = self.queue.claim(worker, kinds)
+            if job is None:
+                if drain and self.queue.pending() == 0:
+                    return
+                self._stop.wait(self.poll_interval)
+                continue
+            self._log(f"▶️  Job {job.id} {job.kind} {job.environment} "
+                      f"(waited {job.started_at - job.available_at:.1f}s, attempt {job.attempts})")
+            self._run_one(job)
+            self.queue.stats()
+
+    def run(self, drain: bool = False) -> Dict[str, int]:
+        """
+        Process jobs until stop() (Ctrl+C) or, with drain, until nothing is queued or running.
+
+        Returns:
+            dict: Jobs per outcome (done, retried, failed)
+        """
+        recovered = self.queue.recover()
+        if recovered:
+            self._log(f"♻️  Recovered {recovered} job(s) from stopped workers")
+        heartbeat = threading.Thread(target=self._heartbeat, name="queue-heartbeat", daemon=True)
+        heartbeat.start()
+        threads = [threading.Thread(target=self._work, args=(i, drain), name=f"queue-worker-{i}", daemon=True)
+                   for i in range(self.workers)]
+        for thread in threads:
+            thread.start()
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=0.5)
+        except KeyboardInterrupt:
+            self._log("🛑 Stopping after the running jobs")
+            self.stop()
+            for thread in threads:
+                thread.join()
+        self.stop()
+        return dict(self.processed)
+
+    def stop(self):
+        self._stop.set()
+
+
+if __name__ == "__main__":
+    from post_release import main
+    sys.exit(main(["queue"] + sys.argv[1:]))
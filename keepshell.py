@@ -1,59 +1,14 @@
-import subprocess
-from pathlib import Path
-
-class DynatraceSymbolPublisher:
-    """
-    A Python wrapper to call the existing shell script for Dynatrace symbol upload.
-    Keeps all shell logic intact but allows structured Python integration.
-    """
-
-    def __init__(self, script_path="publish-symbols.sh"):
-        self.script_path = Path(script_path).resolve()
-        if not self.script_path.exists():
-            raise FileNotFoundError(f"Script not found: {self.script_path}")
-
-    def _run_script(self, *args):
-        """Internal helper to run the shell script with arguments."""
-        cmd = ["bash", str(self.script_path)] + list(args)
-        print(f"🟢 Running: {' '.join(cmd)}")
-        try:
-            result = subprocess.run(cmd, text=True, capture_output=True, check=True)
-            print(result.stdout)
-            if result.stderr.strip():
-                print(f"⚠️ stderr:\n{result.stderr}")
-            return result.stdout
-        except subprocess.CalledProcessError as e:
-            print(f"❌ Script failed with exit code {e.returncode}")
-            print(f"stderr:\n{e.stderr}")
-            raise
-
-    def select_xcode(self):
-        """Invoke the part of the shell script that selects Xcode."""
-        return self._run_script("select_xcode")
+"""
+Shell entry point publish-symbols.sh and how to drive it from Python.
 
-    def install(self):
-        """Invoke the shell script to download/install Dynatrace tool."""
-        return self._run_script("install")
-
-    def upload_symbols(self):
-        """Invoke the shell script to upload symbols to Dynatrace."""
-        return self._run_script("upload_symbols")
-
-    def run_full_pipeline(self):
-        """Example combined workflow."""
-        self.select_xcode()
-        self.install()
-        self.upload_symbols()
-        
-from dynatrace_symbols import DynatraceSymbolPublisher
-
-if __name__ == "__main__":
-    publisher = DynatraceSymbolPublisher("publish-symbols.sh")
-    publisher.run_full_pipeline()
-    
-publisher.select_xcode()
-publisher.install()
+The Python wrapper (ledger, 429 backoff, in-process stage graph) lives in
+dynatrace_symbols.py; this file keeps the shell side of the interface.
+"""
+import sys
+from pathlib import Path
 
+# publish-symbols.sh: dispatches one section per call
+PUBLISH_SYMBOLS_SH = r'''
 #!/bin/bash
 set -e
 
@@ -93,68 +48,38 @@ case "$COMMAND" in
     exit 1
     ;;
 esac
+'''
 
-import subprocess
-from pathlib import Path
-
-class DynatraceSymbolPublisher:
-    """
-    A Python wrapper to call the existing shell script for Dynatrace symbol upload,
-    passing in dynamic parameters like application_id, version_id, and client_version.
-    """
-
-    def __init__(self, script_path="publish-symbols.sh"):
-        self.script_path = Path(script_path).resolve()
-        if not self.script_path.exists():
-            raise FileNotFoundError(f"Script not found: {self.script_path}")
-
-    def _run_script(self, command, application_id, version_id, client_version):
-        """Internal helper to run the shell script with arguments."""
-        cmd = [
-            "bash",
-            str(self.script_path),
-            command,
-            application_id,
-            version_id,
-            client_version
-        ]
-        print(f"🟢 Running: {' '.join(cmd)}")
-
-        try:
-            result = subprocess.run(cmd, text=True, capture_output=True, check=True)
-            if result.stdout.strip():
-                print(result.stdout)
-            if result.stderr.strip():
-                print(f"⚠️ stderr:\n{result.stderr}")
-            return result.stdout
-        except subprocess.CalledProcessError as e:
-            print(f"❌ Script failed with exit code {e.returncode}")
-            print(f"stderr:\n{e.stderr}")
-            raise
 
-    def select_xcode(self, application_id, version_id, client_version):
-        """Call 'select_xcode' section in the shell script."""
-        return self._run_script("select_xcode", application_id, version_id, client_version)
+def write_script(path: str = "publish-symbols.sh") -> Path:
+    """Write publish-symbols.sh next to the caller, executable"""
+    script = Path(path)
+    script.write_text(PUBLISH_SYMBOLS_SH, encoding="utf-8")
+    script.chmod(0o755)
+    return script
 
-    def install(self, application_id, version_id, client_version):
-        """Call 'install' section in the shell script."""
-        return self._run_script("install", application_id, version_id, client_version)
 
-    def upload_symbols(self, application_id, version_id, client_version):
-        """Call 'upload_symbols' section in the shell script."""
-        return self._run_script("upload_symbols", application_id, version_id, client_version)
-
-    def run_full_pipeline(self, application_id, version_id, client_version):
-        """Run the full sequence in one go."""
-        return self._run_script("all", application_id, version_id, client_version)
-        
-from dynatrace_symbols import DynatraceSymbolPublisher
-
-publisher = DynatraceSymbolPublisher("publish-symbols.sh")
-
-# 示例：传参数进入 shell
-publisher.run_full_pipeline(
-    application_id="eab451f3-5208-4c52-b06a-df09f86c2cb3",
-    version_id="8.287.2.1009",
-    client_version="8.287.2.1009"
-)
\ No newline at end of file
+if __name__ == "__main__":
+    from dynatrace_symbols import DynatraceSymbolPublisher
+    from upload_ledger import UploadLedger
+
+    ledger = UploadLedger(".upload-ledger.json")
+    publisher = DynatraceSymbolPublisher("publish-symbols.sh", ledger=ledger, force=False)
+
+    # 示例：传参数进入 shell
+    publisher.run_full_pipeline(
+        application_id="eab451f3-5208-4c52-b06a-df09f86c2cb3",
+        version_id="8.287.2.1009",
+        client_version="8.287.2.1009"
+    )
+
+    # 只上传符号文件，已上传过的相同文件会被跳过（force=True 可强制重传）
+    publisher.upload_symbols(
+        application_id="eab451f3-5208-4c52-b06a-df09f86c2cb3",
+        version_id="8.287.2.1009",
+        client_version="8.287.2.1009",
+        symbol_file="./MyApp.app.dSYM.zip",
+        environment="prod"
+    )
+    ledger.print_summary()
+    sys.exit(0)
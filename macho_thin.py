@@ -0,0 +1,265 @@
+import argparse
+import mmap
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import BinaryIO, Iterable, List, Optional, Tuple
+
+from macho_uuid import (FAT_MAGIC, FAT_MAGIC_64, _MAX_FAT_ARCHS, arch_name, dwarf_files, scan_buffer,
+                        scan_symbol_file)
+from metrics import THINNED_BYTES
+from tracing import traced
+
+FAT_ENTRY = ">iIIII"      # cputype, cpusubtype, offset, size, align
+FAT_ENTRY_64 = ">iIQQII"  # cputype, cpusubtype, offset, size, align, reserved
+
+# Simulator and Intel slices; device builds of current apps only need arm64/arm64e
+DEFAULT_ARCHS = ("arm64", "arm64e")
+
+
+class ThinReport:
+    """Outcome of thinning one Mach-O file"""
+
+    def __init__(self, path: str, kept: List[str], dropped: List[str], size_before: int, size_after: int):
+        self.path = path
+        self.kept = kept
+        self.dropped = dropped
+        self.size_before = size_before
+        self.size_after = size_after
+
+    @property
+    def saved(self) -> int:
+        return self.size_before - self.size_after
+
+    def to_dict(self) -> dict:
+        return {"path": self.path, "kept": self.kept, "dropped": self.dropped,
+                "size_before": self.size_before, "size_after": self.size_after}
+
+    def __repr__(self):
+        return f"ThinReport({self.path}, kept={self.kept}, dropped={self.dropped}, saved={self.saved})"
+
+
+class _FatEntry:
+    def __init__(self, cputype: int, cpusubtype: int, offset: int, size: int, align: int):
+        self.cputype = cputype
+        self.cpusubtype = cpusubtype
+        self.offset = offset
+        self.size = size
+        self.align = align
+
+    @property
+    def arch(self) -> str:
+        return arch_name(self.cputype, self.cpusubtype)
+
+
+# ----------------------------
+# Helper methods
+# ----------------------------
+
+def _fat_entries(view: memoryview) -> Optional[Tuple[int, List[_FatEntry]]]:
+    """(magic, slices) of a fat header, or None for a thin (or non) Mach-O"""
+    if len(view) < 8:
+        return None
+    magic, nfat = struct.unpack_from(">II", view)
+    if magic not in (FAT_MAGIC, FAT_MAGIC_64) or not 0 < nfat <= _MAX_FAT_ARCHS:
+        return None
+    fmt = FAT_ENTRY_64 if magic == FAT_MAGIC_64 else FAT_ENTRY
+    entries = []
+    for i in range(nfat):
+        fields = struct.unpack_from(fmt, view, 8 + i * struct.calcsize(fmt))
+        entry = _FatEntry(*fields[:5])
+        if entry.offset + entry.size > len(view):
+            raise ValueError(f"Truncated fat Mach-O: {entry.arch} slice ends past the end of the file")
+        entries.append(entry)
+    return magic, entries
+
+
+def _align(offset: int, align: int) -> int:
+    step = 1 << align
+    return (offset + step - 1) // step * step
+
+
+def _write_fat(view: memoryview, magic: int, entries: List[_FatEntry], out: BinaryIO) -> int:
+    """Write a fat file holding `entries`, each at its original alignment; returns the size written"""
+    header_size = 8 + len(entries) * struct.calcsize(FAT_ENTRY_64 if magic == FAT_MAGIC_64 else FAT_ENTRY)
+    offsets, offset = [], header_size
+    for entry in entries:
+        offset = _align(offset, entry.align)
+        offsets.append(offset)
+        offset += entry.size
+    if offset > 0xFFFFFFFF and magic == FAT_MAGIC:
+        return _write_fat(view, FAT_MAGIC_64, entries, out)
+
+    header = bytearray(struct.pack(">II", magic, len(entries)))
+    for entry, new_offset in zip(entries, offsets):
+        if magic == FAT_MAGIC_64:
+            header += struct.pack(FAT_ENTRY_64, entry.cputype, entry.cpusubtype, new_offset, entry.size, entry.align, 0)
+        else:
+            header += struct.pack(FAT_ENTRY, entry.cputype, entry.cpusubtype, new_offset, entry.size, entry.align)
+    out.write(header)
+    position = len(header)
+    for entry, new_offset in zip(entries, offsets):
+        out.write(b"\0" * (new_offset - position))
+        # slices of the mapped input go straight to the file, no copy in between
+        out.write(view[entry.offset:entry.offset + entry.size])
+        position = new_offset + entry.size
+    return position
+
+
+# ----------------------------
+# Public functions
+# ----------------------------
+
+def thin_buffer(buf, archs: Iterable[str], out: BinaryIO) -> Tuple[List[str], List[str], int]:
+    """
+    Write the slices of a (possibly fat) Mach-O whose architecture is in `archs`.
+
+    One remaining slice is written as a thin Mach-O (like `lipo -thin`),
+    several as a fat file with the original alignment. Nothing is written
+    if no slice matches.
+
+    Args:
+        buf: bytes-like object or mmap holding the Mach-O
+        archs: Architecture names to keep, e.g. ["arm64", "arm64e"]
+        out: Binary file to write to
+
+    Returns:
+        (kept architectures, dropped architectures, bytes written)
+    """
+    wanted = {arch.lower() for arch in archs}
+    with memoryview(buf) as view:
+        fat = _fat_entries(view)
+        if fat is None:
+            slices = scan_buffer(view)
+            if not slices:
+                raise ValueError("Not a Mach-O file")
+            if slices[0].arch not in wanted:
+                return [], [slices[0].arch], 0
+            out.write(view)
+            return [slices[0].arch], [], len(view)
+
+        magic, entries = fat
+        kept = [entry for entry in entries if entry.arch in wanted]
+        dropped = [entry.arch for entry in entries if entry.arch not in wanted]
+        if not kept:
+            written = 0
+        elif len(kept) == 1:
+            out.write(view[kept[0].offset:kept[0].offset + kept[0].size])
+            written = kept[0].size
+        else:
+            written = _write_fat(view, magic, kept, out)
+        return [entry.arch for entry in kept], dropped, written
+
+
+def thin_file(source: str, output: str, archs: Iterable[str]) -> ThinReport:
+    """
+    Thin a Mach-O file from a memory map (source and output may be the same path).
+
+    A file without any requested slice is left as it is (copied if output
+    differs), so an unexpected architecture never loses symbols.
+    """
+    archs = list(archs)
+    size = os.path.getsize(source)
+    directory = os.path.dirname(os.path.abspath(output))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(output), suffix=".thin", dir=directory)
+    try:
+        with open(source, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+                os.fdopen(fd, "wb") as out:
+            kept, dropped, written = thin_buffer(mm, archs, out)
+        if kept and dropped:
+            shutil.copymode(source, tmp_path)
+            os.replace(tmp_path, output)
+        else:
+            os.unlink(tmp_path)
+            written = size
+            if os.path.abspath(source) != os.path.abspath(output):
+                shutil.copy2(source, output)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    if dropped:
+        THINNED_BYTES.inc(size - written)
+    return ThinReport(output, kept, dropped, size, written)
+
+
+def thin_dsym(source: str, output: str, archs: Iterable[str]) -> List[ThinReport]:
+    """
+    Copy a .dSYM bundle (or a directory of bundles) to `output`, thinning every DWARF binary.
+
+    Only the DWARF files are rewritten; Info.plist and the rest are copied.
+    """
+    archs = list(archs)
+    source_path = Path(source)
+    dwarf = {path.relative_to(source_path) for path in dwarf_files(source)}
+
+    def skip_dwarf(directory, names):
+        relative = Path(directory).relative_to(source_path)
+        return [name for name in names if relative / name in dwarf]
+
+    shutil.copytree(source, output, ignore=skip_dwarf, dirs_exist_ok=True)
+    return [thin_file(str(source_path / relative), str(Path(output) / relative), archs) for relative in sorted(dwarf)]
+
+
+@traced("symbols.thin")
+def thin_symbol_file(path: str, archs: Iterable[str], work_dir: str, verbose: bool = True) -> str:
+    """
+    Thinned copy of a symbol file (.dSYM directory, dSYM zip or bare DWARF binary) for upload.
+
+    Args:
+        path: Symbol file as given to the uploader
+        archs: Architectures to keep
+        work_dir: Where the thinned copy is written
+
+    Returns:
+        str: Path of the thinned copy, or `path` itself if nothing needed dropping
+    """
+    archs = [arch.lower() for arch in archs]
+    source = Path(path)
+    target = Path(work_dir) / source.name
+    slices = scan_symbol_file(path)
+    unmatched = {name for name, found in slices.items() if not any(s.arch in archs for s in found)}
+    if verbose:
+        for name in sorted(unmatched):
+            print(f"⚠️ {name}: none of {', '.join(archs)} found "
+                  f"({', '.join(s.arch for s in slices[name])}), kept as is")
+    if not any(s.arch not in archs for name, found in slices.items() if name not in unmatched for s in found):
+        return path  # nothing to drop (or nothing recognised as Mach-O)
+    os.makedirs(work_dir, exist_ok=True)
+
+    if source.is_dir():
+        reports = thin_dsym(path, str(target), archs)
+    elif zipfile.is_zipfile(path):
+        from dsym_packager import package_dsym
+        unpacked = Path(tempfile.mkdtemp(prefix="unpacked-", dir=work_dir))
+        try:
+            with zipfile.ZipFile(path) as zf:
+                zf.extractall(unpacked)
+            reports = [thin_file(str(unpacked / name), str(unpacked / name), archs) for name in sorted(slices)]
+            package_dsym([str(p) for p in sorted(unpacked.iterdir())], str(target), verbose=False)
+        finally:
+            shutil.rmtree(unpacked, ignore_errors=True)
+    else:
+        reports = [thin_file(path, str(target), archs)]
+
+    if verbose:
+        saved = sum(r.saved for r in reports)
+        dropped = sorted({arch for r in reports if r.kept for arch in r.dropped})
+        print(f"✂️  {source.name}: dropped {', '.join(dropped)} "
+              f"({saved / (1 << 20):.1f} MB less, {len(reports)} binary(ies))")
+    return str(target)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Keep only the given architecture slices of Mach-O/dSYM files")
+    parser.add_argument("source", help=".dSYM directory, dSYM zip or Mach-O binary")
+    parser.add_argument("-o", "--output-dir", required=True, help="Directory for the thinned copy")
+    parser.add_argument("--arch", action="append", help=f"Architecture to keep (default: {', '.join(DEFAULT_ARCHS)})")
+    args = parser.parse_args()
+    print(thin_symbol_file(args.source, args.arch or DEFAULT_ARCHS, args.output_dir))
+    sys.exit(0)
@@ -0,0 +1,232 @@
+import mmap
+import os
+import struct
+import uuid
+import zipfile
+from pathlib import Path
+from typing import Callable, Dict, FrozenSet, List, Optional, Tuple
+
+FAT_MAGIC = 0xCAFEBABE
+FAT_MAGIC_64 = 0xCAFEBABF
+MH_MAGIC = 0xFEEDFACE
+MH_MAGIC_64 = 0xFEEDFACF
+MH_CIGAM = 0xCEFAEDFE
+MH_CIGAM_64 = 0xCFFAEDFE
+LC_UUID = 0x1B
+
+CPU_ARCH_ABI64 = 0x01000000
+CPU_ARCH_ABI64_32 = 0x02000000
+CPU_SUBTYPE_MASK = 0x00FFFFFF
+
+_ARCH_NAMES = {
+    (7, 3): "i386",
+    (7 | CPU_ARCH_ABI64, 3): "x86_64",
+    (7 | CPU_ARCH_ABI64, 8): "x86_64h",
+    (12, 9): "armv7",
+    (12, 11): "armv7s",
+    (12, 12): "armv7k",
+    (12 | CPU_ARCH_ABI64, 0): "arm64",
+    (12 | CPU_ARCH_ABI64, 1): "arm64",
+    (12 | CPU_ARCH_ABI64, 2): "arm64e",
+    (12 | CPU_ARCH_ABI64_32, 1): "arm64_32",
+}
+
+# Real fat headers list a handful of slices; Java class files share the 0xCAFEBABE magic
+# but have a much larger value in that position.
+_MAX_FAT_ARCHS = 32
+
+ReadAt = Callable[[int, int], bytes]
+
+
+class MachOSlice:
+    """One architecture slice of a Mach-O binary"""
+
+    def __init__(self, arch: str, uuid: Optional[str], offset: int, size: int, cputype: int, cpusubtype: int):
+        self.arch = arch
+        self.uuid = uuid
+        self.offset = offset
+        self.size = size
+        self.cputype = cputype
+        self.cpusubtype = cpusubtype
+
+    def __repr__(self):
+        return f"MachOSlice({self.arch}, uuid={self.uuid}, offset={self.offset}, size={self.size})"
+
+
+def arch_name(cputype: int, cpusubtype: int) -> str:
+    return _ARCH_NAMES.get((cputype, cpusubtype & CPU_SUBTYPE_MASK), f"cpu{cputype}:{cpusubtype & CPU_SUBTYPE_MASK}")
+
+
+def _scan_thin(read_at: ReadAt, offset: int, size: int) -> Optional[MachOSlice]:
+    header = read_at(offset, 32)
+    if len(header) < 28:
+        return None
+    magic = struct.unpack_from("<I", header)[0]
+    if magic in (MH_MAGIC, MH_MAGIC_64):
+        endian = "<"
+    elif magic in (MH_CIGAM, MH_CIGAM_64):
+        endian = ">"
+    else:
+        return None
+    is_64 = magic in (MH_MAGIC_64, MH_CIGAM_64)
+    cputype, cpusubtype, _filetype, ncmds, sizeofcmds = struct.unpack_from(endian + "iIIII", header, 4)
+    header_size = 32 if is_64 else 28
+
+    commands = read_at(offset + header_size, sizeofcmds)
+    found_uuid = None
+    pos = 0
+    for _ in range(ncmds):
+        if pos + 8 > len(commands):
+            break
+        cmd, cmdsize = struct.unpack_from(endian + "II", commands, pos)
+        if cmd == LC_UUID and pos + 24 <= len(commands):
+            found_uuid = str(uuid.UUID(bytes=bytes(commands[pos + 8:pos + 24]))).upper()
+            break
+        if cmdsize < 8:
+            break
+        pos += cmdsize
+
+    cputype &= 0xFFFFFFFF
+    return MachOSlice(arch_name(cputype, cpusubtype), found_uuid, offset, size, cputype, cpusubtype)
+
+
+def scan_reader(read_at: ReadAt, total_size: int) -> List[MachOSlice]:
+    """
+    Read LC_UUID of every architecture through a positional reader.
+    Only headers and load commands are read.
+    """
+    head = read_at(0, 8)
+    if len(head) < 8:
+        return []
+    magic, nfat = struct.unpack_from(">II", head)
+
+    if magic in (FAT_MAGIC, FAT_MAGIC_64) and 0 < nfat <= _MAX_FAT_ARCHS:
+        entry_size = 32 if magic == FAT_MAGIC_64 else 20
+        table = read_at(8, nfat * entry_size)
+        slices = []
+        for i in range(nfat):
+            if magic == FAT_MAGIC_64:
+                cputype, cpusubtype, offset, size, _align, _reserved = struct.unpack_from(">iIQQII", table, i * entry_size)
+            else:
+                cputype, cpusubtype, offset, size, _align = struct.unpack_from(">iIIII", table, i * entry_size)
+            thin = _scan_thin(read_at, offset, size)
+            if thin:
+                slices.append(thin)
+        return slices
+
+    thin = _scan_thin(read_at, 0, total_size)
+    return [thin] if thin else []
+
+
+def scan_buffer(buf) -> List[MachOSlice]:
+    """Scan a bytes-like object or mmap"""
+    view = memoryview(buf)
+    return scan_reader(lambda offset, n: view[offset:offset + n], len(view))
+
+
+def scan_file(path: str) -> List[MachOSlice]:
+    """Memory-map a (possibly fat) Mach-O file and read per-architecture UUIDs"""
+    size = os.path.getsize(path)
+    if size == 0:
+        return []
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        return scan_buffer(mm)
+
+
+def _stored_member_offset(mm: mmap.mmap, info: zipfile.ZipInfo) -> int:
+    """Offset of a member's data, read from its local file header"""
+    name_len, extra_len = struct.unpack_from("<HH", mm, info.header_offset + 26)
+    return info.header_offset + 30 + name_len + extra_len
+
+
+def scan_zip(zip_path: str) -> Dict[str, List[MachOSlice]]:
+    """
+    Scan Mach-O members inside a zip (e.g. MyApp.app.dSYM.zip).
+
+    Stored members are read straight from the memory-mapped archive;
+    deflated members are read through a seekable stream, touching only
+    headers and load commands.
+    """
+    results = {}
+    with open(zip_path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm, \
+            zipfile.ZipFile(f) as zf:
+        for info in zf.infolist():
+            if info.is_dir() or info.file_size < 28:
+                continue
+            if info.compress_type == zipfile.ZIP_STORED:
+                base = _stored_member_offset(mm, info)
+                view = memoryview(mm)[base:base + info.file_size]
+                try:
+                    slices = scan_buffer(view)
+                finally:
+                    view.release()
+            else:
+                with zf.open(info) as member:
+                    def read_at(offset, n, member=member):
+                        member.seek(offset)
+                        return member.read(n)
+                    slices = scan_reader(read_at, info.file_size)
+            if slices:
+                results[info.filename] = slices
+    return results
+
+
+def dwarf_files(dsym_dir: str) -> List[Path]:
+    """DWARF binaries inside a .dSYM bundle (or bundles below a directory)"""
+    root = Path(dsym_dir)
+    return sorted(p for p in root.glob("**/Contents/Resources/DWARF/*") if p.is_file())
+
+
+def scan_symbol_file(path: str) -> Dict[str, List[MachOSlice]]:
+    """Scan a .dSYM directory, a dSYM zip, or a bare DWARF binary"""
+    p = Path(path)
+    if p.is_dir():
+        return {str(f): scan_file(str(f)) for f in dwarf_files(path)}
+    if zipfile.is_zipfile(path):
+        return scan_zip(path)
+    slices = scan_file(path)
+    return {path: slices} if slices else {}
+
+
+def symbol_file_uuids(path: str) -> FrozenSet[str]:
+    """All LC_UUIDs found in a symbol file"""
+    return frozenset(s.uuid for slices in scan_symbol_file(path).values() for s in slices if s.uuid)
+
+
+class UUIDIndex:
+    """UUID -> files that contain it"""
+
+    def __init__(self):
+        self.by_uuid: Dict[str, List[str]] = {}
+
+    def add(self, path: str) -> FrozenSet[str]:
+        uuids = symbol_file_uuids(path)
+        for u in uuids:
+            self.by_uuid.setdefault(u, []).append(path)
+        return uuids
+
+    def duplicates(self) -> Dict[str, List[str]]:
+        return {u: paths for u, paths in self.by_uuid.items() if len(paths) > 1}
+
+
+def dedupe_symbol_files(paths: List[str]) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Collapse symbol files whose UUIDs are all covered by an earlier file.
+
+    Missing files and files with no readable UUID are always kept.
+
+    Returns:
+        (unique paths in input order, {duplicate path: path it duplicates})
+    """
+    index = UUIDIndex()
+    unique, duplicates = [], {}
+    for path in paths:
+        uuids = symbol_file_uuids(path) if os.path.exists(path) else frozenset()
+        covered_by = {index.by_uuid[u][0] for u in uuids if u in index.by_uuid}
+        if uuids and all(u in index.by_uuid for u in uuids) and len(covered_by) == 1:
+            duplicates[path] = covered_by.pop()
+            continue
+        for u in uuids:
+            index.by_uuid.setdefault(u, []).append(path)
+        unique.append(path)
+    return unique, duplicates
@@ -0,0 +1,158 @@
+import argparse
+import os
+import sys
+import time
+from typing import Optional
+
+import requests
+
+from concurrency import AdaptiveLimiter, ThrottledError, parse_retry_after, run_throttled
+from dynatrace_client import DYNATRACE_URLS, get_client, symbol_file_key
+from mapping_validator import MappingValidationError, ValidatingReader
+from metrics import HTTP_SECONDS, UPLOAD_BYTES
+from tracing import traced
+from upload_ledger import UploadLedger
+
+class MappingUploader:
+    """
+    Upload Android mapping files to Dynatrace via the symbol file REST API.
+    Consults an UploadLedger so reruns skip files that were already uploaded,
+    skips mappings Dynatrace already lists (same key and size), and
+    validates the mapping format while the file is streamed.
+    """
+
+    def __init__(self, environment: str, api_token: str, ledger: Optional[UploadLedger] = None,
+                 force: bool = False, verbose: bool = True, limiter: Optional[AdaptiveLimiter] = None,
+                 max_attempts: int = 5, validate: bool = True, base_url: Optional[str] = None,
+                 session: Optional[requests.Session] = None, check_token: bool = True, precheck: bool = True):
+        if environment not in DYNATRACE_URLS:
+            raise ValueError(f"Unknown Dynatrace environment: {environment}")
+        self.environment = environment
+        self.client = get_client(environment, base_url)
+        self.base_url = self.client.base_url
+        self.api_token = api_token
+        self.ledger = ledger
+        self.force = force
+        self.verbose = verbose
+        self.limiter = limiter
+        self.max_attempts = max_attempts
+        self.validate = validate
+        self.check_token = check_token
+        self.precheck = precheck
+        self.last_validator = None
+        # the per-environment client keeps connections to Dynatrace open across uploads
+        self.http = session or self.client.session
+
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
+
+    def _upload_url(self, application_id: str, package_name: str, version_code: str, version_name: str) -> str:
+        return (
+            f"{self.base_url}/api/config/v1/symfiles/"
+            f"{application_id}/{package_name}/ANDROID/{version_code}/{version_name}"
+        )
+
+    @traced("mapping.upload", fields=("package_name", "version_code"))
+    def upload(self, mapping_file: str, application_id: str, package_name: str,
+               version_code: str, version_name: str) -> bool:
+        """
+        Upload a mapping file unless the ledger or Dynatrace shows it is already present.
+
+        Returns:
+            bool: True if the file was uploaded, False if it was skipped
+        """
+        if not os.path.isfile(mapping_file):
+            raise FileNotFoundError(f"Mapping file not found: {mapping_file}")
+
+        digest = None
+        if self.ledger:
+            digest = self.ledger.file_digest(mapping_file)
+            if self.ledger.should_skip(self.environment, application_id, version_code,
+                                       mapping_file, force=self.force, digest=digest):
+                return False
+
+        key = symbol_file_key(application_id, package_name, "ANDROID", version_code, version_name)
+        size = os.path.getsize(mapping_file)
+        if self.precheck and not self.force:
+            existing = self.client.existing_symbol_files(self.api_token, [key]).get(key)
+            # a different size means the mapping changed since it was uploaded
+            if existing and existing.get("fileSize") in (None, size):
+                self._log(f"⏭️  Skipping {mapping_file}: Dynatrace already has {package_name} {version_name} "
+                          f"({version_code})")
+                if self.ledger:
+                    self.ledger.record(self.environment, application_id, version_code, mapping_file,
+                                       success=True, digest=digest, detail="already in Dynatrace", skipped=True)
+                return False
+
+        if self.check_token:
+            self.client.validate_token(self.api_token)
+        url = self._upload_url(application_id, package_name, version_code, version_name)
+        headers = {
+            "Authorization": f"Api-Token {self.api_token}",
+            "Content-Type": "text/plain",
+        }
+        self._log(f"📤 Uploading {mapping_file} -> {url}")
+
+        def attempt():
+            started = time.perf_counter()
+            if self.validate:
+                # Validation runs on the same read as the upload stream and aborts it on the first error
+                with ValidatingReader(mapping_file) as body:
+                    self.last_validator = body.validator
+                    response = self.http.put(url, data=body, headers=headers)
+            else:
+                with open(mapping_file, "rb") as f:
+                    response = self.http.put(url, data=f, headers=headers)
+            HTTP_SECONDS.observe(time.perf_counter() - started, service="dynatrace", operation="upload",
+                                 status=response.status_code)
+            if response.status_code == 401:
+                self.client.invalidate_token(self.api_token)
+            if response.status_code == 429:
+                raise ThrottledError(f"429 Too Many Requests: {url}",
+                                     parse_retry_after(response.headers.get("Retry-After")))
+            response.raise_for_status()
+            return response
+
+        try:
+            run_throttled(attempt, self.limiter, self.max_attempts)
+        except (requests.RequestException, ThrottledError, MappingValidationError) as e:
+            if self.ledger:
+                self.ledger.record(self.environment, application_id, version_code,
+                                   mapping_file, success=False, digest=digest, detail=str(e))
+            raise
+
+        if self.ledger:
+            self.ledger.record(self.environment, application_id, version_code,
+                               mapping_file, success=True, digest=digest)
+        self.client.record_symbol_file(key, size)
+        UPLOAD_BYTES.inc(size, uploader="mapping")
+        self._log("✅ Mapping file uploaded.")
+        if self.last_validator and self.verbose:
+            self.last_validator.print_stats()
+        return True
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upload an Android mapping file to Dynatrace")
+    parser.add_argument("--env", required=True, choices=sorted(DYNATRACE_URLS))
+    parser.add_argument("--token", required=True, help="Dynatrace API token")
+    parser.add_argument("--application-id", required=True)
+    parser.add_argument("--package-name", required=True)
+    parser.add_argument("--version-code", required=True)
+    parser.add_argument("--version-name", required=True)
+    parser.add_argument("--ledger", default=".upload-ledger.json", help="Upload ledger path")
+    parser.add_argument("--force", action="store_true", help="Upload even if the ledger has this file")
+    parser.add_argument("--no-validate", action="store_true", help="Skip mapping format validation")
+    parser.add_argument("mapping_file")
+    args = parser.parse_args()
+
+    ledger = UploadLedger(args.ledger)
+    uploader = MappingUploader(args.env, args.token, ledger=ledger, force=args.force,
+                               validate=not args.no_validate)
+    try:
+        uploader.upload(args.mapping_file, args.application_id, args.package_name,
+                        args.version_code, args.version_name)
+    finally:
+        ledger.print_summary()
+    sys.exit(1 if ledger.failed_files else 0)
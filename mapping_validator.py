@@ -0,0 +1,212 @@
+import os
+import re
+from typing import Dict, List, Optional, Tuple
+
+# com.example.Foo -> a.b:
+_CLASS_RE = re.compile(r"^(\S+) -> (\S+):$")
+# [1:5:]void method(int)[:10[:14]] -> b   /   int field -> a
+_MEMBER_RE = re.compile(
+    r"^\s+(?:(\d+):(\d+):)?"      # obfuscated line range
+    r"(\S+) ([^\s(]+)"            # return/field type and (possibly qualified) name
+    r"(\([^)]*\))?"               # method arguments
+    r"(?::(\d+)(?::(\d+))?)?"     # original line range
+    r" -> (\S+)$"
+)
+
+
+class MappingValidationError(ValueError):
+    """Raised when a mapping file is structurally invalid"""
+
+
+class MappingValidator:
+    """
+    Single-pass, constant-memory validator for R8/ProGuard mapping files.
+
+    Feed raw bytes in any chunk size (e.g. from the upload stream) and call
+    finish() at EOF. Only the current partial line is buffered.
+    """
+
+    def __init__(self, max_errors: int = 20, max_line_length: int = 1024 * 1024):
+        self.max_errors = max_errors
+        self.max_line_length = max_line_length
+        self.errors: List[Tuple[int, str]] = []
+        self.error_count = 0
+        self.bytes = 0
+        self.lines = 0
+        self.classes = 0
+        self.fields = 0
+        self.methods = 0
+        self.line_ranges = 0
+        self.comments = 0
+        self._partial = b""
+        self._in_class = False
+        self._finished = False
+
+    # ----------------------------
+    # Helper methods
+    # ----------------------------
+
+    def _error(self, message: str):
+        self.error_count += 1
+        if len(self.errors) < self.max_errors:
+            self.errors.append((self.lines, message))
+
+    def _check_line(self, raw: bytes):
+        self.lines += 1
+        if raw.endswith(b"\r"):
+            raw = raw[:-1]
+        try:
+            line = raw.decode("utf-8")
+        except UnicodeDecodeError:
+            self._error("not valid UTF-8")
+            return
+
+        stripped = line.strip()
+        if not stripped:
+            return
+        if stripped.startswith("#"):
+            self.comments += 1
+            return
+
+        if not line[0].isspace():
+            if _CLASS_RE.match(line):
+                self.classes += 1
+                self._in_class = True
+            else:
+                self._in_class = False
+                self._error(f"malformed class mapping: {line[:120]!r}")
+            return
+
+        if not self._in_class:
+            self._error("member mapping outside of a class")
+            return
+        match = _MEMBER_RE.match(line)
+        if not match:
+            self._error(f"malformed member mapping: {stripped[:120]!r}")
+            return
+
+        start, end, _type, _name, args, orig_start, orig_end, _obf = match.groups()
+        if args is None:
+            self.fields += 1
+            if start is not None:
+                self._error("field mapping with a line range")
+            return
+        self.methods += 1
+        if start is not None:
+            self.line_ranges += 1
+            if int(start) > int(end):
+                self._error(f"line range {start}:{end} is reversed")
+        if orig_end is not None and int(orig_start) > int(orig_end):
+            self._error(f"original line range {orig_start}:{orig_end} is reversed")
+
+    # ----------------------------
+    # Public functions
+    # ----------------------------
+
+    def feed(self, chunk: bytes):
+        """Consume the next chunk of the file"""
+        if not chunk:
+            return
+        self.bytes += len(chunk)
+        data = self._partial + chunk
+        lines = data.split(b"\n")
+        self._partial = lines.pop()
+        for raw in lines:
+            self._check_line(raw)
+        if len(self._partial) > self.max_line_length:
+            self._error(f"line longer than {self.max_line_length} bytes")
+            self._partial = b""
+
+    def finish(self) -> "MappingValidator":
+        """Flush the last line and run end-of-file checks"""
+        if self._finished:
+            return self
+        self._finished = True
+        if self._partial:
+            self._check_line(self._partial)
+            self._partial = b""
+        if self.bytes == 0:
+            self._error("mapping file is empty")
+        elif self.classes == 0:
+            self._error("no class mappings found")
+        return self
+
+    @property
+    def valid(self) -> bool:
+        return self.error_count == 0
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "bytes": self.bytes,
+            "lines": self.lines,
+            "classes": self.classes,
+            "fields": self.fields,
+            "methods": self.methods,
+            "line_ranges": self.line_ranges,
+            "comments": self.comments,
+            "errors": self.error_count,
+        }
+
+    def raise_if_invalid(self):
+        if self.valid:
+            return
+        details = "; ".join(f"line {n}: {msg}" for n, msg in self.errors)
+        raise MappingValidationError(f"Invalid mapping file ({self.error_count} error(s)): {details}")
+
+    def print_stats(self) -> None:
+        s = self.stats()
+        print("\n=== Mapping File Stats ===")
+        print(f"Classes: {s['classes']}, fields: {s['fields']}, methods: {s['methods']}, "
+              f"line ranges: {s['line_ranges']}")
+        print(f"Lines: {s['lines']}, bytes: {s['bytes']}, errors: {s['errors']}")
+
+
+class ValidatingReader:
+    """
+    File-like wrapper that validates bytes as they are read.
+
+    Passed as a request body, the upload stream and the validation share
+    one read of the file. Raises MappingValidationError as soon as an error
+    is seen, which aborts the upload. End-of-file checks run when the last
+    chunk is read, before it is handed out, so the server never receives a
+    complete Content-Length body for an invalid file.
+    """
+
+    def __init__(self, path: str, validator: Optional[MappingValidator] = None, chunk_size: int = 64 * 1024):
+        self.path = path
+        self.validator = validator or MappingValidator()
+        self.chunk_size = chunk_size
+        self._size = os.path.getsize(path)
+        self._file = open(path, "rb")
+
+    def __len__(self):
+        return self._size
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            return b"".join(iter(lambda: self.read(self.chunk_size), b""))
+        chunk = self._file.read(size)
+        if chunk:
+            self.validator.feed(chunk)
+        if not chunk or self._file.tell() >= self._size:
+            self.validator.finish()
+        self.validator.raise_if_invalid()
+        return chunk
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def validate_mapping_file(path: str, chunk_size: int = 1024 * 1024) -> MappingValidator:
+    """Validate a mapping file without uploading it"""
+    validator = MappingValidator()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            validator.feed(chunk)
+    return validator.finish()
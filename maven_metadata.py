@@ -0,0 +1,202 @@
+import threading
+import time
+import xml.etree.ElementTree as ET
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+from bandwidth import limited
+from metrics import CACHE_LOOKUPS, HTTP_SECONDS
+
+DYNAMIC_VERSIONS = ("LATEST", "RELEASE")
+SNAPSHOT_SUFFIX = "-SNAPSHOT"
+
+
+class MetadataNotFound(Exception):
+    """maven-metadata.xml is missing or does not list what was asked for; callers fall back to search"""
+
+
+def is_dynamic(version: str) -> bool:
+    """True if the version has to be resolved before its file name is known"""
+    return version.upper() in DYNAMIC_VERSIONS or version.endswith(SNAPSHOT_SUFFIX)
+
+
+class ResolvedArtifact:
+    """Concrete file for a requested version"""
+
+    def __init__(self, group_id: str, artifact_id: str, base_version: str, file_version: str,
+                 packaging: str, classifier: Optional[str] = None):
+        self.group_id = group_id
+        self.artifact_id = artifact_id
+        self.base_version = base_version  # directory, e.g. 1.2.0-SNAPSHOT
+        self.file_version = file_version  # in the file name, e.g. 1.2.0-20250101.120000-3
+        self.packaging = packaging
+        self.classifier = classifier
+
+    @property
+    def filename(self) -> str:
+        suffix = f"-{self.classifier}" if self.classifier else ""
+        return f"{self.artifact_id}-{self.file_version}{suffix}.{self.packaging}"
+
+    @property
+    def path(self) -> str:
+        group_path = self.group_id.replace(".", "/")
+        return f"{group_path}/{self.artifact_id}/{self.base_version}/{self.filename}"
+
+    def __repr__(self):
+        return f"ResolvedArtifact({self.path})"
+
+
+# Parsed metadata by URL: (fresh until, ETag, parsed); shared by every resolver in the process
+_cache: Dict[str, Tuple[float, Optional[str], Dict]] = {}
+_cache_lock = threading.Lock()
+
+
+def clear_cache():
+    with _cache_lock:
+        _cache.clear()
+
+
+def _text(element: Optional[ET.Element], path: str) -> Optional[str]:
+    found = element.find(path) if element is not None else None
+    return found.text.strip() if found is not None and found.text else None
+
+
+def parse_metadata(xml: bytes) -> Dict:
+    """Artifact-level (versions, latest, release) and version-level (snapshot builds) fields"""
+    root = ET.fromstring(xml)
+    versioning = root.find("versioning")
+    snapshot_versions = []
+    if versioning is not None:
+        for node in versioning.findall("snapshotVersions/snapshotVersion"):
+            snapshot_versions.append({
+                "classifier": _text(node, "classifier") or "",
+                "extension": _text(node, "extension"),
+                "value": _text(node, "value"),
+            })
+    return {
+        "version": _text(root, "version"),
+        "latest": _text(versioning, "latest"),
+        "release": _text(versioning, "release"),
+        "versions": [v.text.strip() for v in root.findall("versioning/versions/version") if v.text],
+        "last_updated": _text(versioning, "lastUpdated"),
+        "snapshot_timestamp": _text(versioning, "snapshot/timestamp"),
+        "snapshot_build": _text(versioning, "snapshot/buildNumber"),
+        "snapshot_versions": snapshot_versions,
+    }
+
+
+class MavenMetadataResolver:
+    """
+    Resolve LATEST, RELEASE and SNAPSHOT versions from maven-metadata.xml.
+
+    Nexus serves these files straight from the repository, so resolving costs
+    one or two small GETs instead of a search API query. Parsed files are
+    cached for `ttl` seconds and then revalidated with If-None-Match.
+    """
+
+    def __init__(self, base_url: str, repository: str, username: Optional[str] = None,
+                 password: Optional[str] = None, session: Optional[requests.Session] = None,
+                 ttl: float = 60.0, verbose: bool = True):
+        self.base_url = base_url.rstrip("/")
+        self.repository = repository
+        self.auth = (username, password) if username and password else None
+        self.http = limited(session) or requests
+        self.ttl = ttl
+        self.verbose = verbose
+
+    # ----------------------------
+    # Helper methods
+    # ----------------------------
+
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
+
+    def _metadata_url(self, group_id: str, artifact_id: str, version: Optional[str] = None) -> str:
+        parts = [self.base_url, "repository", self.repository, group_id.replace(".", "/"), artifact_id]
+        if version:
+            parts.append(version)
+        return "/".join(parts) + "/maven-metadata.xml"
+
+    def _fetch(self, url: str) -> Dict:
+        with _cache_lock:
+            cached = _cache.get(url)
+        if cached and cached[0] > time.monotonic():
+            CACHE_LOOKUPS.inc(cache="maven_metadata", result="hit")
+            return cached[2]
+        CACHE_LOOKUPS.inc(cache="maven_metadata", result="miss")
+
+        headers = {"If-None-Match": cached[1]} if cached and cached[1] else {}
+        started = time.perf_counter()
+        response = self.http.get(url, auth=self.auth, headers=headers)
+        HTTP_SECONDS.observe(time.perf_counter() - started, service="nexus", operation="metadata",
+                             status=response.status_code)
+        if response.status_code == 304 and cached:
+            parsed, etag = cached[2], cached[1]
+        elif response.status_code == 404:
+            raise MetadataNotFound(f"No maven-metadata.xml at {url}")
+        else:
+            response.raise_for_status()
+            try:
+                parsed = parse_metadata(response.content)
+            except ET.ParseError as e:
+                raise MetadataNotFound(f"Unreadable maven-metadata.xml at {url}: {e}")
+            etag = response.headers.get("ETag")
+        with _cache_lock:
+            _cache[url] = (time.monotonic() + self.ttl, etag, parsed)
+        return parsed
+
+    @staticmethod
+    def _newest(versions: List[str], releases_only: bool) -> Optional[str]:
+        # <versions> is in deploy order, oldest first
+        for version in reversed(versions):
+            if not releases_only or not version.endswith(SNAPSHOT_SUFFIX):
+                return version
+        return None
+
+    # ----------------------------
+    # Public functions
+    # ----------------------------
+
+    def resolve_version(self, group_id: str, artifact_id: str, version: str) -> str:
+        """LATEST / RELEASE -> the concrete version from the artifact-level metadata; others unchanged"""
+        keyword = version.upper()
+        if keyword not in DYNAMIC_VERSIONS:
+            return version
+        metadata = self._fetch(self._metadata_url(group_id, artifact_id))
+        if keyword == "LATEST":
+            resolved = metadata["latest"] or self._newest(metadata["versions"], releases_only=False)
+        else:
+            resolved = metadata["release"] or self._newest(metadata["versions"], releases_only=True)
+        if not resolved:
+            raise MetadataNotFound(f"No {keyword} version of {group_id}:{artifact_id} in maven-metadata.xml")
+        return resolved
+
+    def resolve(self, group_id: str, artifact_id: str, version: str, packaging: str = "jar",
+                classifier: Optional[str] = None) -> ResolvedArtifact:
+        """
+        Concrete repository path for a version, including timestamped SNAPSHOT builds.
+
+        Raises:
+            MetadataNotFound: if the metadata needed is missing; fall back to the search API
+        """
+        base_version = self.resolve_version(group_id, artifact_id, version)
+        if not base_version.endswith(SNAPSHOT_SUFFIX):
+            resolved = ResolvedArtifact(group_id, artifact_id, base_version, base_version, packaging, classifier)
+        else:
+            metadata = self._fetch(self._metadata_url(group_id, artifact_id, base_version))
+            file_version = next((sv["value"] for sv in metadata["snapshot_versions"]
+                                 if sv["extension"] == packaging and sv["classifier"] == (classifier or "")
+                                 and sv["value"]), None)
+            if not file_version and metadata["snapshot_timestamp"] and metadata["snapshot_build"]:
+                # Maven 2 style metadata: one timestamp/buildNumber for every file of the build
+                file_version = base_version[:-len("SNAPSHOT")] + \
+                    f"{metadata['snapshot_timestamp']}-{metadata['snapshot_build']}"
+            if not file_version:
+                raise MetadataNotFound(f"No {packaging} build of {group_id}:{artifact_id}:{base_version} "
+                                       f"in maven-metadata.xml")
+            resolved = ResolvedArtifact(group_id, artifact_id, base_version, file_version, packaging, classifier)
+        if version != resolved.file_version:
+            self._log(f"🔎 {group_id}:{artifact_id}:{version} -> {resolved.file_version}")
+        return resolved
@@ -0,0 +1,254 @@
+import atexit
+import bisect
+import math
+import os
+import tempfile
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+METRICS_ENV = "POST_RELEASE_METRICS"
+FORMAT_ENV = "POST_RELEASE_METRICS_FORMAT"
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+def _label_key(labels: Dict[str, object]) -> LabelKey:
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(key: LabelKey, extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = list(key) + ([extra] if extra else [])
+    if not pairs:
+        return ""
+    escaped = []
+    for name, value in pairs:
+        value = value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: object):
+        if amount < 0:
+            raise ValueError("Counters can only increase")
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: object) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def samples(self, openmetrics: bool) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}_total{_format_labels(key)} {_format_value(v)}" for key, v in values]
+
+
+class Gauge:
+    """Value that can be set to anything"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str):
+        self.name = name
+        self.documentation = documentation
+        self._values: Dict[LabelKey, float] = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels: object):
+        with self._lock:
+            self._values[_label_key(labels)] = float(value)
+
+    def value(self, **labels: object) -> float:
+        with self._lock:
+            return self._values.get(_label_key(labels), 0.0)
+
+    def samples(self, openmetrics: bool) -> List[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        return [f"{self.name}{_format_labels(key)} {_format_value(v)}" for key, v in values]
+
+
+class Histogram:
+    """Cumulative-bucket histogram with optional labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = sorted(float(b) for b in buckets)
+        # per label set: [count per bucket (+Inf last), sum]
+        self._values: Dict[LabelKey, Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels: object):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def count(self, **labels: object) -> int:
+        with self._lock:
+            entry = self._values.get(_label_key(labels))
+            return sum(entry[0]) if entry else 0
+
+    def samples(self, openmetrics: bool) -> List[str]:
+        with self._lock:
+            values = sorted((key, (list(counts), total[0])) for key, (counts, total) in self._values.items())
+        lines = []
+        for key, (counts, total) in values:
+            cumulative = 0
+            for bound, count in zip(self.buckets + [math.inf], counts):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(key, ('le', _format_value(bound)))} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    In-process metrics, written once as a Prometheus textfile (node_exporter
+    textfile collector) or OpenMetrics file. Nothing is sent over the network.
+    """
+
+    def __init__(self, prefix: str = "post_release_"):
+        self.prefix = prefix
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, documentation: str, **kwargs):
+        full_name = self.prefix + name
+        with self._lock:
+            existing = self._metrics.get(full_name)
+            if existing is not None:
+                if not isinstance(existing, cls):
+                    raise ValueError(f"Metric {full_name} already registered as {existing.kind}")
+                return existing
+            metric = cls(full_name, documentation, **kwargs)
+            self._metrics[full_name] = metric
+            return metric
+
+    def counter(self, name: str, documentation: str) -> Counter:
+        return self._register(Counter, name, documentation)
+
+    def gauge(self, name: str, documentation: str) -> Gauge:
+        return self._register(Gauge, name, documentation)
+
+    def histogram(self, name: str, documentation: str, buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, buckets=buckets)
+
+    def render(self, openmetrics: bool = False) -> str:
+        """Text exposition of every metric that has at least one sample"""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for metric in metrics:
+            samples = metric.samples(openmetrics)
+            if not samples:
+                continue
+            # Prometheus text names the counter family with _total, OpenMetrics without
+            family = metric.name + ("_total" if metric.kind == "counter" and not openmetrics else "")
+            lines.append(f"# HELP {family} {metric.documentation}")
+            lines.append(f"# TYPE {family} {metric.kind}")
+            lines.extend(samples)
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def write(self, path: str, openmetrics: Optional[bool] = None) -> str:
+        """
+        Atomically write the exposition file (the textfile collector must never see a partial file).
+
+        Args:
+            path: Target file, e.g. /var/lib/node_exporter/textfile/post_release.prom
+            openmetrics: Force the format; by default OpenMetrics is used for .om/.openmetrics files
+        """
+        if openmetrics is None:
+            openmetrics = path.endswith((".om", ".openmetrics"))
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(prefix=".metrics-", dir=directory)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(self.render(openmetrics))
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return path
+
+
+_registry = MetricsRegistry()
+
+
+def get_registry() -> MetricsRegistry:
+    return _registry
+
+
+# ----------------------------
+# Shared metrics
+# ----------------------------
+
+DOWNLOAD_BYTES = _registry.counter("download_bytes", "Bytes downloaded, by source")
+UPLOAD_BYTES = _registry.counter("upload_bytes", "Bytes uploaded to Dynatrace, by uploader")
+THINNED_BYTES = _registry.counter("thinned_bytes", "Bytes dropped from symbol files by architecture thinning")
+RETRIES = _registry.counter("retries", "Retried attempts, by reason")
+CACHE_LOOKUPS = _registry.counter("cache_lookups", "Ledger and stage cache lookups, by cache and result")
+HTTP_SECONDS = _registry.histogram("http_response_seconds",
+                                   "Time until response headers, by service, operation and status")
+HEDGED_REQUESTS = _registry.counter("hedged_requests",
+                                   "Hedging-enabled GETs, by outcome (not_hedged, primary_won, hedge_won, over_budget, failed)")
+THROTTLED_SECONDS = _registry.counter("throttled_seconds",
+                                     "Seconds Nexus transfers waited for the bandwidth limiter, by host and budget")
+QUEUE_DEPTH = _registry.gauge("queue_jobs", "Job queue depth, by environment and status")
+QUEUE_JOBS = _registry.counter("queue_transitions",
+                               "Job queue events, by outcome (enqueued, done, retried, failed, recovered)")
+QUEUE_WAIT_SECONDS = _registry.histogram("queue_wait_seconds",
+                                         "Time a ready job waited to be claimed (since enqueue, or since its retry "
+                                         "backoff ended), by environment and kind",
+                                         buckets=(1.0, 5.0, 15.0, 60.0, 300.0, 900.0, 1800.0, 3600.0, 7200.0))
+UPLOAD_LIMIT = _registry.gauge("upload_concurrency_limit", "Current adaptive limit on concurrent uploads, by limiter")
+UPLOADS_IN_FLIGHT = _registry.gauge("uploads_in_flight", "Uploads holding a limiter slot, by limiter")
+UPLOADS_QUEUED = _registry.gauge("uploads_queued", "Uploads waiting for a limiter slot, by limiter")
+SUBPROCESS_SECONDS = _registry.histogram("subprocess_seconds", "Subprocess wall time, by command and outcome")
+STAGE_SECONDS = _registry.histogram("stage_seconds", "Pipeline stage wall time, by stage")
+LAST_RUN = _registry.gauge("last_run_timestamp_seconds", "Unix time the metrics file was written")
+
+
+def _flush_at_exit():
+    path = os.environ.get(METRICS_ENV)
+    if not path:
+        return
+    LAST_RUN.set(time.time())
+    fmt = os.environ.get(FORMAT_ENV)
+    _registry.write(path, openmetrics=(fmt == "openmetrics") if fmt else None)
+    print(f"📝 Metrics written to {path}")
+
+
+atexit.register(_flush_at_exit)
@@ -0,0 +1,189 @@
+import time
+import urllib.parse
+from typing import Dict, List, Optional
+
+import requests
+
+from bandwidth import limited
+from metrics import HTTP_SECONDS
+from tracing import traced
+
+
+class NexusError(Exception):
+    """Raised when a Nexus3 REST call fails"""
+
+
+class NexusOperations:
+    """
+    Promote and cleanup of Nexus3 components.
+
+    Promotion uses the staging move API (Nexus Pro). Where that endpoint is
+    missing it falls back to copying each asset to the target repository and
+    deleting the source component.
+    """
+
+    def __init__(self, base_url: str, username: Optional[str] = None, password: Optional[str] = None,
+                 verbose: bool = True, session: Optional[requests.Session] = None):
+        self.base_url = base_url.rstrip("/")
+        session = session or requests.Session()
+        if username and password:
+            session.auth = (username, password)
+        self.session = limited(session)
+        self.verbose = verbose
+
+    # ----------------------------
+    # Helper methods
+    # ----------------------------
+
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
+
+    def _request(self, method: str, path: str, operation: str, **kwargs) -> requests.Response:
+        url = path if path.startswith("http") else f"{self.base_url}{path}"
+        started = time.perf_counter()
+        response = self.session.request(method, url, **kwargs)
+        HTTP_SECONDS.observe(time.perf_counter() - started, service="nexus", operation=operation,
+                             status=response.status_code)
+        return response
+
+    @staticmethod
+    def _raise_for_status(response: requests.Response, action: str):
+        if response.status_code >= 400:
+            raise NexusError(f"{action} failed: {response.status_code} - {response.text}")
+
+    # ----------------------------
+    # Public functions
+    # ----------------------------
+
+    def search_components(self, repository: str, group_id: str, artifact_id: Optional[str] = None,
+                          version: Optional[str] = None) -> List[Dict]:
+        """Return every matching component, following continuation tokens"""
+        params = {"repository": repository, "group": group_id}
+        if artifact_id:
+            params["name"] = artifact_id
+        if version:
+            params["version"] = version
+
+        components: List[Dict] = []
+        token = None
+        while True:
+            query = dict(params, continuationToken=token) if token else params
+            response = self._request("GET", "/service/rest/v1/search", "search", params=query)
+            self._raise_for_status(response, "Search")
+            data = response.json()
+            components.extend(data.get("items", []))
+            token = data.get("continuationToken")
+            if not token:
+                return components
+
+    def search_assets(self, repository: str, **filters: str) -> List[Dict]:
+        """Return every matching asset (filters as in the search API, e.g. group, name, maven.extension)"""
+        params = dict({"repository": repository}, **{k: v for k, v in filters.items() if v})
+        assets: List[Dict] = []
+        token = None
+        while True:
+            query = dict(params, continuationToken=token) if token else params
+            response = self._request("GET", "/service/rest/v1/search/assets", "search", params=query)
+            self._raise_for_status(response, "Asset search")
+            data = response.json()
+            assets.extend(data.get("items", []))
+            token = data.get("continuationToken")
+            if not token:
+                return assets
+
+    def fetch_json(self, url: str):
+        """GET a repository file (absolute URL or path) and decode it as JSON"""
+        response = self._request("GET", url, "download")
+        self._raise_for_status(response, f"Download of {url}")
+        return response.json()
+
+    def delete_component(self, component_id: str):
+        response = self._request("DELETE", f"/service/rest/v1/components/{urllib.parse.quote(component_id)}",
+                                 "delete")
+        if response.status_code != 404:
+            self._raise_for_status(response, f"Delete of component {component_id}")
+
+    def _copy_component(self, component: Dict, target: str):
+        for asset in component.get("assets", []):
+            path = asset["path"].lstrip("/")
+            with self._request("GET", asset["downloadUrl"], "download", stream=True) as source:
+                self._raise_for_status(source, f"Download of {path}")
+                # requests streams the generator as a chunked upload, so the asset is never held in memory
+                response = self._request("PUT", f"/repository/{target}/{path}", "upload",
+                                         data=source.iter_content(chunk_size=1024 * 1024))
+            self._raise_for_status(response, f"Upload of {path} to {target}")
+
+    @traced("nexus.promote", fields=("group_id", "version"))
+    def promote(self, group_id: str, version: str, source: str = "maven-staging", target: str = "maven-releases",
+                artifact_id: Optional[str] = None) -> int:
+        """
+        Move a release from the staging repository to the release repository.
+
+        Returns:
+            int: Number of components promoted
+        """
+        params = {"repository": source, "group": group_id, "version": version}
+        if artifact_id:
+            params["name"] = artifact_id
+        self._log(f"🚚 Promoting {group_id}:{artifact_id or '*'}:{version} from {source} to {target}")
+
+        response = self._request("POST", f"/service/rest/v1/staging/move/{urllib.parse.quote(target)}",
+                                 "promote", params=params)
+        if response.status_code not in (404, 405):
+            self._raise_for_status(response, "Promote")
+            moved = response.json().get("data", {}).get("components moved", [])
+            self._log(f"✅ Promoted {len(moved)} component(s) via staging move")
+            return len(moved)
+
+        # Staging API unavailable (Nexus OSS): copy assets, then delete from staging
+        components = self.search_components(source, group_id, artifact_id, version)
+        if not components:
+            raise NexusError(f"Nothing to promote: {group_id}:{artifact_id or '*'}:{version} not found in {source}")
+        for component in components:
+            self._copy_component(component, target)
+            self.delete_component(component["id"])
+            self._log(f"✅ Promoted {component.get('name')}:{component.get('version')}")
+        return len(components)
+
+    @traced("nexus.cleanup", fields=("repository", "group_id"))
+    def cleanup(self, repository: str, group_id: str, artifact_id: Optional[str] = None,
+                version: Optional[str] = None, keep: int = 0, dry_run: bool = False) -> List[str]:
+        """
+        Delete components from a repository.
+
+        Args:
+            repository: Repository to clean, usually the staging repository
+            group_id: Nexus3 group ID
+            artifact_id: Restrict to one artifact
+            version: Delete only this version
+            keep: When no version is given, keep this many most recently modified versions
+            dry_run: Only report what would be deleted
+
+        Returns:
+            list: "name:version" of each deleted component
+        """
+        components = self.search_components(repository, group_id, artifact_id, version)
+        if not version and keep:
+            def last_modified(component: Dict) -> str:
+                return max((a.get("lastModified") or "" for a in component.get("assets", [])), default="")
+
+            by_version: Dict[str, List[Dict]] = {}
+            for component in components:
+                by_version.setdefault(component.get("version"), []).append(component)
+            ordered = sorted(by_version.values(), key=lambda group: max(last_modified(c) for c in group),
+                             reverse=True)
+            components = [c for group in ordered[keep:] for c in group]
+
+        deleted = []
+        for component in components:
+            label = f"{component.get('name')}:{component.get('version')}"
+            if dry_run:
+                self._log(f"🧹 Would delete {label} from {repository}")
+            else:
+                self.delete_component(component["id"])
+                self._log(f"🧹 Deleted {label} from {repository}")
+            deleted.append(label)
+        self._log(f"✅ Cleanup of {repository} done: {len(deleted)} component(s)"
+                  + (" (dry run)" if dry_run else ""))
+        return deleted
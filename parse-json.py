@@ -2,6 +2,8 @@ import json
 import os
 from typing import Dict, Any, Optional
 
+from tracing import traced
+
 class MetadataParser:
     def __init__(self):
         self.version_code: Optional[str] = None
@@ -29,6 +31,7 @@ class MetadataParser:
                 return default
         return current if current is not None else default
 
+    @traced("metadata.parse", fields=("metadata_file_path",))
     def parse_metadata_to_map(self, metadata_file_path: str = './metadata.json') -> bool:
         """
         解析metadata.json文件并存储为实例变量
@@ -115,4 +118,5 @@ class MetadataParser:
         print(f"Group ID: {self.group_id}")
         print(f"Artifact ID: {self.artifact_id}")
         print(f"Version ID: {self.version_id}")
-        print(f"Application
\ No newline at end of file
+        print(f"Application ID: {self.application_id}")
+        print(f"Platform: {self.platform}")
@@ -0,0 +1,593 @@
+"""
+Single entry point for the post-release workflow steps.
+
+    python post_release.py fetch --nexus-url ... --group-id ... --artifact-id ... --version ...
+    python post_release.py parse --metadata metadata.json --github-output
+    python post_release.py install-client --client-version 8.287.2.1009
+    python post_release.py select-xcode --client-version 8.287.2.1009
+    python post_release.py package-dsym MyApp.app.dSYM -o MyApp.app.dSYM.zip --level 6
+    python post_release.py upload --platform android --env prod ... mapping.txt
+    python post_release.py promote --nexus-url ... --group-id ... --version ...
+    python post_release.py cleanup --nexus-url ... --repository maven-staging --group-id ... --keep 3
+    python post_release.py release --nexus-url ... --group-id ... --artifact-id ... --version ... --platform ios
+    python post_release.py batch --nexus-url ... --env prod releases.csv --results batch-results.json
+    python post_release.py reconcile --nexus-url ... --env prod --source dynatrace --output gaps.csv
+    python post_release.py queue add --env prod releases.csv
+    python post_release.py queue work --nexus-url ... --workers 4 --drain
+    python post_release.py queue status
+
+Only argparse is imported up front; each subcommand imports what it needs
+(requests, the fetch/parse scripts, fastlane wrappers) when it runs, so a
+step does not pay for the modules of the other steps.
+"""
+import argparse
+import os
+import sys
+
+
+def _write_github_output(values):
+    path = os.environ.get("GITHUB_OUTPUT")
+    if not path:
+        return
+    with open(path, "a", encoding="utf-8") as f:
+        for key, value in values.items():
+            f.write(f"{key}={'' if value is None else value}\n")
+
+
+def _nexus_session(args, session=None, hedge_workers: int = 16):
+    """
+    `session` with --hedge and the bandwidth limit applied; None (plain
+    requests) when neither is in effect and no session was given.
+    """
+    if args.hedge:
+        from hedging import HedgedSession
+        session = HedgedSession(session, max_workers=hedge_workers)
+    from bandwidth import limited
+    # outside the hedging, so a hedged GET counts as one request and its body is charged once
+    return limited(session)
+
+
+def _configure_bandwidth(args):
+    if getattr(args, "max_bandwidth", None) or getattr(args, "max_requests", None):
+        from bandwidth import configure
+        configure(args.max_bandwidth, args.max_requests)
+
+
+# ----------------------------
+# Subcommands
+# ----------------------------
+
+def cmd_fetch(args) -> int:
+    from script_loader import load_script
+    fetch = load_script("fetch-artifact.py")
+
+    session = _nexus_session(args)
+    if args.search:
+        path = fetch.download_from_nexus3(args.nexus_url, args.repository, args.group_id, args.artifact_id,
+                                          args.version, packaging=args.packaging, classifier=args.classifier,
+                                          username=args.username, password=args.password,
+                                          download_path=args.output_dir, session=session)
+    else:
+        try:
+            path = fetch.download_from_nexus(args.nexus_url, args.repository, args.group_id, args.artifact_id,
+                                             args.version, packaging=args.packaging, classifier=args.classifier,
+                                             username=args.username, password=args.password,
+                                             output_dir=args.output_dir, session=session)
+        except Exception as e:
+            print(e)
+            return 1
+    if session:
+        session.print_stats()
+    if not path:
+        return 1
+    _write_github_output({"artifact_path": path})
+    return 0
+
+
+def cmd_parse(args) -> int:
+    from script_loader import load_script
+    parser = load_script("parse-json.py").MetadataParser()
+
+    if not parser.parse_metadata_to_map(args.metadata):
+        return 1
+    if args.github_output:
+        _write_github_output({
+            "version_code": parser.version_code,
+            "version_name": parser.version_name,
+            "package_name": parser.package_name,
+            "group_id": parser.group_id,
+            "artifact_id": parser.artifact_id,
+            "version_id": parser.version_id,
+            "application_id": parser.application_id,
+            "platform": parser.platform,
+        })
+    return 0
+
+
+def cmd_install_client(args) -> int:
+    from gaixie import DynatraceSymbolManager
+
+    developer_dir = DynatraceSymbolManager(client_version=args.client_version).install_client()
+    print(f"✅ Installation complete. DEVELOPER_DIR: {developer_dir}")
+    _write_github_output({"developer_dir": developer_dir})
+    return 0
+
+
+def cmd_select_xcode(args) -> int:
+    from gaixie import DynatraceSymbolManager
+
+    developer_dir = DynatraceSymbolManager(client_version=args.client_version).select_xcode()
+    print(developer_dir)
+    _write_github_output({"developer_dir": developer_dir})
+    return 0
+
+
+def cmd_package_dsym(args) -> int:
+    from dsym_packager import package_dsym
+
+    try:
+        package_dsym(args.sources, args.output, level=args.level, workers=args.workers)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+def cmd_thin_dsym(args) -> int:
+    from macho_thin import DEFAULT_ARCHS, thin_symbol_file
+
+    try:
+        thin_symbol_file(args.source, args.arch or DEFAULT_ARCHS, args.output_dir)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+def cmd_upload(args) -> int:
+    if not args.token:
+        print("❌ Dynatrace API token missing (--token or DT_API_TOKEN)")
+        return 2
+
+    from dynatrace_client import TokenError, get_client
+
+    if args.platform == "android":
+        from mapping_uploader import MappingUploader
+        from upload_ledger import UploadLedger
+
+        ledger = UploadLedger(args.ledger)
+        uploader = MappingUploader(args.env, args.token, ledger=ledger, force=args.force,
+                                   validate=not args.no_validate, base_url=args.base_url,
+                                   precheck=not args.no_precheck)
+        try:
+            uploader.upload(args.file, args.application_id, args.package_name,
+                            args.version_code, args.version_name)
+        except TokenError as e:
+            print(f"❌ {e}")
+            return 1
+        finally:
+            ledger.print_summary()
+        return 1 if ledger.failed_files else 0
+
+    import subprocess
+    from concurrency import ThrottledError
+    from script_loader import load_script
+    from upload_ledger import UploadLedger
+
+    client = get_client(args.env, args.base_url)
+    try:
+        client.validate_token(args.token)
+    except TokenError as e:
+        print(f"❌ {e}")
+        return 1
+    fastlane = load_script("py-fastlane.py")
+    ledger = UploadLedger(args.ledger)
+    uploader = fastlane.DynatraceFastlaneUploader(fastlane_path=args.fastlane, timeout=args.timeout,
+                                                  archs=args.arch, ledger=ledger, force=args.force)
+    try:
+        uploader.process_symbols(args.application_id, args.token, args.dtx_client_path, args.file,
+                                 args.package_name, args.version_name, args.version_code,
+                                 os_type=args.platform, server_url=client.base_url, debug_mode=args.debug,
+                                 precheck=not (args.no_precheck or args.force), environment=args.env)
+    except (subprocess.SubprocessError, ThrottledError):
+        return 1
+    finally:
+        ledger.print_summary()
+    return 0
+
+
+def cmd_promote(args) -> int:
+    from nexus_ops import NexusError, NexusOperations
+
+    ops = NexusOperations(args.nexus_url, args.username, args.password)
+    try:
+        ops.promote(args.group_id, args.version, source=args.source, target=args.target,
+                    artifact_id=args.artifact_id)
+        if args.cleanup_keep is not None:
+            ops.cleanup(args.source, args.group_id, artifact_id=args.artifact_id, keep=args.cleanup_keep)
+    except NexusError as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+def cmd_cleanup(args) -> int:
+    from nexus_ops import NexusError, NexusOperations
+
+    if not args.version and not args.keep:
+        print("❌ Pass --version or --keep, refusing to delete every version")
+        return 2
+    ops = NexusOperations(args.nexus_url, args.username, args.password)
+    try:
+        ops.cleanup(args.repository, args.group_id, artifact_id=args.artifact_id, version=args.version,
+                    keep=args.keep, dry_run=args.dry_run)
+    except NexusError as e:
+        print(f"❌ {e}")
+        return 1
+    return 0
+
+
+def cmd_release(args) -> int:
+    from release_flow import ReleaseFlow
+    from upload_ledger import UploadLedger
+
+    if not args.token:
+        print("❌ Dynatrace API token missing (--token or DT_API_TOKEN)")
+        return 2
+    ledger = UploadLedger(args.ledger)
+    session = _nexus_session(args)
+    flow = ReleaseFlow(args.nexus_url, args.env, args.token, repository=args.repository, username=args.username,
+                       password=args.password, client_version=args.client_version, work_dir=args.work_dir,
+                       ledger=ledger, force=args.force, max_workers=args.max_workers, session=session,
+                       archs=args.arch, precheck=not args.no_precheck)
+    try:
+        flow.run(args.group_id, args.artifact_id, args.version, args.platform)
+    finally:
+        ledger.print_summary()
+        if session:
+            session.print_stats()
+    return 1 if ledger.failed_files else 0
+
+
+def cmd_batch(args) -> int:
+    import requests
+    from dynatrace_client import get_client
+    from release_batch import BatchResults, load_manifest, run_batch
+    from release_flow import ReleaseFlow
+    from upload_ledger import UploadLedger
+
+    if not args.token:
+        print("❌ Dynatrace API token missing (--token or DT_API_TOKEN)")
+        return 2
+    ledger = UploadLedger(args.ledger)
+    # Dynatrace uploads share one pooled session per environment, sized for the parallel releases
+    get_client(args.env, pool_size=max(10, args.max_parallel * 4))
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_maxsize=max(10, args.max_parallel * 4))
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session = _nexus_session(args, session, hedge_workers=max(16, args.max_parallel * 4))
+    flow = ReleaseFlow(args.nexus_url, args.env, args.token, repository=args.repository, username=args.username,
+                       password=args.password, client_version=args.client_version, work_dir=args.work_dir,
+                       ledger=ledger, force=args.force, session=session, archs=args.arch,
+                       precheck=not args.no_precheck)
+    try:
+        report = run_batch(flow, load_manifest(args.manifest, args.platform), BatchResults(args.results),
+                           max_parallel=args.max_parallel, resume=args.resume)
+    finally:
+        ledger.print_summary()
+        if hasattr(session, "print_stats"):
+            session.print_stats()
+    return 1 if any(r["status"] == "failed" for r in report) else 0
+
+
+def cmd_reconcile(args) -> int:
+    from nexus_ops import NexusOperations
+    from reconcile import print_gaps, reconcile, uploaded_from_dynatrace, uploaded_from_ledger, write_gaps
+
+    if args.source == "dynatrace":
+        if not args.token:
+            print("❌ Dynatrace API token missing (--token or DT_API_TOKEN)")
+            return 2
+        uploaded = uploaded_from_dynatrace(args.env, args.token, args.base_url)
+    else:
+        uploaded = uploaded_from_ledger(args.ledger, args.env)
+    print(f"📋 {len(uploaded)} upload(s) known from {args.source}")
+
+    ops = NexusOperations(args.nexus_url, args.username, args.password, verbose=False)
+    try:
+        gaps = reconcile(ops, args.repository, uploaded, group_id=args.group_id, classifier=args.classifier,
+                         index_path=args.index or None, max_workers=args.max_workers)
+    except RuntimeError as e:
+        print(f"❌ {e}")
+        return 2
+    print_gaps(gaps)
+    if args.output:
+        write_gaps(gaps, args.output)
+        print(f"📝 Gaps written to {args.output}")
+    return 1 if gaps else 0
+
+
+def cmd_queue_add(args) -> int:
+    import json
+    from job_queue import JobQueue
+
+    queue = JobQueue(args.db, verbose=False)
+    if args.kind != "release" or args.payload:
+        if not args.payload:
+            print(f"❌ --payload is required for {args.kind} jobs")
+            return 2
+        payloads = [json.loads(args.payload)]
+    elif args.manifest:
+        from release_batch import load_manifest
+        payloads = load_manifest(args.manifest, args.platform)
+    elif args.group_id and args.artifact_id and args.version and args.platform:
+        payloads = [dict(group_id=args.group_id, artifact_id=args.artifact_id, version_id=args.version,
+                         platform=args.platform, client_version=args.client_version)]
+    else:
+        print("❌ Give a manifest, or --group-id, --artifact-id, --version and --platform")
+        return 2
+
+    ids = [queue.enqueue(args.kind, args.env, payload, priority=args.priority, max_attempts=args.max_attempts)
+           for payload in payloads]
+    print(f"📥 {len(ids)} {args.kind} job(s) for {args.env}: {', '.join(map(str, ids))}")
+    queue.print_stats()
+    return 0
+
+
+def cmd_queue_work(args) -> int:
+    from dynatrace_client import TokenError
+    from job_queue import JobHandlers, JobQueue, WorkerPool
+    from upload_ledger import UploadLedger
+
+    queue = JobQueue(args.db, lease_seconds=args.lease)
+    ledger = UploadLedger(args.ledger)
+    session = _nexus_session(args)
+    handlers = JobHandlers(args.nexus_url, args.username, args.password, repository=args.repository,
+                           work_dir=args.work_dir, ledger=ledger, session=session,
+                           client_version=args.client_version)
+    pool = WorkerPool(queue, handlers.as_dict(), workers=args.workers,
+                      permanent_errors=(ValueError, KeyError, TokenError))
+    try:
+        processed = pool.run(drain=args.drain)
+    finally:
+        ledger.print_summary()
+        if session:
+            session.print_stats()
+    print(f"\nProcessed: done {processed['done']}  retried {processed['retried']}  failed {processed['failed']}  "
+          f"lease lost {processed['lost']}")
+    queue.print_stats()
+    return 1 if processed["failed"] else 0
+
+
+def cmd_queue_status(args) -> int:
+    from job_queue import JobQueue
+
+    queue = JobQueue(args.db, verbose=False)
+    if args.requeue_failed:
+        print(f"🔁 {queue.requeue_failed()} failed job(s) requeued")
+    queue.print_stats()
+    return 0
+
+
+# ----------------------------
+# Argument parsing
+# ----------------------------
+
+def _add_limit_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--max-bandwidth", help="Nexus bytes/s for the whole process, e.g. 50MB or "
+                                                "nexus.example.com=50MB,*=10MB (default: $NEXUS_MAX_BANDWIDTH)")
+    parser.add_argument("--max-requests", help="Nexus requests/s, same form, e.g. 20 "
+                                               "(default: $NEXUS_MAX_REQUESTS)")
+
+
+def _add_arch_arg(parser: argparse.ArgumentParser,
+                  help: str = "Upload only this architecture of the dSYM (repeatable, e.g. --arch arm64; ios)"):
+    parser.add_argument("--arch", action="append", help=help)
+
+
+def _add_nexus_args(parser: argparse.ArgumentParser, artifact_required: bool = False):
+    parser.add_argument("--nexus-url", default=os.environ.get("NEXUS_URL"), required="NEXUS_URL" not in os.environ)
+    parser.add_argument("--username", default=os.environ.get("NEXUS_USERNAME"))
+    parser.add_argument("--password", default=os.environ.get("NEXUS_PASSWORD"))
+    parser.add_argument("--group-id", required=True)
+    parser.add_argument("--artifact-id", required=artifact_required)
+    _add_limit_args(parser)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="post_release", description="Post-release automation steps")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("fetch", help="Download an artifact from Nexus3")
+    _add_nexus_args(p, artifact_required=True)
+    p.add_argument("--repository", default="maven-releases")
+    p.add_argument("--version", required=True)
+    p.add_argument("--packaging", default="zip")
+    p.add_argument("--classifier")
+    p.add_argument("--output-dir", default=".")
+    p.add_argument("--search", action="store_true", help="Resolve the asset through the search API")
+    p.add_argument("--hedge", action="store_true",
+                   help="Re-send Nexus GETs slower than the recent p95 and use the first response")
+    p.set_defaults(func=cmd_fetch)
+
+    p = sub.add_parser("parse", help="Parse metadata.json")
+    p.add_argument("--metadata", default="./metadata.json")
+    p.add_argument("--github-output", action="store_true", help="Also write the fields to $GITHUB_OUTPUT")
+    p.set_defaults(func=cmd_parse)
+
+    p = sub.add_parser("install-client", help="Install the Dynatrace symbol client and link LLDB")
+    p.add_argument("--client-version", required=True)
+    p.set_defaults(func=cmd_install_client)
+
+    p = sub.add_parser("select-xcode", help="Print the DEVELOPER_DIR matching the Dynatrace client")
+    p.add_argument("--client-version", required=True)
+    p.set_defaults(func=cmd_select_xcode)
+
+    p = sub.add_parser("package-dsym", help="Zip .dSYM bundles for upload, compressing on all cores")
+    p.add_argument("sources", nargs="+", help=".dSYM directories or files")
+    p.add_argument("-o", "--output", required=True, help="Zip to write, e.g. MyApp.app.dSYM.zip")
+    p.add_argument("--level", type=int, default=6, help="Deflate level 0-9")
+    p.add_argument("--workers", type=int, help="Compression threads (default: CPU count)")
+    p.set_defaults(func=cmd_package_dsym)
+
+    p = sub.add_parser("thin-dsym", help="Copy a dSYM keeping only the given architecture slices (no lipo needed)")
+    p.add_argument("source", help=".dSYM directory, dSYM zip or Mach-O binary")
+    p.add_argument("-o", "--output-dir", required=True, help="Directory for the thinned copy")
+    _add_arch_arg(p, "Architecture to keep (repeatable, default: arm64 and arm64e)")
+    p.set_defaults(func=cmd_thin_dsym)
+
+    p = sub.add_parser("upload", help="Upload a mapping (android) or symbol file (ios) to Dynatrace")
+    p.add_argument("--platform", choices=["android", "ios"], required=True)
+    p.add_argument("--env", choices=["dev", "pat", "prod"], required=True)
+    p.add_argument("--token", default=os.environ.get("DT_API_TOKEN"), help="Defaults to $DT_API_TOKEN")
+    p.add_argument("--base-url", help="Override the Dynatrace environment URL")
+    p.add_argument("--application-id", required=True)
+    p.add_argument("--package-name", required=True, help="Package or bundle name")
+    p.add_argument("--version-code", required=True)
+    p.add_argument("--version-name", required=True)
+    p.add_argument("--ledger", default=".upload-ledger.json", help="Upload ledger path")
+    p.add_argument("--force", action="store_true", help="Upload even if the ledger has this file")
+    p.add_argument("--no-validate", action="store_true", help="Skip mapping format validation")
+    p.add_argument("--no-precheck", action="store_true",
+                   help="Upload without asking Dynatrace whether this app/version is already there")
+    p.add_argument("--fastlane", default="fastlane", help="fastlane executable (ios)")
+    p.add_argument("--dtx-client-path", default="./DTXDssClient", help="DTXDssClient path (ios)")
+    p.add_argument("--timeout", type=float, help="Kill fastlane after this many seconds (ios)")
+    p.add_argument("--debug", action="store_true")
+    _add_arch_arg(p)
+    p.add_argument("file", help="Mapping file, .dSYM or .zip")
+    p.set_defaults(func=cmd_upload)
+
+    p = sub.add_parser("promote", help="Move a release from the staging to the release repository")
+    _add_nexus_args(p)
+    p.add_argument("--version", required=True)
+    p.add_argument("--source", default="maven-staging")
+    p.add_argument("--target", default="maven-releases")
+    p.add_argument("--cleanup-keep", type=int,
+                   help="Afterwards delete all but this many most recent versions from the source (promote&cleanup)")
+    p.set_defaults(func=cmd_promote)
+
+    p = sub.add_parser("cleanup", help="Delete old versions from a repository")
+    _add_nexus_args(p)
+    p.add_argument("--repository", default="maven-staging")
+    p.add_argument("--version", help="Delete only this version")
+    p.add_argument("--keep", type=int, default=0, help="Keep this many most recent versions")
+    p.add_argument("--dry-run", action="store_true")
+    p.set_defaults(func=cmd_cleanup)
+
+    p = sub.add_parser("release", help="Whole upload flow as a stage graph (fetch, parse, download, install, upload)")
+    _add_nexus_args(p, artifact_required=True)
+    p.add_argument("--repository", default="maven-releases")
+    p.add_argument("--version", required=True)
+    p.add_argument("--platform", choices=["android", "ios"], required=True)
+    p.add_argument("--env", choices=["dev", "pat", "prod"], required=True)
+    p.add_argument("--token", default=os.environ.get("DT_API_TOKEN"), help="Defaults to $DT_API_TOKEN")
+    p.add_argument("--client-version", help="Dynatrace iOS agent version (ios)")
+    p.add_argument("--work-dir", default=".")
+    p.add_argument("--max-workers", type=int, default=4, help="Stages allowed to run at once")
+    p.add_argument("--hedge", action="store_true",
+                   help="Re-send Nexus GETs slower than the recent p95 and use the first response")
+    p.add_argument("--ledger", default=".upload-ledger.json", help="Upload ledger path")
+    p.add_argument("--force", action="store_true", help="Upload even if the ledger has this file")
+    p.add_argument("--no-precheck", action="store_true",
+                   help="Upload without asking Dynatrace whether this app/version is already there")
+    _add_arch_arg(p)
+    p.set_defaults(func=cmd_release)
+
+    p = sub.add_parser("batch", help="Run the release flow for every release in a JSON/CSV manifest")
+    p.add_argument("manifest", help="JSON or CSV with group_id, artifact_id, version_id[, platform, client_version]")
+    p.add_argument("--nexus-url", default=os.environ.get("NEXUS_URL"), required="NEXUS_URL" not in os.environ)
+    p.add_argument("--username", default=os.environ.get("NEXUS_USERNAME"))
+    p.add_argument("--password", default=os.environ.get("NEXUS_PASSWORD"))
+    p.add_argument("--repository", default="maven-releases")
+    p.add_argument("--env", choices=["dev", "pat", "prod"], required=True)
+    p.add_argument("--token", default=os.environ.get("DT_API_TOKEN"), help="Defaults to $DT_API_TOKEN")
+    p.add_argument("--platform", choices=["android", "ios"], help="Default for entries without one")
+    p.add_argument("--client-version", help="Default Dynatrace iOS agent version")
+    p.add_argument("--work-dir", default=".")
+    p.add_argument("--max-parallel", type=int, default=4, help="Releases processed at the same time")
+    _add_limit_args(p)
+    p.add_argument("--results", default="batch-results.json", help="Per-release status file")
+    p.add_argument("--resume", action="store_true", help="Skip releases already ok in the results file")
+    p.add_argument("--hedge", action="store_true",
+                   help="Re-send Nexus GETs slower than the recent p95 and use the first response")
+    p.add_argument("--ledger", default=".upload-ledger.json", help="Upload ledger path")
+    p.add_argument("--force", action="store_true", help="Upload even if the ledger has this file")
+    p.add_argument("--no-precheck", action="store_true",
+                   help="Upload without asking Dynatrace whether this app/version is already there")
+    _add_arch_arg(p)
+    p.set_defaults(func=cmd_batch)
+
+    p = sub.add_parser("reconcile", help="List releases whose metadata.json is in Nexus but whose symbols are not uploaded")
+    p.add_argument("--nexus-url", default=os.environ.get("NEXUS_URL"), required="NEXUS_URL" not in os.environ)
+    p.add_argument("--username", default=os.environ.get("NEXUS_USERNAME"))
+    p.add_argument("--password", default=os.environ.get("NEXUS_PASSWORD"))
+    p.add_argument("--repository", default="maven-releases")
+    p.add_argument("--group-id", help="Only metadata under this group")
+    p.add_argument("--classifier", help="Classifier of the metadata JSON files, if any")
+    p.add_argument("--env", choices=["dev", "pat", "prod"], required=True)
+    p.add_argument("--source", choices=["ledger", "dynatrace"], default="dynatrace",
+                   help="Where the uploaded set comes from (the ledger only knows this machine's uploads)")
+    p.add_argument("--ledger", default=".upload-ledger.json", help="Upload ledger path (--source ledger)")
+    p.add_argument("--token", default=os.environ.get("DT_API_TOKEN"), help="Defaults to $DT_API_TOKEN")
+    p.add_argument("--base-url", help="Override the Dynatrace environment URL")
+    p.add_argument("--index", default=".reconcile-index.json",
+                   help="Parsed metadata cache by checksum; empty string to disable")
+    p.add_argument("--max-workers", type=int, default=16, help="Parallel metadata downloads")
+    _add_limit_args(p)
+    p.add_argument("--output", help="Write the gaps as JSON, or as a batch manifest if it ends in .csv")
+    p.set_defaults(func=cmd_reconcile)
+
+    p = sub.add_parser("queue", help="Durable priority queue of release/fetch/preprocess/upload jobs")
+    queue_sub = p.add_subparsers(dest="action", required=True)
+
+    q = queue_sub.add_parser("add", help="Queue jobs (release jobs from a manifest or coordinates)")
+    q.add_argument("manifest", nargs="?", help="JSON or CSV manifest, as for batch")
+    q.add_argument("--env", choices=["dev", "pat", "prod"], required=True)
+    q.add_argument("--kind", choices=["release", "fetch", "preprocess", "upload"], default="release")
+    q.add_argument("--payload", help="Job parameters as JSON (required for kinds other than release)")
+    q.add_argument("--group-id")
+    q.add_argument("--artifact-id")
+    q.add_argument("--version")
+    q.add_argument("--platform", choices=["android", "ios"], help="Default for manifest entries without one")
+    q.add_argument("--client-version", help="Dynatrace iOS agent version (ios)")
+    q.add_argument("--priority", type=int, help="Lower runs first (default: prod 0, pat 1, dev 2)")
+    q.add_argument("--max-attempts", type=int, default=3)
+    q.add_argument("--db", default=".job-queue.db", help="Queue database")
+    q.set_defaults(func=cmd_queue_add)
+
+    q = queue_sub.add_parser("work", help="Run queued jobs with a pool of workers")
+    q.add_argument("--nexus-url", default=os.environ.get("NEXUS_URL"), required="NEXUS_URL" not in os.environ)
+    q.add_argument("--username", default=os.environ.get("NEXUS_USERNAME"))
+    q.add_argument("--password", default=os.environ.get("NEXUS_PASSWORD"))
+    q.add_argument("--repository", default="maven-releases")
+    q.add_argument("--client-version", help="Default Dynatrace iOS agent version")
+    q.add_argument("--work-dir", default=".")
+    q.add_argument("--workers", type=int, default=4, help="Jobs run at the same time")
+    _add_limit_args(q)
+    q.add_argument("--lease", type=float, default=300.0,
+                   help="Seconds without a heartbeat after which another worker takes a job over")
+    q.add_argument("--drain", action="store_true", help="Exit once nothing is queued or running")
+    q.add_argument("--hedge", action="store_true",
+                   help="Re-send Nexus GETs slower than the recent p95 and use the first response")
+    q.add_argument("--ledger", default=".upload-ledger.json", help="Upload ledger path")
+    q.add_argument("--db", default=".job-queue.db", help="Queue database")
+    q.set_defaults(func=cmd_queue_work)
+
+    q = queue_sub.add_parser("status", help="Queue depth, wait times and failed jobs")
+    q.add_argument("--requeue-failed", action="store_true", help="Give failed jobs a fresh set of attempts")
+    q.add_argument("--db", default=".job-queue.db", help="Queue database")
+    q.set_defaults(func=cmd_queue_status)
+
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    _configure_bandwidth(args)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
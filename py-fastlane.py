@@ -1,17 +1,207 @@
+import copy
 import subprocess
 import json
+import os
+import shutil
+import tempfile
+import uuid
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+from concurrency import ThrottledError, detect_throttle, get_limiter, run_throttled
+from macho_uuid import dedupe_symbol_files
+from metrics import UPLOAD_BYTES
+from stream_run import run_streaming
+from symbol_pool import PoolJob, SymbolJobPool
+from tracing import span, traced
+
+# Generated lane for batch mode: one fastlane/Ruby/bundler startup for all jobs.
+# Results are rewritten after every job so a crash keeps what already finished.
+BATCH_LANE = "dynatrace_batch_process_symbols"
+BATCH_FASTFILE = """default_platform(:ios)
+
+platform :ios do
+  desc "Process many dSYMs with Dynatrace in one run (generated by py-fastlane.py)"
+  lane :%(lane)s do |options|
+    require "json"
+    jobs = JSON.parse(File.read(options[:jobs_file]))
+    results = []
+    jobs.each do |job|
+      started = Time.now
+      begin
+        dynatrace_process_symbols(**job["params"].transform_keys(&:to_sym))
+        results << { "id" => job["id"], "status" => "ok", "seconds" => Time.now - started }
+      rescue StandardError => e
+        results << { "id" => job["id"], "status" => "failed", "error" => e.message, "seconds" => Time.now - started }
+      end
+      File.write(options[:results_file], JSON.generate(results))
+    end
+  end
+end
+""" % {"lane": BATCH_LANE}
+
+
+class SymbolJob:
+    """One symbol file for DynatraceFastlaneUploader.process_symbols_batch"""
+
+    def __init__(
+        self,
+        app_id: str,
+        api_token: str,
+        dtx_client_path: str,
+        symbol_file: str,
+        bundle_name: str,
+        version_str: str,
+        version: str,
+        os_type: str = "ios",
+        server_url: str = "https://dynatrace-managed.com/e/your-environment-id",
+        debug_mode: bool = False,
+        job_id: Optional[str] = None,
+        developer_dir: Optional[str] = None
+    ):
+        self.app_id = app_id
+        self.api_token = api_token
+        self.dtx_client_path = dtx_client_path
+        self.symbol_file = symbol_file
+        self.bundle_name = bundle_name
+        self.version_str = version_str
+        self.version = version
+        self.os_type = os_type
+        self.server_url = server_url
+        self.debug_mode = debug_mode
+        self.job_id = job_id or uuid.uuid4().hex[:12]
+        self.developer_dir = developer_dir
+
+    def to_params(self) -> Dict[str, str]:
+        """Parameters for the dynatrace_process_symbols action"""
+        return {
+            "dtxDssClientPath": self.dtx_client_path,
+            "appId": self.app_id,
+            "apitoken": self.api_token,
+            "os": self.os_type,
+            "bundleName": self.bundle_name,
+            "versionStr": self.version_str,
+            "version": self.version,
+            "symbolIsFile": self.symbol_file,
+            "server": self.server_url,
+            "debugMode": str(self.debug_mode).lower()
+        }
+
+    def to_absolute_params(self) -> Dict[str, str]:
+        """to_params with absolute file paths, for fastlane runs in another working directory"""
+        return dict(self.to_params(),
+                    symbolIsFile=str(Path(self.symbol_file).resolve()),
+                    dtxDssClientPath=str(Path(self.dtx_client_path).resolve()))
+
+    def key(self) -> tuple:
+        """Dynatrace symbol file key (see dynatrace_client.symbol_file_key)"""
+        from dynatrace_client import symbol_file_key
+        return symbol_file_key(self.app_id, self.bundle_name, self.os_type, self.version, self.version_str)
+
+
+def symbol_file_size(path: str) -> int:
+    """Size of a symbol file, or the total of a .dSYM bundle directory"""
+    if os.path.isdir(path):
+        return sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, names in os.walk(path) for name in names)
+    return os.path.getsize(path) if os.path.exists(path) else 0
+
+
+def dedupe_symbol_jobs(jobs: List[SymbolJob]):
+    """
+    Drop jobs whose dSYM UUIDs are already covered by an earlier job for the same app/version.
+
+    Returns:
+        (jobs to run, {duplicate job_id: job_id of the job it duplicates})
+    """
+    groups: Dict[tuple, List[SymbolJob]] = {}
+    for job in jobs:
+        groups.setdefault((job.app_id, job.version_str, job.version), []).append(job)
+
+    duplicate_of = {}
+    for group in groups.values():
+        by_file = {}
+        for job in group:
+            by_file.setdefault(job.symbol_file, job)
+        unique_files, duplicates = dedupe_symbol_files(list(by_file))
+        for dup_file, original_file in duplicates.items():
+            duplicate_of[by_file[dup_file].job_id] = by_file[original_file].job_id
+        # The same path listed twice is a duplicate without scanning
+        for job in group:
+            first = by_file[job.symbol_file]
+            if job is not first:
+                duplicate_of[job.job_id] = first.job_id
+
+    return [job for job in jobs if job.job_id not in duplicate_of], duplicate_of
+
+
+def existing_symbol_jobs(jobs: List[SymbolJob]) -> Dict[str, dict]:
+    """
+    Jobs whose symbol file Dynatrace already lists, with one listing request
+    per server for the whole batch.
+
+    Returns:
+        {job_id: listing entry}
+    """
+    from dynatrace_client import client_for_url
+
+    groups: Dict[tuple, List[SymbolJob]] = {}
+    for job in jobs:
+        groups.setdefault((job.server_url, job.api_token), []).append(job)
+
+    existing = {}
+    for (server_url, api_token), group in groups.items():
+        present = client_for_url(server_url).existing_symbol_files(api_token, [job.key() for job in group])
+        existing.update({job.job_id: present[job.key()] for job in group if job.key() in present})
+    return existing
+
+
+def remember_uploaded(job: SymbolJob):
+    """Add an uploaded job to the cached listing, so later pre-checks skip it"""
+    from dynatrace_client import client_for_url
+    client_for_url(job.server_url).record_symbol_file(job.key())
+
 
 class DynatraceFastlaneUploader:
     """
     Wrapper class for the fastlane-plugin-dynatrace.
     Handles preprocessing and uploading of dSYM/symbol files to Dynatrace.
+    With a ledger, process_symbols and the batch/parallel paths skip symbol
+    files already uploaded to the given environment and record every outcome.
     """
 
-    def __init__(self, fastlane_path="fastlane", project_dir="."):
+    def __init__(self, fastlane_path="fastlane", project_dir=".", limiter=None, max_attempts=5, timeout=None,
+                 archs: Optional[Iterable[str]] = None, ledger=None, force=False):
         self.fastlane_path = fastlane_path
         self.project_dir = Path(project_dir).resolve()
+        self.limiter = limiter
+        self.max_attempts = max_attempts
+        self.timeout = timeout
+        # architectures to keep in uploaded dSYMs (e.g. ["arm64"]); None uploads every slice
+        self.archs = list(archs) if archs else None
+        self.ledger = ledger
+        self.force = force
 
+    @contextmanager
+    def _thinned(self, jobs: List[SymbolJob]):
+        """The jobs with symbol files thinned to self.archs (temporary copies, removed on exit)"""
+        if not self.archs or not jobs:
+            yield list(jobs)
+            return
+        from macho_thin import thin_symbol_file
+
+        with tempfile.TemporaryDirectory(prefix="dt-thin-") as tmp:
+            thinned = []
+            for i, job in enumerate(jobs):
+                path = thin_symbol_file(job.symbol_file, self.archs, os.path.join(tmp, str(i)))
+                if path != job.symbol_file:
+                    job = copy.copy(job)
+                    job.symbol_file = path
+                thinned.append(job)
+            yield thinned
+
+    @traced("fastlane.process_symbols", fields=("bundle_name", "version"))
     def process_symbols(
         self,
         app_id: str,
@@ -23,7 +213,10 @@ class DynatraceFastlaneUploader:
         version: str,
         os_type: str = "ios",
         server_url: str = "https://dynatrace-managed.com/e/your-environment-id",
-        debug_mode: bool = True
+        debug_mode: bool = True,
+        developer_dir: Optional[str] = None,
+        precheck: bool = False,
+        environment: Optional[str] = None
     ):
         """
         Run Fastlane dynatrace_process_symbols with all parameters.
@@ -39,20 +232,46 @@ class DynatraceFastlaneUploader:
             os_type: 'ios' or 'android'
             server_url: Dynatrace server endpoint
             debug_mode: Enable detailed output
+            developer_dir: Xcode Developer directory exported as DEVELOPER_DIR
+            precheck: Skip the upload if Dynatrace already lists this app/version
+            environment: Dynatrace environment (dev, pat, prod), the ledger key; no ledger without it
+
+        Returns:
+            The fastlane run result, or None if the ledger or precheck found the file already present
         """
 
-        params = {
-            "dtxDssClientPath": dtx_client_path,
-            "appId": app_id,
-            "apitoken": api_token,
-            "os": os_type,
-            "bundleName": bundle_name,
-            "versionStr": version_str,
-            "version": version,
-            "symbolIsFile": symbol_file,
-            "server": server_url,
-            "debugMode": str(debug_mode).lower()
-        }
+        job = SymbolJob(
+            app_id, api_token, dtx_client_path, symbol_file, bundle_name,
+            version_str, version, os_type, server_url, debug_mode
+        )
+        ledger = self.ledger if environment else None
+        digest = None
+        if ledger:
+            digest = ledger.file_digest(symbol_file)
+            if ledger.should_skip(environment, app_id, version, symbol_file, force=self.force, digest=digest):
+                return None
+        if precheck and existing_symbol_jobs([job]):
+            print(f"⏭️  {symbol_file}: Dynatrace already has {bundle_name} {version_str} ({version}), skipping")
+            if ledger:
+                ledger.record(environment, app_id, version, symbol_file, success=True, digest=digest,
+                              detail="already in Dynatrace", skipped=True)
+            return None
+        try:
+            with self._thinned([job]) as (upload_job,):
+                result = self._process_symbols_job(job, upload_job, developer_dir, precheck)
+        except (subprocess.SubprocessError, ThrottledError, OSError, ValueError) as e:
+            if ledger:
+                ledger.record(environment, app_id, version, symbol_file, success=False, digest=digest,
+                              detail=str(e))
+            raise
+        if ledger:
+            ledger.record(environment, app_id, version, symbol_file, success=True, digest=digest)
+        return result
+
+    def _process_symbols_job(self, job: SymbolJob, upload_job: SymbolJob, developer_dir: Optional[str],
+                             precheck: bool):
+        """Run the fastlane action for `job`, uploading upload_job's (possibly thinned) symbol file"""
+        params = upload_job.to_params()
 
         print("🟢 Running fastlane dynatrace_process_symbols...")
         print(json.dumps(params, indent=2))
@@ -64,17 +283,268 @@ class DynatraceFastlaneUploader:
             "dynatrace_process_symbols"
         ] + [f"{k}:{v}" for k, v in params.items()]
 
+        env = dict(os.environ, DEVELOPER_DIR=developer_dir) if developer_dir else None
+
+        def attempt():
+            try:
+                return run_streaming(cmd, cwd=str(self.project_dir), env=env, timeout=self.timeout)
+            except subprocess.CalledProcessError as e:
+                throttled, retry_after = detect_throttle(e.output)
+                if throttled:
+                    raise ThrottledError("Dynatrace returned 429 during symbol upload", retry_after) from e
+                raise
+
         try:
-            result = subprocess.run(
-                cmd,
-                cwd=self.project_dir,
-                text=True,
-                capture_output=True,
-                check=True
-            )
-            print("✅ Fastlane completed successfully.")
-            print(result.stdout)
+            result = run_throttled(attempt, self.limiter, self.max_attempts)
+            UPLOAD_BYTES.inc(symbol_file_size(upload_job.symbol_file), uploader="fastlane")
+            if precheck:
+                remember_uploaded(job)
+            print(f"✅ Fastlane completed successfully in {result.wall_time:.1f}s "
+                  f"(peak RSS {result.peak_rss_kb // 1024} MB).")
+            return result
+        except ThrottledError as e:
+            print("❌ Fastlane failed: still throttled by Dynatrace after retries")
+            print(e.__cause__.output)
+            raise
+        except subprocess.TimeoutExpired as e:
+            print(f"❌ Fastlane timed out after {e.timeout}s, process group killed. Last output:")
+            print(e.output)
+            raise
         except subprocess.CalledProcessError as e:
-            print("❌ Fastlane failed:")
-            print(e.stderr)
-            raise
\ No newline at end of file
+            print("❌ Fastlane failed. Last output:")
+            print(e.output)
+            raise
+
+    def _prepare_work_dir(self, work_dir: Path) -> Path:
+        """Set up a fastlane dir with the generated Fastfile and the project's Gemfile/Pluginfile"""
+        fastlane_dir = work_dir / "fastlane"
+        fastlane_dir.mkdir(parents=True, exist_ok=True)
+        (fastlane_dir / "Fastfile").write_text(BATCH_FASTFILE, encoding="utf-8")
+
+        for name in ("Gemfile", "Gemfile.lock"):
+            if (self.project_dir / name).exists():
+                shutil.copy2(self.project_dir / name, work_dir / name)
+        pluginfile = self.project_dir / "fastlane" / "Pluginfile"
+        if pluginfile.exists():
+            shutil.copy2(pluginfile, fastlane_dir / "Pluginfile")
+        return fastlane_dir
+
+    def _run_batch_once(self, jobs: List[SymbolJob], work_dir: Path) -> Dict[str, dict]:
+        """Run one fastlane invocation over jobs and return results keyed by job id"""
+        jobs_file = work_dir / "jobs.json"
+        results_file = work_dir / "results.json"
+        # fastlane runs in work_dir, so relative paths would resolve against the temp dir
+        jobs_file.write_text(json.dumps([{"id": j.job_id, "params": j.to_absolute_params()} for j in jobs]),
+                             encoding="utf-8")
+        results_file.unlink(missing_ok=True)
+
+        cmd = [
+            self.fastlane_path,
+            BATCH_LANE,
+            f"jobs_file:{jobs_file}",
+            f"results_file:{results_file}"
+        ]
+        try:
+            with span("fastlane.batch_run", jobs=len(jobs)):
+                run_streaming(cmd, cwd=str(work_dir), timeout=self.timeout)
+            error = None
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            error = e
+
+        results = {}
+        if results_file.exists():
+            for entry in json.loads(results_file.read_text(encoding="utf-8")):
+                results[entry["id"]] = entry
+        for job in jobs:
+            if job.job_id not in results:
+                detail = f"fastlane exited before this job ran: {error}" if error else "no result reported"
+                results[job.job_id] = {"id": job.job_id, "status": "not_run", "error": detail, "seconds": 0.0}
+        return results
+
+    @staticmethod
+    def _duplicate_results(jobs: List[SymbolJob], duplicate_of: Dict[str, str]) -> Dict[str, dict]:
+        results = {}
+        for job in jobs:
+            if job.job_id in duplicate_of:
+                print(f"⏭️  {job.symbol_file}: same dSYM UUIDs as job {duplicate_of[job.job_id]}, skipping")
+                results[job.job_id] = {"id": job.job_id, "status": "duplicate", "seconds": 0.0,
+                                       "duplicate_of": duplicate_of[job.job_id], "error": None}
+        return results
+
+    @staticmethod
+    def _existing_results(jobs: List[SymbolJob], existing: Dict[str, dict]) -> Dict[str, dict]:
+        results = {}
+        for job in jobs:
+            if job.job_id in existing:
+                print(f"⏭️  {job.symbol_file}: Dynatrace already has {job.bundle_name} {job.version_str} "
+                      f"({job.version}), skipping")
+                results[job.job_id] = {"id": job.job_id, "status": "exists", "seconds": 0.0, "error": None}
+        return results
+
+    def _precheck(self, jobs: List[SymbolJob], precheck: bool):
+        """Split off jobs Dynatrace already has: (jobs to run, their results)"""
+        if not precheck or not jobs:
+            return jobs, {}
+        existing = existing_symbol_jobs(jobs)
+        return [job for job in jobs if job.job_id not in existing], self._existing_results(jobs, existing)
+
+    def _ledger_filter(self, jobs: List[SymbolJob], environment: Optional[str]):
+        """Split off jobs the ledger has already uploaded: (jobs to run, their results, digests of the rest)"""
+        if not self.ledger or not environment:
+            return jobs, {}, {}
+        to_run, results, digests = [], {}, {}
+        for job in jobs:
+            digest = self.ledger.file_digest(job.symbol_file)
+            if self.ledger.should_skip(environment, job.app_id, job.version, job.symbol_file, force=self.force,
+                                       digest=digest):
+                results[job.job_id] = {"id": job.job_id, "status": "skipped", "seconds": 0.0, "error": None}
+            else:
+                to_run.append(job)
+                digests[job.job_id] = digest
+        return to_run, results, digests
+
+    def _ledger_record(self, jobs: List[SymbolJob], results: Dict[str, dict], environment: Optional[str],
+                       digests: Dict[str, str]):
+        """Record the outcome of every job that ran (or was found in Dynatrace), once per job"""
+        if not digests:
+            return
+        for job in jobs:
+            if job.job_id not in digests:
+                continue
+            result = results[job.job_id]
+            self.ledger.record(environment, job.app_id, job.version, job.symbol_file,
+                               success=result["status"] in ("ok", "exists"), digest=digests[job.job_id],
+                               detail="already in Dynatrace" if result["status"] == "exists" else result.get("error"),
+                               skipped=result["status"] == "exists")
+
+    @traced("fastlane.process_symbols_batch")
+    def process_symbols_batch(self, jobs: List[SymbolJob], dedupe: bool = True,
+                              precheck: bool = True, environment: Optional[str] = None) -> List[dict]:
+        """
+        Run dynatrace_process_symbols for many symbol files in a single fastlane invocation.
+
+        Jobs throttled by Dynatrace (429) are retried in a follow-up batch after
+        the shared limiter's backoff.
+
+        Args:
+            jobs: Symbol files to process
+            dedupe: Skip dSYMs whose UUIDs match an earlier job for the same app/version
+            precheck: Skip jobs whose app/version Dynatrace already lists (one listing request per server)
+            environment: Dynatrace environment, the ledger key; no ledger without it
+
+        Returns:
+            list: One result per job, in input order, with id, symbol_file, status ('ok',
+                  'failed', 'not_run', 'duplicate', 'skipped' or 'exists'), seconds and error
+        """
+        if not jobs:
+            return []
+        limiter = self.limiter or get_limiter()
+
+        pending, duplicate_of = dedupe_symbol_jobs(jobs) if dedupe else (list(jobs), {})
+        final: Dict[str, dict] = self._duplicate_results(jobs, duplicate_of)
+        pending, skipped, digests = self._ledger_filter(pending, environment)
+        final.update(skipped)
+        pending, existing = self._precheck(pending, precheck)
+        final.update(existing)
+        print(f"🟢 Running fastlane {BATCH_LANE} for {len(pending)} symbol file(s)...")
+        with tempfile.TemporaryDirectory(prefix="dt-fastlane-batch-") as tmp, self._thinned(pending) as pending:
+            work_dir = Path(tmp)
+            self._prepare_work_dir(work_dir)
+            upload_sizes = {job.job_id: symbol_file_size(job.symbol_file) for job in pending}
+
+            for attempt in range(1, self.max_attempts + 1):
+                if not pending:
+                    break
+                with limiter.slot() as started:
+                    results = self._run_batch_once(pending, work_dir)
+
+                throttled, retry_after = [], None
+                for job in pending:
+                    result = results[job.job_id]
+                    is_throttled, hint = detect_throttle(result.get("error") or "")
+                    if result["status"] == "failed" and is_throttled and attempt < self.max_attempts:
+                        throttled.append(job)
+                        retry_after = hint if hint is not None else retry_after
+                    else:
+                        final[job.job_id] = result
+
+                if not throttled:
+                    limiter.on_success()
+                    break
+                delay = limiter.on_throttle(retry_after, started)
+                print(f"⏳ {len(throttled)} job(s) throttled by Dynatrace, retrying in {delay:.1f}s")
+                pending = throttled
+
+        self._ledger_record(jobs, final, environment, digests)
+        report = []
+        for job in jobs:
+            result = dict(final[job.job_id], symbol_file=job.symbol_file)
+            report.append(result)
+            if result["status"] == "ok":
+                UPLOAD_BYTES.inc(upload_sizes[job.job_id], uploader="fastlane")
+                if precheck:
+                    remember_uploaded(job)
+            icon = {"ok": "✅", "duplicate": "⏭️ ", "exists": "⏭️ ", "skipped": "⏭️ "}.get(result["status"], "❌")
+            print(f"{icon} {job.symbol_file}: {result['status']} ({result.get('seconds', 0.0):.1f}s)"
+                  + (f" - {result['error']}" if result.get("error") else ""))
+        return report
+
+    @traced("fastlane.process_symbols_parallel")
+    def process_symbols_parallel(self, jobs: List[SymbolJob], max_workers: Optional[int] = None,
+                                 memory_budget_mb: Optional[int] = None, per_job_memory_mb: int = 2048,
+                                 dedupe: bool = True, precheck: bool = True,
+                                 environment: Optional[str] = None) -> List[dict]:
+        """
+        Run dynatrace_process_symbols for many symbol files concurrently, one fastlane process per job.
+
+        Each job gets an isolated working directory and its own DEVELOPER_DIR
+        (SymbolJob.developer_dir); memory_budget_mb caps how many run at once.
+        Every job runs under the shared limiter like process_symbols, so a 429
+        backs off and retries instead of failing the job.
+        With dedupe, dSYMs whose UUIDs match an earlier job are not processed;
+        with precheck, neither are app/versions Dynatrace already lists. With a
+        ledger and an environment, files it has already uploaded are skipped
+        and every other outcome is recorded.
+
+        Returns:
+            list: One result per job, in input order, with id, symbol_file, status, seconds,
+                  queue_wait, peak_rss_kb and error
+        """
+        to_run, duplicate_of = dedupe_symbol_jobs(jobs) if dedupe else (list(jobs), {})
+        duplicates = self._duplicate_results(jobs, duplicate_of)
+        to_run, skipped, digests = self._ledger_filter(to_run, environment)
+        duplicates.update(skipped)
+        to_run, existing = self._precheck(to_run, precheck)
+        duplicates.update(existing)
+
+        with self._thinned(to_run) as to_run:
+            pool_jobs = []
+            for job in to_run:
+                # Jobs run in their own working directory, so pass absolute paths
+                params = job.to_absolute_params()
+                cmd = [self.fastlane_path, "run", "dynatrace_process_symbols"]
+                cmd += [f"{k}:{v}" for k, v in params.items()]
+                pool_jobs.append(PoolJob(cmd, developer_dir=job.developer_dir, prepare=self._prepare_work_dir,
+                                         job_id=job.job_id))
+
+            pool = SymbolJobPool(max_workers=max_workers, memory_budget_mb=memory_budget_mb,
+                                 per_job_memory_mb=per_job_memory_mb, timeout=self.timeout,
+                                 limiter=self.limiter or get_limiter(), max_attempts=self.max_attempts)
+            results = {}
+            for job, result in zip(to_run, pool.run(pool_jobs)):
+                if result.ok:
+                    UPLOAD_BYTES.inc(symbol_file_size(job.symbol_file), uploader="fastlane")
+                    if precheck:
+                        remember_uploaded(job)
+                results[job.job_id] = {
+                    "id": job.job_id,
+                    "symbol_file": job.symbol_file,
+                    "status": "ok" if result.ok else "failed",
+                    "seconds": result.wall_time,
+                    "queue_wait": result.queue_wait,
+                    "peak_rss_kb": result.peak_rss_kb,
+                    "error": None if result.ok else (result.error or result.tail),
+                }
+        results.update(duplicates)
+        self._ledger_record(jobs, results, environment, digests)
+        return [dict(results[job.job_id], symbol_file=job.symbol_file) for job in jobs]
@@ -0,0 +1,207 @@
+import csv
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from nexus_ops import NexusError, NexusOperations
+
+# (applicationId, versionCode, platform); platform is None when the source does not know it
+ReleaseKey = Tuple[str, str, Optional[str]]
+
+
+def metadata_key(metadata: Dict) -> Optional[ReleaseKey]:
+    """The key of a metadata.json, read the way MetadataParser reads it (platform defaults to ANDROID)"""
+    dynatrace = metadata.get("dynatrace") or {}
+    application_id = dynatrace.get("applicationId")
+    version_code = metadata.get("versionCode")
+    if not application_id or version_code in (None, ""):
+        return None
+    platform = dynatrace.get("as") or metadata.get("os", "ANDROID")
+    return str(application_id), str(version_code), str(platform).upper()
+
+
+class MetadataIndex:
+    """
+    Keys of every metadata.json in a Nexus repository.
+
+    Parsed keys are kept in a local index by asset sha1, so after the first
+    run only new or changed metadata files are downloaded.
+    """
+
+    def __init__(self, ops: NexusOperations, index_path: Optional[str] = ".reconcile-index.json",
+                 max_workers: int = 16, verbose: bool = True):
+        self.ops = ops
+        self.index_path = os.path.abspath(index_path) if index_path else None
+        self.max_workers = max_workers
+        self.verbose = verbose
+        self.downloaded = 0
+        self.reused = 0
+        self._index: Dict[str, Optional[List[str]]] = self._load()
+        self._lock = threading.Lock()
+
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
+
+    def _load(self) -> Dict[str, Optional[List[str]]]:
+        if not self.index_path or not os.path.exists(self.index_path):
+            return {}
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f).get("assets", {})
+        except (json.JSONDecodeError, OSError):
+            return {}
+
+    def _save(self):
+        if not self.index_path:
+            return
+        directory = os.path.dirname(self.index_path)
+        fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.index_path), dir=directory)
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump({"assets": self._index}, f)
+        os.replace(tmp_path, self.index_path)
+
+    def _key_of(self, asset: Dict) -> Optional[ReleaseKey]:
+        sha1 = (asset.get("checksum") or {}).get("sha1")
+        if sha1 and sha1 in self._index:
+            with self._lock:
+                self.reused += 1
+            cached = self._index[sha1]
+            return tuple(cached) if cached else None
+
+        try:
+            key = metadata_key(self.ops.fetch_json(asset["downloadUrl"]))
+        except (ValueError, AttributeError):
+            key = None  # not JSON, or not a metadata.json object
+        with self._lock:
+            self.downloaded += 1
+            if sha1:
+                self._index[sha1] = list(key) if key else None
+        return key
+
+    def collect(self, repository: str, group_id: Optional[str] = None,
+                classifier: Optional[str] = None) -> Dict[ReleaseKey, List[Dict]]:
+        """
+        Map every release key to the Nexus coordinates of the metadata.json files declaring it.
+
+        Returns:
+            dict: {(applicationId, versionCode, PLATFORM): [{"group_id", "artifact_id", "version_id", "path"}]}
+        """
+        assets = self.ops.search_assets(repository, group=group_id,
+                                        **{"maven.extension": "json", "maven.classifier": classifier})
+        self._log(f"🔎 {len(assets)} metadata file(s) in {repository}")
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="reconcile") as pool:
+            keys = list(pool.map(self._key_of, assets))
+        self._save()
+
+        expected: Dict[ReleaseKey, List[Dict]] = {}
+        for asset, key in zip(assets, keys):
+            if key is None:
+                continue
+            maven = asset.get("maven2") or {}
+            expected.setdefault(key, []).append({
+                "group_id": maven.get("groupId"),
+                "artifact_id": maven.get("artifactId"),
+                "version_id": maven.get("version"),
+                "path": asset.get("path"),
+            })
+        self._log(f"📋 {len(expected)} release(s): {self.downloaded} metadata file(s) downloaded, "
+                  f"{self.reused} from the index")
+        return expected
+
+
+# ----------------------------
+# Uploaded sets
+# ----------------------------
+
+def uploaded_from_ledger(ledger_path: str, environment: str) -> Set[ReleaseKey]:
+    """Successful uploads recorded in an UploadLedger (which does not store the platform)"""
+    from upload_ledger import UploadLedger
+
+    uploaded = set()
+    for key, entry in UploadLedger(ledger_path, verbose=False).entries().items():
+        env, application_id, version_code, _ = key.split("|", 3)
+        if env == environment and entry.get("status") == "uploaded":
+            uploaded.add((application_id, version_code, None))
+    return uploaded
+
+
+def uploaded_from_dynatrace(environment: str, api_token: str, base_url: Optional[str] = None) -> Set[ReleaseKey]:
+    """Everything the Dynatrace symbol file API lists for the environment, minus entries without an app/version"""
+    from dynatrace_client import get_client
+
+    uploaded = set()
+    for f in get_client(environment, base_url).list_symbol_files(api_token):
+        application_id, version_code = f.get("applicationId"), f.get("versionCode")
+        if not application_id or version_code in (None, ""):
+            continue
+        uploaded.add((str(application_id), str(version_code), str(f.get("os") or "").upper() or None))
+    return uploaded
+
+
+def find_gaps(expected: Dict[ReleaseKey, List[Dict]], uploaded: Iterable[ReleaseKey]) -> List[Dict]:
+    """
+    Releases in `expected` with nothing uploaded.
+
+    Uploaded keys without a platform match any platform. Both sides are sets,
+    so this is linear in the number of releases.
+    """
+    uploaded = set(uploaded)
+    any_platform = {key[:2] for key in uploaded}
+    exact = {key for key in uploaded if key[2] is not None}
+    unknown_platform = {key[:2] for key in uploaded if key[2] is None}
+
+    missing = set(expected) - exact
+    missing = {key for key in missing if key[:2] not in unknown_platform}
+    gaps = []
+    for application_id, version_code, platform in sorted(missing):
+        for coordinates in expected[(application_id, version_code, platform)]:
+            gaps.append(dict(coordinates, application_id=application_id, version_code=version_code,
+                             platform=platform.lower(),
+                             other_platform_uploaded=(application_id, version_code) in any_platform))
+    return gaps
+
+
+def write_gaps(gaps: List[Dict], path: str):
+    """JSON report, or a CSV manifest that `post_release.py batch` can re-run directly"""
+    if path.lower().endswith(".csv"):
+        with open(path, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=["group_id", "artifact_id", "version_id", "platform",
+                                                   "application_id", "version_code"], extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(gaps)
+    else:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"generated": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                       "missing": len(gaps), "releases": gaps}, f, indent=2)
+
+
+def print_gaps(gaps: List[Dict]):
+    if not gaps:
+        print("✅ Every release in Nexus has symbols in Dynatrace")
+        return
+    print(f"❌ {len(gaps)} release(s) without symbols:")
+    for gap in gaps:
+        print(f"  {gap['platform']:<8} {gap['application_id']} {gap['version_code']:<10} "
+              f"{gap['group_id']}:{gap['artifact_id']}:{gap['version_id']}")
+
+
+def reconcile(ops: NexusOperations, repository: str, uploaded: Set[ReleaseKey], group_id: Optional[str] = None,
+              classifier: Optional[str] = None, index_path: Optional[str] = ".reconcile-index.json",
+              max_workers: int = 16) -> List[Dict]:
+    """Gaps between the metadata.json files in Nexus and the uploaded set"""
+    try:
+        expected = MetadataIndex(ops, index_path, max_workers).collect(repository, group_id, classifier)
+    except NexusError as e:
+        raise RuntimeError(f"Could not list metadata in Nexus: {e}") from e
+    return find_gaps(expected, uploaded)
+
+
+if __name__ == "__main__":
+    from post_release import main
+    sys.exit(main(["reconcile"] + sys.argv[1:]))
@@ -0,0 +1,151 @@
+import csv
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional
+
+from release_flow import ReleaseFlow
+
+# Manifest columns / keys; camelCase as used in metadata.json is accepted too
+FIELDS = {
+    "group_id": ("group_id", "groupId", "group-id"),
+    "artifact_id": ("artifact_id", "artifactId", "artifact-id"),
+    "version_id": ("version_id", "versionId", "version-id", "version"),
+    "platform": ("platform", "os"),
+    "client_version": ("client_version", "clientVersion", "client-version"),
+}
+REQUIRED = ("group_id", "artifact_id", "version_id")
+
+
+def _normalize_entry(raw: Dict[str, Any], default_platform: Optional[str], index: int) -> Dict[str, Any]:
+    entry = {}
+    for field, aliases in FIELDS.items():
+        value = next((raw[a] for a in aliases if raw.get(a) not in (None, "")), None)
+        entry[field] = str(value).strip() if value is not None else None
+    entry["platform"] = (entry["platform"] or default_platform or "").lower() or None
+    missing = [f for f in REQUIRED if not entry[f]]
+    if missing or entry["platform"] not in ("ios", "android"):
+        problem = f"missing {', '.join(missing)}" if missing else f"platform {entry['platform']!r}"
+        raise ValueError(f"Manifest entry {index}: {problem}")
+    return entry
+
+
+def release_key(entry: Dict[str, Any]) -> str:
+    return f"{entry['group_id']}:{entry['artifact_id']}:{entry['version_id']}"
+
+
+def load_manifest(path: str, default_platform: Optional[str] = None) -> List[Dict[str, Any]]:
+    """
+    Read the releases to process.
+
+    JSON: a list of objects, or {"releases": [...]}. CSV: one release per row with a header.
+    Duplicate releases are dropped, keeping the first.
+    """
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        if path.lower().endswith(".csv"):
+            rows = list(csv.DictReader(f))
+        else:
+            data = json.load(f)
+            rows = data.get("releases", []) if isinstance(data, dict) else data
+
+    releases, seen = [], set()
+    for index, raw in enumerate(rows, start=1):
+        entry = _normalize_entry(raw, default_platform, index)
+        key = release_key(entry)
+        if key in seen:
+            print(f"⏭️  Manifest entry {index}: duplicate of {key}, ignored")
+            continue
+        seen.add(key)
+        releases.append(entry)
+    return releases
+
+
+class BatchResults:
+    """Per-release status, rewritten atomically after every release so an interrupted batch can resume"""
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(path)
+        self.entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        if os.path.exists(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    for entry in json.load(f).get("releases", []):
+                        self.entries[release_key(entry)] = entry
+            except (json.JSONDecodeError, OSError):
+                self.entries = {}
+
+    def succeeded(self, entry: Dict[str, Any]) -> bool:
+        return self.entries.get(release_key(entry), {}).get("status") == "ok"
+
+    def record(self, result: Dict[str, Any]):
+        with self._lock:
+            self.entries[release_key(result)] = result
+            summary = {status: sum(1 for e in self.entries.values() if e["status"] == status)
+                       for status in ("ok", "failed", "skipped")}
+            payload = {"updated": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+                       "summary": summary, "releases": list(self.entries.values())}
+            directory = os.path.dirname(self.path)
+            os.makedirs(directory, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix=os.path.basename(self.path), dir=directory)
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(payload, f, indent=2)
+            os.replace(tmp_path, self.path)
+
+
+def run_batch(flow: ReleaseFlow, releases: List[Dict[str, Any]], results: BatchResults,
+              max_parallel: int = 4, resume: bool = False) -> List[Dict[str, Any]]:
+    """
+    Run the release flow for every manifest entry in one process.
+
+    Args:
+        flow: Shared flow (HTTP session, ledger, stage cache and client installs are reused)
+        releases: Entries from load_manifest
+        results: Where per-release status is written
+        max_parallel: Releases processed at the same time
+        resume: Skip releases already recorded as ok in the results file
+
+    Returns:
+        list: One status dict per release, in manifest order
+    """
+    def process(entry: Dict[str, Any]) -> Dict[str, Any]:
+        result = dict(entry, status="ok", error=None, seconds=0.0, critical_path=[])
+        if resume and results.succeeded(entry):
+            result["status"] = "skipped"
+            print(f"⏭️  {release_key(entry)}: already processed")
+            return result
+
+        started = time.perf_counter()
+        runner = None
+        try:
+            runner = flow.make_runner(entry["platform"], entry["client_version"], entry["version_id"])
+            context = runner.run(**flow.initial_inputs(entry["group_id"], entry["artifact_id"], entry["version_id"],
+                                                       entry["platform"], entry["client_version"]))
+            result["uploaded"] = bool(context.get("uploaded"))
+        except Exception as e:
+            result.update(status="failed", error=f"{type(e).__name__}: {e}")
+        result["seconds"] = round(time.perf_counter() - started, 3)
+        if runner is not None:
+            result["critical_path"] = [r.name for r in runner.critical_path()]
+        icon = "✅" if result["status"] == "ok" else "❌"
+        print(f"{icon} {release_key(entry)}: {result['status']} in {result['seconds']:.1f}s"
+              + (f" - {result['error']}" if result["error"] else ""))
+        results.record(result)
+        return result
+
+    print(f"🟢 Processing {len(releases)} release(s), {max_parallel} at a time")
+    with ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="release") as executor:
+        report = list(executor.map(process, releases))
+
+    counts = {status: sum(1 for r in report if r["status"] == status) for status in ("ok", "failed", "skipped")}
+    print(f"\n=== Batch Summary ===\nok: {counts['ok']}  failed: {counts['failed']}  skipped: {counts['skipped']}")
+    return report
+
+
+if __name__ == "__main__":
+    from post_release import main
+    sys.exit(main(["batch"] + sys.argv[1:]))
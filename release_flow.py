@@ -0,0 +1,287 @@
+import argparse
+import os
+import sys
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+from script_loader import load_script
+from stage_runner import Stage, StageRunner
+
+ARTIFACT_PACKAGING = {"ios": "zip", "android": "txt"}
+
+
+def _path_exists(name: str):
+    """Cache validator: the cached output `name` still points at an existing path"""
+    return lambda out: bool(out[name]) and Path(out[name]).exists()
+
+
+class ReleaseFlow:
+    """
+    The dtFull upload flow as a stage graph:
+
+        fetch_metadata -> parse_metadata -> download_artifact --\\
+        install_client -> select_xcode -> link_lldb (iOS) ------+-> upload
+
+    Client install and Xcode selection only depend on the client version, so
+    they run while metadata and the artifact are still being fetched. Xcode
+    selection and the LLDB link are never taken from the stage cache: an
+    in-place Xcode upgrade changes both without changing the client version.
+    One instance can run many releases (see release_batch.py): the Nexus HTTP
+    session, the ledger and the client install per client version are shared;
+    Dynatrace connections and token checks come from dynatrace_client.
+    """
+
+    def __init__(self, nexus_url: str, environment: str, api_token: str, repository: str = "maven-releases",
+                 username: Optional[str] = None, password: Optional[str] = None,
+                 client_version: Optional[str] = None, work_dir: str = ".", ledger=None, force: bool = False,
+                 fastlane_path: str = "fastlane", dtx_client_path: str = "./DTXDssClient",
+                 metadata_packaging: str = "json", metadata_classifier: Optional[str] = None,
+                 stage_cache: Optional[str] = ".stage-cache.json", max_workers: int = 4,
+                 dynatrace_url: Optional[str] = None, session=None, precheck: bool = True,
+                 archs: Optional[List[str]] = None):
+        self.nexus_url = nexus_url
+        self.environment = environment
+        self.api_token = api_token
+        self.repository = repository
+        self.username = username
+        self.password = password
+        self.client_version = client_version
+        self.work_dir = Path(work_dir)
+        self.ledger = ledger
+        self.force = force
+        self.fastlane_path = fastlane_path
+        self.dtx_client_path = dtx_client_path
+        self.metadata_packaging = metadata_packaging
+        self.metadata_classifier = metadata_classifier
+        self.stage_cache = stage_cache
+        self.max_workers = max_workers
+        self.dynatrace_url = dynatrace_url
+        self.session = session
+        self.precheck = precheck
+        self.archs = archs
+        self.last_runner: Optional[StageRunner] = None
+        self._client_results: Dict[tuple, Any] = {}
+        self._client_locks: Dict[tuple, threading.Lock] = {}
+        self._client_lock = threading.Lock()
+
+    # ----------------------------
+    # Stage functions
+    # ----------------------------
+
+    def _download(self, group_id: str, artifact_id: str, version: str, packaging: str,
+                  classifier: Optional[str] = None) -> str:
+        fetch = load_script("fetch-artifact.py")
+        return fetch.download_from_nexus(self.nexus_url, self.repository, group_id, artifact_id, version,
+                                         packaging=packaging, classifier=classifier, username=self.username,
+                                         password=self.password, output_dir=str(self.work_dir),
+                                         session=self.session)
+
+    def _client_step(self, step: str, client_version: str, func: Callable[[], Any]) -> Any:
+        """Run a client install step once per client version, however many releases need it"""
+        key = (step, client_version)
+        with self._client_lock:
+            lock = self._client_locks.setdefault(key, threading.Lock())
+        with lock:
+            if key not in self._client_results:
+                self._client_results[key] = func()
+            return self._client_results[key]
+
+    def install_client(self, client_version: str) -> str:
+        """
+        Install the Dynatrace client, select Xcode and link LLDB for `client_version`,
+        once per flow however many uploads need it.
+
+        Returns:
+            str: DEVELOPER_DIR of the selected Xcode
+        """
+        from gaixie import DynatraceSymbolManager
+        manager = DynatraceSymbolManager(client_version=client_version)
+        return self._client_step("install_client", client_version, manager.install_client)
+
+    def fetch_metadata(self, group_id: str, artifact_id: str, version_id: str) -> str:
+        return self._download(group_id, artifact_id, version_id, self.metadata_packaging, self.metadata_classifier)
+
+    @staticmethod
+    def parse_metadata(metadata_path: str, platform: str) -> Dict[str, Dict[str, Any]]:
+        parser = load_script("parse-json.py").MetadataParser()
+        if not parser.parse_metadata_to_map(metadata_path):
+            raise ValueError(f"Invalid metadata: {metadata_path}")
+        if parser.platform and parser.platform.lower() != platform:
+            # MetadataParser falls back to ANDROID when the metadata has no platform, so only warn
+            print(f"⚠️ Metadata platform is {parser.platform}, flow was started for {platform}")
+        metadata = {
+            "version_code": parser.version_code,
+            "version_name": parser.version_name,
+            "package_name": parser.package_name,
+            "group_id": parser.group_id,
+            "artifact_id": parser.artifact_id,
+            "version_id": parser.version_id,
+            "application_id": parser.application_id,
+        }
+        return {"metadata": metadata}
+
+    def download_artifact(self, metadata: Dict[str, Any], version_id: str, platform: str) -> str:
+        return self._download(metadata["group_id"], metadata["artifact_id"], metadata["version_id"] or version_id,
+                              ARTIFACT_PACKAGING[platform])
+
+    def upload(self, metadata: Dict[str, Any], artifact_path: str, platform: str,
+               developer_dir: Optional[str] = None) -> Any:
+        if platform == "android":
+            from mapping_uploader import MappingUploader
+            uploader = MappingUploader(self.environment, self.api_token, ledger=self.ledger, force=self.force,
+                                       base_url=self.dynatrace_url, precheck=self.precheck)
+            return uploader.upload(artifact_path, metadata["application_id"], metadata["package_name"],
+                                   metadata["version_code"], metadata["version_name"])
+
+        from dynatrace_client import get_client
+        client = get_client(self.environment, self.dynatrace_url)
+        # DTXDssClient opens its own connection, but a bad token should fail before the symbols are processed
+        client.validate_token(self.api_token)
+        fastlane = load_script("py-fastlane.py")
+        uploader = fastlane.DynatraceFastlaneUploader(fastlane_path=self.fastlane_path, archs=self.archs,
+                                                      ledger=self.ledger, force=self.force)
+        result = uploader.process_symbols(metadata["application_id"], self.api_token, self.dtx_client_path,
+                                          artifact_path, metadata["package_name"], metadata["version_name"],
+                                          metadata["version_code"], os_type="ios",
+                                          server_url=client.base_url, debug_mode=False,
+                                          developer_dir=developer_dir,
+                                          precheck=self.precheck and not self.force,
+                                          environment=self.environment)
+        return result is not None
+
+    # ----------------------------
+    # Graph
+    # ----------------------------
+
+    def build_stages(self, platform: str, client_version: Optional[str] = None,
+                     version_id: Optional[str] = None) -> List[Stage]:
+        """
+        Stages for one platform. The Nexus downloads are only cached for a
+        known, fixed version_id: LATEST, RELEASE and -SNAPSHOT resolve to a
+        different file once something new is published.
+        """
+        from maven_metadata import is_dynamic
+        cache_downloads = version_id is not None and not is_dynamic(version_id)
+
+        def fetch_metadata(nexus_url, repository, group_id, artifact_id, version_id):
+            return self.fetch_metadata(group_id, artifact_id, version_id)
+
+        def download_artifact(nexus_url, repository, metadata, version_id, platform):
+            return self.download_artifact(metadata, version_id, platform)
+
+        # keyed on the Nexus instance too, so the same GAV on two servers does not share an entry
+        stages = [
+            Stage("fetch_metadata", fetch_metadata,
+                  inputs=["nexus_url", "repository", "group_id", "artifact_id", "version_id"],
+                  outputs=["metadata_path"], cacheable=cache_downloads, validate=_path_exists("metadata_path")),
+            Stage("parse_metadata", self.parse_metadata, inputs=["metadata_path", "platform"],
+                  outputs=["metadata"], cacheable=False),
+            Stage("download_artifact", download_artifact,
+                  inputs=["nexus_url", "repository", "metadata", "version_id", "platform"],
+                  outputs=["artifact_path"], cacheable=cache_downloads, validate=_path_exists("artifact_path")),
+        ]
+
+        if platform == "android":
+            stages.append(Stage("upload", self.upload, inputs=["metadata", "artifact_path", "platform"],
+                                outputs=["uploaded"], cacheable=False))
+            return stages
+
+        from gaixie import DynatraceSymbolManager
+        client_version = client_version or self.client_version
+        manager = DynatraceSymbolManager(client_version=client_version)
+
+        def install_client(client_version):
+            return self._client_step("install", client_version, lambda: str(manager.download_client()))
+
+        def select_xcode(client_plist):
+            return self._client_step("select_xcode", client_version, manager.select_xcode)
+
+        def link_lldb(developer_dir, client_plist):
+            return self._client_step("link_lldb", client_version, lambda: str(manager.link_lldb(developer_dir)))
+
+        def upload(metadata, artifact_path, platform, developer_dir, lldb_link):
+            return self.upload(metadata, artifact_path, platform, developer_dir=developer_dir)
+
+        stages += [
+            Stage("install_client", install_client, inputs=["client_version"], outputs=["client_plist"],
+                  validate=_path_exists("client_plist")),
+            Stage("select_xcode", select_xcode, inputs=["client_plist"], outputs=["developer_dir"],
+                  cacheable=False),
+            Stage("link_lldb", link_lldb, inputs=["developer_dir", "client_plist"], outputs=["lldb_link"],
+                  cacheable=False),
+            Stage("upload", upload, inputs=["metadata", "artifact_path", "platform", "developer_dir", "lldb_link"],
+                  outputs=["uploaded"], cacheable=False),
+        ]
+        return stages
+
+    def make_runner(self, platform: str, client_version: Optional[str] = None,
+                    version_id: Optional[str] = None) -> StageRunner:
+        platform = platform.lower()
+        if platform == "ios" and not (client_version or self.client_version):
+            raise ValueError("client_version is required for iOS")
+        return StageRunner(self.build_stages(platform, client_version, version_id), cache_path=self.stage_cache,
+                           max_workers=self.max_workers)
+
+    def initial_inputs(self, group_id: str, artifact_id: str, version_id: str, platform: str,
+                       client_version: Optional[str] = None) -> Dict[str, Any]:
+        platform = platform.lower()
+        initial = dict(nexus_url=self.nexus_url, repository=self.repository, group_id=group_id,
+                       artifact_id=artifact_id, version_id=version_id, platform=platform)
+        if platform == "ios":
+            initial["client_version"] = client_version or self.client_version
+        return initial
+
+    def run(self, group_id: str, artifact_id: str, version_id: str, platform: str,
+            client_version: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Run the flow for one release.
+
+        Args:
+            group_id: Nexus3 group ID of the release (metadata.json)
+            artifact_id: Nexus3 artifact ID of the release
+            version_id: Nexus3 version ID of the release
+            platform: 'ios' or 'android'
+            client_version: Dynatrace iOS agent version (defaults to the flow's)
+
+        Returns:
+            dict: Every stage output, including metadata, artifact_path and uploaded
+        """
+        runner = self.make_runner(platform, client_version, version_id)
+        self.last_runner = runner
+        self.work_dir.mkdir(parents=True, exist_ok=True)
+        try:
+            return runner.run(**self.initial_inputs(group_id, artifact_id, version_id, platform, client_version))
+        finally:
+            runner.print_timings()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fetch release metadata and artifact from Nexus3, upload to Dynatrace")
+    parser.add_argument("--nexus-url", default=os.environ.get("NEXUS_URL"), required="NEXUS_URL" not in os.environ)
+    parser.add_argument("--username", default=os.environ.get("NEXUS_USERNAME"))
+    parser.add_argument("--password", default=os.environ.get("NEXUS_PASSWORD"))
+    parser.add_argument("--repository", default="maven-releases")
+    parser.add_argument("--group-id", required=True)
+    parser.add_argument("--artifact-id", required=True)
+    parser.add_argument("--version-id", required=True)
+    parser.add_argument("--platform", choices=["ios", "android"], required=True)
+    parser.add_argument("--env", choices=["dev", "pat", "prod"], required=True)
+    parser.add_argument("--token", default=os.environ.get("DT_API_TOKEN"), help="Defaults to $DT_API_TOKEN")
+    parser.add_argument("--client-version", help="Dynatrace iOS agent version (ios)")
+    parser.add_argument("--work-dir", default=".")
+    parser.add_argument("--max-workers", type=int, default=4, help="Stages allowed to run at once")
+    parser.add_argument("--ledger", default=".upload-ledger.json", help="Upload ledger path")
+    parser.add_argument("--force", action="store_true", help="Upload even if the ledger has this file")
+    args = parser.parse_args()
+
+    from upload_ledger import UploadLedger
+    ledger = UploadLedger(args.ledger)
+    flow = ReleaseFlow(args.nexus_url, args.env, args.token, repository=args.repository, username=args.username,
+                       password=args.password, client_version=args.client_version, work_dir=args.work_dir,
+                       ledger=ledger, force=args.force, max_workers=args.max_workers)
+    try:
+        flow.run(args.group_id, args.artifact_id, args.version_id, args.platform)
+    finally:
+        ledger.print_summary()
+    sys.exit(1 if ledger.failed_files else 0)
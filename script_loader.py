@@ -0,0 +1,37 @@
+import importlib.util
+import sys
+import threading
+from pathlib import Path
+from types import ModuleType
+from typing import Optional
+
+REPO_DIR = Path(__file__).resolve().parent
+
+# Held while a script executes, so other threads never see a half-initialized module
+_LOAD_LOCK = threading.RLock()
+
+
+def load_script(filename: str, module_name: Optional[str] = None) -> ModuleType:
+    """
+    Import one of the repo's scripts by file name.
+
+    Scripts such as fetch-artifact.py or py-fastlane.py are not valid module
+    names, so they are loaded from their path. Each is loaded once per process.
+    """
+    module_name = module_name or Path(filename).stem.replace("-", "_")
+    with _LOAD_LOCK:
+        if module_name in sys.modules:
+            return sys.modules[module_name]
+
+        path = REPO_DIR / filename
+        spec = importlib.util.spec_from_file_location(module_name, path)
+        if spec is None or spec.loader is None:
+            raise ImportError(f"Cannot load {path}")
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[module_name] = module
+        try:
+            spec.loader.exec_module(module)
+        except BaseException:
+            del sys.modules[module_name]
+            raise
+        return module
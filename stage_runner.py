@@ -0,0 +1,285 @@
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from metrics import CACHE_LOOKUPS, STAGE_SECONDS
+from tracing import span
+
+# Runners in one process may share a cache file
+_CACHE_LOCK = threading.Lock()
+
+
+class Stage:
+    """
+    One step of an in-process pipeline.
+
+    `func` is called with the declared inputs as keyword arguments and must
+    return a dict containing every declared output (a single output may be
+    returned bare).
+    """
+
+    def __init__(self, name: str, func: Callable[..., Any], inputs: Iterable[str] = (),
+                 outputs: Iterable[str] = (), cacheable: bool = True,
+                 validate: Optional[Callable[[Dict[str, Any]], bool]] = None):
+        self.name = name
+        self.func = func
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.cacheable = cacheable
+        self.validate = validate
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, inputs={self.inputs}, outputs={self.outputs})"
+
+
+class StageResult:
+    def __init__(self, name: str, seconds: float, cached: bool, start: float = 0.0, end: float = 0.0,
+                 deps: Iterable[str] = ()):
+        self.name = name
+        self.seconds = seconds
+        self.cached = cached
+        # offsets from the start of the run, in seconds
+        self.start = start
+        self.end = end
+        self.deps = list(deps)
+
+
+class StageRunner:
+    """
+    Run stages in dependency order, passing outputs between them in memory.
+
+    Outputs of cacheable stages are persisted keyed by the stage's inputs,
+    so a rerun with unchanged inputs skips the stage. With max_workers > 1,
+    stages whose inputs are all available run concurrently.
+    """
+
+    def __init__(self, stages: List[Stage], cache_path: Optional[str] = ".stage-cache.json", verbose: bool = True,
+                 max_workers: int = 1):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.stages = self._order(stages)
+        self.producers = {output: stage.name for stage in self.stages for output in stage.outputs}
+        self.cache_path = Path(cache_path).resolve() if cache_path else None
+        self.verbose = verbose
+        self.max_workers = max_workers
+        self.results: List[StageResult] = []
+        self.wall_time = 0.0
+
+    # ----------------------------
+    # Helper methods
+    # ----------------------------
+
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
+
+    @staticmethod
+    def _order(stages: List[Stage]) -> List[Stage]:
+        """Topologically sort stages by their declared inputs/outputs"""
+        producers = {}
+        for stage in stages:
+            for output in stage.outputs:
+                if output in producers:
+                    raise ValueError(f"Output '{output}' produced by both {producers[output].name} and {stage.name}")
+                producers[output] = stage
+
+        ordered, state = [], {}
+
+        def visit(stage: Stage):
+            mark = state.get(stage.name)
+            if mark == "done":
+                return
+            if mark == "visiting":
+                raise ValueError(f"Dependency cycle at stage {stage.name}")
+            state[stage.name] = "visiting"
+            for name in stage.inputs:
+                if name in producers:
+                    visit(producers[name])
+            state[stage.name] = "done"
+            ordered.append(stage)
+
+        for stage in stages:
+            visit(stage)
+        return ordered
+
+    @staticmethod
+    def cache_key(stage: Stage, inputs: Dict[str, Any]) -> str:
+        payload = json.dumps({"stage": stage.name, "inputs": inputs}, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _load_cache(self) -> Dict[str, Any]:
+        if not self.cache_path or not self.cache_path.exists():
+            return {}
+        try:
+            with self.cache_path.open("r", encoding="utf-8") as f:
+                return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return {}
+
+    def _save_cache(self, computed: Dict[str, Any]):
+        """
+        Add the entries this run computed to the cache file.
+
+        The file is re-read under a lock (threads and other processes), so
+        entries written by concurrent runners since this run loaded the cache
+        are kept rather than replaced by this run's older copy.
+        """
+        if not self.cache_path:
+            return
+        self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+        lock_path = self.cache_path.with_name(self.cache_path.name + ".lock")
+        with _CACHE_LOCK, open(lock_path, "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                merged = self._load_cache()
+                merged.update(computed)
+                fd, tmp_path = tempfile.mkstemp(prefix=self.cache_path.name, dir=self.cache_path.parent)
+                try:
+                    with os.fdopen(fd, "w", encoding="utf-8") as f:
+                        json.dump(merged, f, indent=2, sort_keys=True, default=str)
+                    os.replace(tmp_path, self.cache_path)
+                except BaseException:
+                    Path(tmp_path).unlink(missing_ok=True)
+                    raise
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _normalize(stage: Stage, value: Any) -> Dict[str, Any]:
+        if not isinstance(value, dict) and len(stage.outputs) == 1:
+            value = {stage.outputs[0]: value}
+        value = value or {}
+        missing = [name for name in stage.outputs if name not in value]
+        if missing:
+            raise RuntimeError(f"Stage {stage.name} did not produce: {', '.join(missing)}")
+        return {name: value[name] for name in stage.outputs}
+
+    def _deps(self, stage: Stage) -> List[str]:
+        return sorted({self.producers[name] for name in stage.inputs if name in self.producers})
+
+    def _execute(self, stage: Stage, inputs: Dict[str, Any], origin: float):
+        self._log(f"▶️  {stage.name}")
+        start = time.perf_counter()
+        with span(f"stage.{stage.name}"):
+            outputs = self._normalize(stage, stage.func(**inputs))
+        end = time.perf_counter()
+        return outputs, start - origin, end - origin
+
+    # ----------------------------
+    # Public functions
+    # ----------------------------
+
+    def run(self, **initial: Any) -> Dict[str, Any]:
+        """
+        Run all stages, each as soon as its inputs are available.
+
+        Args:
+            initial: Values available to stages before any stage runs
+
+        Returns:
+            dict: All initial values plus every stage output
+        """
+        for stage in self.stages:
+            missing = [name for name in stage.inputs if name not in initial and name not in self.producers]
+            if missing:
+                raise KeyError(f"Stage {stage.name} is missing inputs: {', '.join(missing)}")
+
+        context = dict(initial)
+        cache = self._load_cache()
+        computed: Dict[str, Any] = {}
+        self.results = []
+        pending = list(self.stages)
+        running = {}
+        error = None
+        origin = time.perf_counter()
+
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="stage") as executor:
+            while True:
+                # Start (or satisfy from cache) every stage whose inputs are ready; cache hits can
+                # make further stages ready, so repeat until nothing changes
+                progressed = error is None
+                while progressed:
+                    progressed = False
+                    for stage in list(pending):
+                        if any(name not in context for name in stage.inputs):
+                            continue
+                        pending.remove(stage)
+                        inputs = {name: context[name] for name in stage.inputs}
+                        key = self.cache_key(stage, inputs) if stage.cacheable else None
+                        cached = cache.get(key) if key else None
+                        if cached is not None and (stage.validate is None or stage.validate(cached)):
+                            CACHE_LOOKUPS.inc(cache="stage", result="hit")
+                            context.update(cached)
+                            now = time.perf_counter() - origin
+                            self.results.append(StageResult(stage.name, 0.0, True, now, now, self._deps(stage)))
+                            self._log(f"⏭️  {stage.name}: inputs unchanged, using cached outputs")
+                            progressed = True
+                            continue
+                        if key:
+                            CACHE_LOOKUPS.inc(cache="stage", result="miss")
+                        running[executor.submit(self._execute, stage, inputs, origin)] = (stage, key)
+
+                if not running:
+                    break
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, key = running.pop(future)
+                    try:
+                        outputs, start, end = future.result()
+                    except Exception as e:
+                        # Let stages already running finish, but start nothing new
+                        error = error or e
+                        self._log(f"❌ {stage.name} failed: {e}")
+                        continue
+                    elapsed = end - start
+                    STAGE_SECONDS.observe(elapsed, stage=stage.name)
+                    context.update(outputs)
+                    self.results.append(StageResult(stage.name, elapsed, False, start, end, self._deps(stage)))
+                    self._log(f"✅ {stage.name} finished in {elapsed:.2f}s")
+                    if key:
+                        cache[key] = computed[key] = outputs
+                        self._save_cache(computed)
+
+        self.wall_time = time.perf_counter() - origin
+        if error is not None:
+            raise error
+        return context
+
+    def critical_path(self) -> List[StageResult]:
+        """
+        Chain of stages that bounded the run's wall time: starting from the stage
+        that finished last, repeatedly follow the dependency that finished last.
+        """
+        if not self.results:
+            return []
+        by_name = {result.name: result for result in self.results}
+        current = max(self.results, key=lambda r: r.end)
+        path = [current]
+        while True:
+            deps = [by_name[name] for name in current.deps if name in by_name]
+            if not deps:
+                break
+            current = max(deps, key=lambda r: r.end)
+            path.append(current)
+        return list(reversed(path))
+
+    def print_timings(self) -> None:
+        """Print per-stage timing; * marks the critical path"""
+        print("\n=== Stage Timings ===")
+        critical = {result.name for result in self.critical_path()}
+        for result in sorted(self.results, key=lambda r: r.start):
+            note = " (cached)" if result.cached else ""
+            mark = "*" if result.name in critical else " "
+            print(f"{mark} {result.name:<20} {result.seconds:8.2f}s  [{result.start:7.2f} -> {result.end:7.2f}]{note}")
+        print(f"  {'total':<20} {sum(r.seconds for r in self.results):8.2f}s  (wall {self.wall_time:.2f}s)")
+        path = self.critical_path()
+        if path:
+            print(f"  critical path: {' -> '.join(r.name for r in path)} "
+                  f"({sum(r.seconds for r in path):.2f}s of {self.wall_time:.2f}s wall)")
@@ -0,0 +1,164 @@
+import os
+import signal
+import subprocess
+import sys
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional, Sequence
+
+from metrics import SUBPROCESS_SECONDS
+
+# Longest piece of output read at once; a line without a newline for longer is split
+MAX_LINE_BYTES = 64 * 1024
+
+
+class StreamResult:
+    """Outcome of a streamed subprocess run"""
+
+    def __init__(self, cmd: Sequence[str], returncode: int, tail: List[str], wall_time: float,
+                 peak_rss_kb: int, timed_out: bool = False):
+        self.cmd = list(cmd)
+        self.returncode = returncode
+        self.tail_lines = tail
+        self.wall_time = wall_time
+        self.peak_rss_kb = peak_rss_kb
+        self.timed_out = timed_out
+
+    @property
+    def tail(self) -> str:
+        return "".join(self.tail_lines)
+
+    def __repr__(self):
+        return (f"StreamResult(returncode={self.returncode}, wall_time={self.wall_time:.2f}s, "
+                f"peak_rss_kb={self.peak_rss_kb}, timed_out={self.timed_out})")
+
+
+def _max_rss_kb(rusage) -> int:
+    # ru_maxrss is kilobytes on Linux but bytes on macOS
+    if sys.platform == "darwin":
+        return int(rusage.ru_maxrss // 1024)
+    return int(rusage.ru_maxrss)
+
+
+def _exit_code(status: int) -> int:
+    # os.waitstatus_to_exitcode needs Python 3.9; a killed child gets -signal, as in subprocess
+    if os.WIFSIGNALED(status):
+        return -os.WTERMSIG(status)
+    return os.WEXITSTATUS(status)
+
+
+def _kill_group(pid: int, sig: int):
+    try:
+        os.killpg(pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def run_streaming(cmd: Sequence[str], cwd: Optional[str] = None, env: Optional[Dict[str, str]] = None,
+                  timeout: Optional[float] = None, tail_lines: int = 200, check: bool = True,
+                  prefix: str = "", echo: bool = True, kill_grace: float = 5.0,
+                  preexec_fn=None) -> StreamResult:
+    """
+    Run a command, printing its output line by line as it arrives.
+
+    stdout and stderr are merged; only the last `tail_lines` lines are kept
+    in memory for error reports, so chatty tools (DTXDssClient in debug mode)
+    do not grow memory, and a line is read at most MAX_LINE_BYTES at a time so
+    output without newlines does not either. The child runs in its own
+    process group so a timeout kills everything it spawned; the timeout is
+    a timer, the exit itself is waited for without polling.
+
+    Args:
+        cmd: Command and arguments
+        cwd: Working directory
+        env: Environment for the child (defaults to the current one)
+        timeout: Seconds before the process group is terminated
+        tail_lines: Lines of output kept for error reports
+        check: Raise CalledProcessError / TimeoutExpired on failure
+        prefix: Prepended to each echoed line
+        echo: Print output live
+        kill_grace: Seconds between SIGTERM and SIGKILL on timeout
+        preexec_fn: Called in the child before exec (e.g. to set rlimits)
+
+    Returns:
+        StreamResult with exit code, output tail, wall time and peak RSS
+    """
+    tail = deque(maxlen=tail_lines)
+    start = time.monotonic()
+    proc = subprocess.Popen(
+        list(cmd),
+        cwd=cwd,
+        env=env,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        stdin=subprocess.DEVNULL,
+        start_new_session=True,
+        preexec_fn=preexec_fn,
+    )
+
+    def pump():
+        for raw in iter(lambda: proc.stdout.readline(MAX_LINE_BYTES), b""):
+            line = raw.decode("utf-8", errors="replace")
+            tail.append(line)
+            if echo:
+                sys.stdout.write(f"{prefix}{line}")
+                sys.stdout.flush()
+        proc.stdout.close()
+
+    reader = threading.Thread(target=pump, daemon=True)
+    reader.start()
+
+    timed_out = False
+    reaped = False
+    lock = threading.Lock()
+    timers: List[threading.Timer] = []
+
+    def start_timer(delay: float, func):
+        timer = threading.Timer(delay, func)
+        timer.daemon = True
+        timers.append(timer)
+        timer.start()
+
+    def kill():
+        with lock:
+            if not reaped:
+                _kill_group(proc.pid, signal.SIGKILL)
+
+    def terminate():
+        nonlocal timed_out
+        with lock:
+            if reaped:
+                return
+            timed_out = True
+            _kill_group(proc.pid, signal.SIGTERM)
+            start_timer(kill_grace, kill)
+
+    if timeout is not None:
+        start_timer(timeout, terminate)
+    try:
+        _, status, rusage = os.wait4(proc.pid, 0)
+    finally:
+        with lock:
+            # the child is reaped: a timer firing late must not signal its pid any more
+            reaped = True
+        for timer in timers:
+            timer.cancel()
+
+    if timed_out:
+        # Take down anything the child left behind in its group
+        _kill_group(proc.pid, signal.SIGKILL)
+    reader.join(timeout=kill_grace)
+    wall_time = time.monotonic() - start
+
+    returncode = _exit_code(status)
+    proc.returncode = returncode
+    result = StreamResult(cmd, returncode, list(tail), wall_time, _max_rss_kb(rusage), timed_out)
+    outcome = "timeout" if timed_out else ("ok" if returncode == 0 else "failed")
+    SUBPROCESS_SECONDS.observe(wall_time, command=os.path.basename(str(cmd[0])), outcome=outcome)
+
+    if check and timed_out:
+        raise subprocess.TimeoutExpired(list(cmd), timeout, output=result.tail)
+    if check and returncode != 0:
+        raise subprocess.CalledProcessError(returncode, list(cmd), output=result.tail)
+    return result
@@ -0,0 +1,211 @@
+import os
+import re
+import resource
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+from concurrency import AdaptiveLimiter, ThrottledError, detect_throttle, run_throttled
+from stream_run import run_streaming
+
+# key:value / key=value arguments whose key mentions a token (fastlane's apitoken:...)
+_SECRET_ARG = re.compile(r"^(-*[\w.-]*token[\w.-]*[:=]).+$", re.IGNORECASE)
+
+
+def redact_cmd(cmd: Sequence[str]) -> str:
+    """Command line for logs, with token values masked"""
+    return " ".join(_SECRET_ARG.sub(r"\1***", arg) for arg in cmd)
+
+
+class PoolJob:
+    """
+    One preprocessing subprocess (DTXDssClient, fastlane run, ...).
+
+    Args:
+        cmd: Command and arguments
+        developer_dir: DEVELOPER_DIR for this job (Xcode selection)
+        env: Extra environment variables
+        memory_mb: Memory reserved from the pool budget while the job runs
+        prepare: Called with the job's working directory before the command starts
+        job_id: Name used in logs and results
+    """
+
+    def __init__(self, cmd: Sequence[str], developer_dir: Optional[str] = None, env: Optional[Dict[str, str]] = None,
+                 memory_mb: Optional[int] = None, prepare: Optional[Callable[[Path], None]] = None,
+                 job_id: Optional[str] = None):
+        self.cmd = list(cmd)
+        self.developer_dir = developer_dir
+        self.env = env or {}
+        self.memory_mb = memory_mb
+        self.prepare = prepare
+        self.job_id = job_id or uuid.uuid4().hex[:12]
+
+
+class PoolJobResult:
+    def __init__(self, job_id: str, returncode: Optional[int], wall_time: float, queue_wait: float,
+                 peak_rss_kb: int, tail: str, error: Optional[str] = None):
+        self.job_id = job_id
+        self.returncode = returncode
+        self.wall_time = wall_time
+        self.queue_wait = queue_wait
+        self.peak_rss_kb = peak_rss_kb
+        self.tail = tail
+        self.error = error
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0 and self.error is None
+
+    def __repr__(self):
+        return (f"PoolJobResult({self.job_id!r}, returncode={self.returncode}, wall_time={self.wall_time:.2f}s, "
+                f"queue_wait={self.queue_wait:.2f}s, peak_rss_kb={self.peak_rss_kb})")
+
+
+class _ThrottledJob(ThrottledError):
+    """A job whose output reports a 429; carries its result in case the retries run out"""
+
+    def __init__(self, result: PoolJobResult, retry_after: Optional[float]):
+        super().__init__(f"[{result.job_id}] throttled by Dynatrace (429)", retry_after)
+        self.result = result
+
+
+class _MemoryBudget:
+    """Blocks job start until its reserved memory fits in the pool budget"""
+
+    def __init__(self, total_mb: Optional[int]):
+        self.total_mb = total_mb
+        self.used_mb = 0
+        self._cond = threading.Condition()
+
+    def acquire(self, mb: int):
+        if self.total_mb is None:
+            return
+        mb = min(mb, self.total_mb)
+        with self._cond:
+            while self.used_mb + mb > self.total_mb:
+                self._cond.wait()
+            self.used_mb += mb
+
+    def release(self, mb: int):
+        if self.total_mb is None:
+            return
+        mb = min(mb, self.total_mb)
+        with self._cond:
+            self.used_mb -= mb
+            self._cond.notify_all()
+
+
+class SymbolJobPool:
+    """
+    Run symbol preprocessing subprocesses concurrently.
+
+    Each job runs in its own temporary working directory (also its TMPDIR)
+    with its own DEVELOPER_DIR. A memory budget limits how many jobs run at
+    once regardless of worker count; with enforce_rlimit the per-job
+    reservation is also applied as the child's address-space limit.
+    With a limiter, every job also takes one of its slots, and jobs whose
+    output reports a 429 back off and are retried (see run_throttled).
+    """
+
+    def __init__(self, max_workers: Optional[int] = None, memory_budget_mb: Optional[int] = None,
+                 per_job_memory_mb: int = 1024, timeout: Optional[float] = None,
+                 work_root: Optional[str] = None, keep_work_dirs: bool = False,
+                 enforce_rlimit: bool = False, verbose: bool = True, limiter: Optional[AdaptiveLimiter] = None,
+                 max_attempts: int = 5):
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.budget = _MemoryBudget(memory_budget_mb)
+        self.per_job_memory_mb = per_job_memory_mb
+        self.timeout = timeout
+        self.work_root = work_root
+        self.keep_work_dirs = keep_work_dirs
+        self.enforce_rlimit = enforce_rlimit
+        self.verbose = verbose
+        self.limiter = limiter
+        self.max_attempts = max_attempts
+
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
+
+    def _rlimit(self, memory_mb: int):
+        if not self.enforce_rlimit:
+            return None
+        limit = memory_mb * 1024 * 1024
+
+        def apply():
+            resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+        return apply
+
+    def _run_attempt(self, job: PoolJob, submitted: float, memory_mb: int) -> PoolJobResult:
+        queue_wait = time.monotonic() - submitted
+        work_dir = Path(tempfile.mkdtemp(prefix=f"dt-job-{job.job_id}-", dir=self.work_root))
+        try:
+            env = dict(os.environ, TMPDIR=str(work_dir))
+            env.update(job.env)
+            if job.developer_dir:
+                env["DEVELOPER_DIR"] = job.developer_dir
+            if job.prepare:
+                job.prepare(work_dir)
+
+            self._log(f"🟢 [{job.job_id}] {redact_cmd(job.cmd)}")
+            result = run_streaming(job.cmd, cwd=str(work_dir), env=env, timeout=self.timeout, check=False,
+                                   prefix=f"[{job.job_id}] ", echo=self.verbose,
+                                   preexec_fn=self._rlimit(memory_mb))
+            error = "timed out" if result.timed_out else None
+            return PoolJobResult(job.job_id, result.returncode, result.wall_time, queue_wait,
+                                 result.peak_rss_kb, result.tail, error)
+        except (OSError, subprocess.SubprocessError) as e:
+            return PoolJobResult(job.job_id, None, 0.0, queue_wait, 0, "", str(e))
+        finally:
+            if not self.keep_work_dirs:
+                shutil.rmtree(work_dir, ignore_errors=True)
+
+    def _run_one(self, job: PoolJob, submitted: float) -> PoolJobResult:
+        # memory first: a job waiting for its memory must not hold one of the limiter's upload slots
+        memory_mb = job.memory_mb or self.per_job_memory_mb
+        self.budget.acquire(memory_mb)
+        try:
+            if self.limiter is None:
+                return self._run_attempt(job, submitted, memory_mb)
+
+            def attempt():
+                result = self._run_attempt(job, submitted, memory_mb)
+                throttled, retry_after = detect_throttle(result.tail) if not result.ok else (False, None)
+                if throttled:
+                    raise _ThrottledJob(result, retry_after)
+                return result
+
+            try:
+                return run_throttled(attempt, self.limiter, self.max_attempts)
+            except _ThrottledJob as e:
+                return e.result
+        finally:
+            self.budget.release(memory_mb)
+
+    def run(self, jobs: List[PoolJob]) -> List[PoolJobResult]:
+        """
+        Run all jobs and return their results in input order.
+        Failures are reported per job rather than raised.
+        """
+        submitted = time.monotonic()
+        with ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="symbol-job") as executor:
+            futures = [executor.submit(self._run_one, job, submitted) for job in jobs]
+            results = [f.result() for f in futures]
+        self.print_report(results)
+        return results
+
+    def print_report(self, results: List[PoolJobResult]) -> None:
+        """Print per-job timing"""
+        self._log("\n=== Preprocessing Jobs ===")
+        for r in results:
+            icon = "✅" if r.ok else "❌"
+            status = r.error or f"exit {r.returncode}"
+            self._log(f"{icon} {r.job_id:<16} {r.wall_time:8.2f}s run  {r.queue_wait:8.2f}s queued  "
+                      f"{r.peak_rss_kb // 1024:6d} MB  {status}")
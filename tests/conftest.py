@@ -0,0 +1,17 @@
+import os
+import sys
+
+import pytest
+
+# the scripts live in the repository root and import each other by module name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture
+def dynatrace():
+    from fake_dynatrace import FakeDynatrace
+
+    with FakeDynatrace() as server:
+        yield server
+    from dynatrace_client import close_all
+    close_all()
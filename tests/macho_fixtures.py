@@ -0,0 +1,76 @@
+"""Synthetic Mach-O binaries: real headers and LC_UUID, random padding instead of code"""
+import os
+import struct
+import uuid
+import zipfile
+from pathlib import Path
+from typing import Iterable, Tuple
+
+MH_MAGIC = 0xFEEDFACE
+MH_MAGIC_64 = 0xFEEDFACF
+LC_UUID = 0x1B
+
+# arch name -> (cputype, cpusubtype)
+CPU = {
+    "i386": (7, 3),
+    "x86_64": (0x01000007, 3),
+    "armv7": (12, 9),
+    "arm64": (0x0100000C, 0),
+    "arm64e": (0x0100000C, 2),
+}
+
+
+def thin(arch: str, slice_uuid: uuid.UUID, size: int = 4096, big_endian: bool = False) -> bytes:
+    """A thin Mach-O with one LC_UUID load command, padded to `size` bytes"""
+    cputype, cpusubtype = CPU[arch]
+    is_64 = cputype & 0x01000000
+    endian = ">" if big_endian else "<"
+    magic = MH_MAGIC_64 if is_64 else MH_MAGIC
+    header = struct.pack(endian + "IiIIIII", magic, cputype, cpusubtype, 10, 1, 24, 0)
+    if is_64:
+        header += b"\0" * 4
+    body = header + struct.pack(endian + "II", LC_UUID, 24) + slice_uuid.bytes
+    return body + os.urandom(size - len(body))
+
+
+def fat(slices: Iterable[Tuple[str, bytes]], fat64: bool = False, align: int = 14) -> bytes:
+    """A universal binary holding `slices` ((arch, thin bytes)), each aligned to 2**align"""
+    slices = list(slices)
+    entry = ">iIQQII" if fat64 else ">iIIII"
+    offset = 8 + len(slices) * struct.calcsize(entry)
+    header = struct.pack(">II", 0xCAFEBABF if fat64 else 0xCAFEBABE, len(slices))
+    data = bytearray()
+    for arch, blob in slices:
+        start = (offset + (1 << align) - 1) >> align << align
+        cputype, cpusubtype = CPU[arch]
+        fields = (cputype, cpusubtype, start, len(blob), align) + ((0,) if fat64 else ())
+        header += struct.pack(entry, *fields)
+        data += b"\0" * (start - offset) + blob
+        offset = start + len(blob)
+    first = 8 + len(slices) * struct.calcsize(entry)
+    return header + b"\0" * (first - len(header)) + bytes(data)
+
+
+def universal(archs: Iterable[str], uuids=None, fat64: bool = False, size: int = 4096):
+    """(fat binary bytes, {arch: UUID string as scanners report it})"""
+    archs = list(archs)
+    uuids = uuids or [uuid.uuid4() for _ in archs]
+    data = fat([(arch, thin(arch, u, size)) for arch, u in zip(archs, uuids)], fat64=fat64)
+    return data, {arch: str(u).upper() for arch, u in zip(archs, uuids)}
+
+
+def dsym(root: Path, name: str, binary: bytes) -> Path:
+    """Write a minimal Name.app.dSYM bundle around `binary`"""
+    bundle = root / f"{name}.app.dSYM"
+    dwarf = bundle / "Contents" / "Resources" / "DWARF"
+    dwarf.mkdir(parents=True)
+    (dwarf / name).write_bytes(binary)
+    (bundle / "Contents" / "Info.plist").write_text("<plist version=\"1.0\"><dict/></plist>")
+    return bundle
+
+
+def zip_dsym(bundle: Path, output: Path, compression: int = zipfile.ZIP_DEFLATED) -> Path:
+    with zipfile.ZipFile(output, "w", compression) as zf:
+        for path in sorted(bundle.rglob("*")):
+            zf.write(path, path.relative_to(bundle.parent).as_posix())
+    return output
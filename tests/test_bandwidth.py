@@ -0,0 +1,32 @@
+import pytest
+
+import bandwidth
+
+
+@pytest.fixture(autouse=True)
+def fresh_limiter(monkeypatch):
+    monkeypatch.setattr(bandwidth, "_limiter", None)
+    monkeypatch.setattr(bandwidth, "_shared_session", None)
+    monkeypatch.delenv(bandwidth.BANDWIDTH_ENV, raising=False)
+    monkeypatch.delenv(bandwidth.REQUESTS_ENV, raising=False)
+
+
+def test_no_limit_leaves_the_session_alone():
+    assert bandwidth.limited(None) is None
+
+
+def test_callers_without_a_session_share_one():
+    bandwidth.configure("50MB")
+    first = bandwidth.limited(None)
+    assert isinstance(first, bandwidth.ThrottledSession)
+    assert bandwidth.limited(None) is first
+    assert bandwidth.limited(first) is first
+
+
+def test_reconfiguring_replaces_the_shared_session():
+    bandwidth.configure("50MB")
+    first = bandwidth.limited(None)
+    limiter = bandwidth.configure("10MB")
+    second = bandwidth.limited(None)
+    assert second is not first
+    assert second.limiter is limiter
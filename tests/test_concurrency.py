@@ -0,0 +1,62 @@
+import threading
+
+from concurrency import AdaptiveLimiter, ThrottledError, run_throttled
+from metrics import UPLOAD_LIMIT, UPLOADS_IN_FLIGHT, UPLOADS_QUEUED
+
+
+def test_throttles_from_one_window_decrease_once():
+    limiter = AdaptiveLimiter(initial=8, max_limit=8, base_backoff=0.01, max_backoff=0.01, name="window")
+    started = [limiter.acquire() for _ in range(8)]
+    for s in started:
+        limiter.on_throttle(0, s)
+        limiter.release()
+    assert limiter.limit == 4
+    assert limiter.metrics()["throttled_total"] == 8
+
+    # an upload started after the decrease is a new congestion event
+    with limiter.slot() as s:
+        pass
+    limiter.on_throttle(0, s)
+    assert limiter.limit == 2
+
+
+def test_concurrent_throttled_uploads_halve_the_limit_once():
+    limiter = AdaptiveLimiter(initial=4, max_limit=4, name="concurrent")
+    barrier = threading.Barrier(4)
+    calls = []
+
+    def upload():
+        calls.append(1)
+        if len(calls) <= 4:
+            barrier.wait(timeout=5)
+            raise ThrottledError("429", retry_after=0)
+        return "ok"
+
+    threads = [threading.Thread(target=run_throttled, args=(upload, limiter, 2)) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join(timeout=10)
+    # 4 429s in one window: 4 -> 2, then 4 successful retries add back about +1 each
+    assert limiter.metrics()["throttled_total"] == 4
+    assert 2 <= limiter.limit < 4
+
+
+def test_gauges_track_limit_in_flight_and_queue():
+    limiter = AdaptiveLimiter(initial=1, max_limit=1, name="gauges")
+    assert UPLOAD_LIMIT.value(limiter="gauges") == 1
+    limiter.acquire()
+    assert UPLOADS_IN_FLIGHT.value(limiter="gauges") == 1
+
+    waiter = threading.Thread(target=lambda: (limiter.acquire(), limiter.release()))
+    waiter.start()
+    for _ in range(100):
+        if UPLOADS_QUEUED.value(limiter="gauges") == 1:
+            break
+        threading.Event().wait(0.01)
+    assert UPLOADS_QUEUED.value(limiter="gauges") == 1
+
+    limiter.release()
+    waiter.join(timeout=5)
+    assert UPLOADS_QUEUED.value(limiter="gauges") == 0
+    assert UPLOADS_IN_FLIGHT.value(limiter="gauges") == 0
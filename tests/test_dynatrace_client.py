@@ -0,0 +1,30 @@
+import pytest
+
+from dynatrace_client import close_all, get_client
+
+
+@pytest.fixture(autouse=True)
+def clients():
+    close_all()
+    yield
+    close_all()
+
+
+def pool_maxsize(client):
+    return client.session.get_adapter("https://example.invalid")._pool_maxsize
+
+
+def test_options_apply_to_an_existing_client():
+    client = get_client("dev", "http://dt.invalid", listing_ttl=60)
+    assert get_client("dev", "http://dt.invalid", pool_size=40, token_ttl=10, listing_ttl=5) is client
+    assert client.pool_size == 40
+    assert pool_maxsize(client) == 40
+    assert client.token_ttl == 10
+    assert client.listing_ttl == 5
+
+
+def test_pool_is_never_shrunk():
+    client = get_client("dev", "http://dt.invalid", pool_size=40)
+    get_client("dev", "http://dt.invalid", pool_size=10)
+    assert client.pool_size == 40
+    assert pool_maxsize(client) == 40
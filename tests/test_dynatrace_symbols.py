@@ -0,0 +1,60 @@
+import subprocess
+
+import pytest
+
+from concurrency import AdaptiveLimiter
+from dynatrace_symbols import DynatraceSymbolPublisher
+from keepshell import PUBLISH_SYMBOLS_SH
+from upload_ledger import UploadLedger
+
+
+def publisher_script(tmp_path, upload_body: str) -> str:
+    """publish-symbols.sh with stub sections in front of the dispatcher"""
+    path = tmp_path / "publish-symbols.sh"
+    sections = ("select_xcode() { echo xcode; }\n"
+                "install() { echo install; }\n"
+                f"upload_symbols() {{\n{upload_body}\n}}\n")
+    path.write_text(PUBLISH_SYMBOLS_SH.replace("set -e\n", "set -e\n" + sections, 1))
+    return str(path)
+
+
+@pytest.fixture
+def symbol_file(tmp_path):
+    path = tmp_path / "MyApp.app.dSYM.zip"
+    path.write_bytes(b"dsym" * 1024)
+    return str(path)
+
+
+def test_upload_is_recorded_and_skipped_on_rerun(tmp_path, symbol_file):
+    script = publisher_script(tmp_path, f'echo "upload $APPLICATION_ID" >> "{tmp_path}/uploads"')
+    ledger = UploadLedger(str(tmp_path / "ledger.json"), verbose=False)
+    publisher = DynatraceSymbolPublisher(script, ledger=ledger)
+
+    publisher.upload_symbols("app", "100", "8.287.2.1009", symbol_file=symbol_file, environment="dev")
+    publisher.upload_symbols("app", "100", "8.287.2.1009", symbol_file=symbol_file, environment="dev")
+
+    assert (tmp_path / "uploads").read_text().splitlines() == ["upload app"]
+    assert ledger.uploaded_files == 1 and ledger.skipped_files == 1
+
+
+def test_throttled_upload_is_retried(tmp_path, symbol_file):
+    script = publisher_script(tmp_path, f"""
+        if [ ! -e "{tmp_path}/throttled" ]; then
+            touch "{tmp_path}/throttled"; echo "HTTP 429 Too Many Requests, Retry-After: 0"; exit 1
+        fi
+        echo uploaded""")
+    limiter = AdaptiveLimiter(base_backoff=0.01)
+    publisher = DynatraceSymbolPublisher(script, limiter=limiter)
+
+    assert "uploaded" in publisher.upload_symbols("app", "100", "8.287.2.1009")
+    assert limiter.metrics()["throttled_total"] == 1
+
+
+def test_failed_upload_raises_and_is_recorded(tmp_path, symbol_file):
+    script = publisher_script(tmp_path, "echo boom; exit 3")
+    ledger = UploadLedger(str(tmp_path / "ledger.json"), verbose=False)
+    publisher = DynatraceSymbolPublisher(script, ledger=ledger)
+
+    with pytest.raises(subprocess.CalledProcessError):
+        publisher.upload_symbols("app", "100", "8.287.2.1009", symbol_file=symbol_file, environment="dev")
+    assert ledger.failed_files == 1
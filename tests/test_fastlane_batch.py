@@ -0,0 +1,124 @@
+import stat
+import sys
+import textwrap
+
+import pytest
+
+from concurrency import AdaptiveLimiter
+from script_loader import load_script
+
+# Stands in for `fastlane dynatrace_batch_process_symbols jobs_file:... results_file:...`.
+# Outcome per job depends on the symbol file name: *fail* fails, *throttle* answers 429
+# once, *crash* kills the run before its result is written.
+STUB = textwrap.dedent("""\
+    #!{python}
+    import json, os, sys
+    args = dict(arg.split(":", 1) for arg in sys.argv[2:])
+    with open(os.environ["STUB_FASTLANE_LOG"], "a") as f:
+        f.write(sys.argv[1] + "\\n")
+    results = []
+    for job in json.load(open(args["jobs_file"])):
+        name = os.path.basename(job["params"]["symbolIsFile"])
+        marker = job["params"]["symbolIsFile"] + ".throttled"
+        if not os.path.exists(job["params"]["symbolIsFile"]):
+            results.append({{"id": job["id"], "status": "failed", "error": "symbol file not found", "seconds": 0.1}})
+        elif "crash" in name:
+            sys.exit(1)
+        elif "fail" in name:
+            results.append({{"id": job["id"], "status": "failed", "error": "bad dSYM", "seconds": 0.1}})
+        elif "throttle" in name and not os.path.exists(marker):
+            open(marker, "w").close()
+            results.append({{"id": job["id"], "status": "failed", "seconds": 0.1,
+                            "error": "HTTP 429 Too Many Requests Retry-After: 0"}})
+        else:
+            results.append({{"id": job["id"], "status": "ok", "seconds": 0.1}})
+        json.dump(results, open(args["results_file"], "w"))
+""")
+
+
+@pytest.fixture
+def fastlane():
+    return load_script("py-fastlane.py")
+
+
+@pytest.fixture
+def uploader(tmp_path, fastlane, monkeypatch):
+    monkeypatch.setenv("STUB_FASTLANE_LOG", str(tmp_path / "invocations"))
+    stub = tmp_path / "fastlane"
+    stub.write_text(STUB.format(python=sys.executable))
+    stub.chmod(stub.stat().st_mode | stat.S_IEXEC)
+    return fastlane.DynatraceFastlaneUploader(fastlane_path=str(stub), project_dir=str(tmp_path),
+                                              limiter=AdaptiveLimiter(base_backoff=0.01), max_attempts=3)
+
+
+def jobs(tmp_path, fastlane, *names):
+    result = []
+    for i, name in enumerate(names):
+        path = tmp_path / name
+        path.write_bytes(name.encode("utf-8"))
+        result.append(fastlane.SymbolJob("app", "token", "./DTXDssClient", str(path), "com.example", "1.0", str(i),
+                                         job_id=f"job{i}"))
+    return result
+
+
+def statuses(report):
+    return [r["status"] for r in report]
+
+
+def test_all_jobs_run_in_one_invocation(tmp_path, fastlane, uploader):
+    report = uploader.process_symbols_batch(jobs(tmp_path, fastlane, "a.zip", "b.zip", "c.zip"),
+                                            dedupe=False, precheck=False)
+    assert statuses(report) == ["ok", "ok", "ok"]
+    assert [r["symbol_file"] for r in report] == [str(tmp_path / n) for n in ("a.zip", "b.zip", "c.zip")]
+    assert (tmp_path / "invocations").read_text().splitlines() == [fastlane.BATCH_LANE]
+
+
+def test_failures_are_reported_per_job(tmp_path, fastlane, uploader):
+    report = uploader.process_symbols_batch(jobs(tmp_path, fastlane, "a.zip", "fail.zip", "c.zip"),
+                                            dedupe=False, precheck=False)
+    assert statuses(report) == ["ok", "failed", "ok"]
+    assert report[1]["error"] == "bad dSYM"
+
+
+def test_throttled_jobs_are_retried_in_a_follow_up_batch(tmp_path, fastlane, uploader):
+    report = uploader.process_symbols_batch(jobs(tmp_path, fastlane, "a.zip", "throttle.zip"),
+                                            dedupe=False, precheck=False)
+    assert statuses(report) == ["ok", "ok"]
+    assert len((tmp_path / "invocations").read_text().splitlines()) == 2
+    assert uploader.limiter.metrics()["throttled_total"] == 1
+
+
+def test_jobs_after_a_crash_are_not_run(tmp_path, fastlane, uploader):
+    report = uploader.process_symbols_batch(jobs(tmp_path, fastlane, "a.zip", "crash.zip", "c.zip"),
+                                            dedupe=False, precheck=False)
+    assert statuses(report) == ["ok", "not_run", "not_run"]
+    assert "fastlane exited before this job ran" in report[1]["error"]
+
+
+def test_relative_symbol_paths_are_found_from_the_batch_work_dir(tmp_path, fastlane, uploader, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "a.zip").write_bytes(b"a")
+    job = fastlane.SymbolJob("app", "token", "./DTXDssClient", "a.zip", "com.example", "1.0", "1", job_id="job0")
+    report = uploader.process_symbols_batch([job], dedupe=False, precheck=False)
+    assert statuses(report) == ["ok"]
+    assert report[0]["symbol_file"] == "a.zip"
+
+
+def test_generated_fastfile_is_written(tmp_path, fastlane, uploader):
+    fastlane_dir = uploader._prepare_work_dir(tmp_path / "work")
+    assert f"lane :{fastlane.BATCH_LANE}" in (fastlane_dir / "Fastfile").read_text()
+
+
+def test_batch_skips_and_records_ledger_uploads(tmp_path, fastlane, uploader):
+    from upload_ledger import UploadLedger
+    uploader.ledger = UploadLedger(str(tmp_path / "ledger.json"), verbose=False)
+    batch = jobs(tmp_path, fastlane, "a.zip", "fail.zip")
+
+    first = uploader.process_symbols_batch(batch, dedupe=False, precheck=False, environment="prod")
+    second = uploader.process_symbols_batch(batch, dedupe=False, precheck=False, environment="prod")
+    assert statuses(first) == ["ok", "failed"]
+    assert statuses(second) == ["skipped", "failed"]
+    summary = uploader.ledger.summary()
+    assert summary["uploaded_files"] == 1
+    assert summary["failed_files"] == 2
+    assert summary["skipped_files"] == 1
@@ -0,0 +1,99 @@
+import threading
+import time
+
+import pytest
+import requests
+from requests.adapters import BaseAdapter
+
+from hedging import HedgedSession, LatencyTracker
+
+
+class FakeResponse(requests.Response):
+    def __init__(self, call: int):
+        super().__init__()
+        self.status_code = 200
+        self.call = call
+        self.closed = threading.Event()
+
+    def close(self):
+        self.closed.set()
+
+
+class FakeAdapter(BaseAdapter):
+    """Answers the n-th request after latencies[n] seconds (the last latency repeats)"""
+
+    def __init__(self, *latencies: float):
+        super().__init__()
+        self.latencies = list(latencies)
+        self.responses = []
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        with self._lock:
+            call = len(self.responses)
+            response = FakeResponse(call)
+            self.responses.append(response)
+        time.sleep(self.latencies[min(call, len(self.latencies) - 1)])
+        return response
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def hedged():
+    sessions = []
+
+    def make(*latencies, delay=0.1):
+        session = requests.Session()
+        session.mount("http://", FakeAdapter(*latencies))
+        tracker = LatencyTracker(min_samples=20, initial_delay=10.0)
+        for _ in range(20):
+            tracker.record(delay)
+        assert tracker.delay() == delay  # p95 of the seeded samples
+        sessions.append(HedgedSession(session, tracker=tracker, max_hedge_ratio=0.1))
+        return sessions[-1]
+
+    yield make
+    for session in sessions:
+        session.close()
+
+
+def adapter(session):
+    return session.session.get_adapter("http://nexus")
+
+
+def test_fast_responses_are_not_hedged(hedged):
+    session = hedged(0.0)
+    for _ in range(5):
+        assert session.get("http://nexus/a").status_code == 200
+    assert len(adapter(session).responses) == 5
+    assert session.stats == {"requests": 5, "hedged": 0, "hedge_wins": 0, "over_budget": 0}
+
+
+def test_a_slow_response_is_hedged_and_the_hedge_wins(hedged):
+    session = hedged(0.5, 0.0)
+    response = session.get("http://nexus/a")
+    assert response.call == 1
+    assert session.stats["hedged"] == 1 and session.stats["hedge_wins"] == 1
+
+
+def test_the_losing_response_is_closed(hedged):
+    session = hedged(0.3, 0.0)
+    winner = session.get("http://nexus/a")
+    loser = adapter(session).responses[0]
+    assert loser is not winner
+    assert loser.closed.wait(timeout=5)
+    assert not winner.closed.is_set()
+
+
+def test_hedges_stop_at_the_budget(hedged):
+    session = hedged(0.3, 0.0, 0.3)
+    session.get("http://nexus/a")
+    response = session.get("http://nexus/b")
+
+    # 1 hedge in 2 requests is over 10%: the second slow request waits for its primary
+    assert response.call == 2
+    assert len(adapter(session).responses) == 3
+    assert session.stats["over_budget"] == 1
+    assert session.hedge_rate() == 0.5
@@ -0,0 +1,75 @@
+import time
+
+import pytest
+
+from job_queue import JobHandlers, JobQueue
+from metrics import QUEUE_JOBS
+
+PAYLOAD = {"group_id": "com.example", "artifact_id": "app", "version_id": "1.0", "platform": "android"}
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = JobQueue(str(tmp_path / "queue.db"), lease_seconds=0.05, retry_delay=0, verbose=False)
+    yield queue
+    queue.close()
+
+
+def test_expired_job_out_of_attempts_is_not_counted_as_recovered(queue):
+    queue.enqueue("release", "prod", PAYLOAD, max_attempts=1)
+    assert queue.claim("worker-1") is not None
+    time.sleep(0.1)
+    recovered, failed = QUEUE_JOBS.value(outcome="recovered"), QUEUE_JOBS.value(outcome="failed")
+
+    assert queue.recover() == 1
+    assert QUEUE_JOBS.value(outcome="recovered") == recovered
+    assert QUEUE_JOBS.value(outcome="failed") == failed + 1
+
+
+def test_fail_after_lease_lost_changes_nothing(queue):
+    queue.enqueue("release", "prod", PAYLOAD)
+    job = queue.claim("worker-1")
+    time.sleep(0.1)
+    assert queue.claim("worker-2").id == job.id
+    retried, failed = QUEUE_JOBS.value(outcome="retried"), QUEUE_JOBS.value(outcome="failed")
+
+    assert queue.fail(job, "boom") == "lost"
+    assert QUEUE_JOBS.value(outcome="retried") == retried
+    assert QUEUE_JOBS.value(outcome="failed") == failed
+    assert queue.pending() == 1
+
+
+def test_ios_upload_installs_the_client_through_the_flow(queue, monkeypatch, tmp_path):
+    import release_flow
+
+    calls = []
+    monkeypatch.setenv("DT_API_TOKEN", "token")
+    monkeypatch.setattr(release_flow.ReleaseFlow, "install_client",
+                        lambda self, version: calls.append(version) or "/Xcode.app/Contents/Developer")
+    monkeypatch.setattr(release_flow.ReleaseFlow, "upload",
+                        lambda self, metadata, path, platform, developer_dir=None: developer_dir)
+    queue.enqueue("upload", "prod", {"platform": "ios", "file": "app.zip", "application_id": "app",
+                                     "package_name": "com.example", "version_code": "1", "version_name": "1.0",
+                                     "client_version": "8.287"})
+    job = queue.claim("worker-1")
+
+    handlers = JobHandlers("http://nexus.invalid", work_dir=str(tmp_path))
+    assert handlers.upload(job) == {"uploaded": True}
+    assert calls == ["8.287"]
+
+
+def test_job_finished_after_its_lease_was_lost_is_not_counted_done(queue):
+    from job_queue import WorkerPool
+
+    queue.enqueue("release", "prod", PAYLOAD)
+    job = queue.claim("worker-1")
+
+    def handler(job):
+        time.sleep(0.1)
+        assert queue.claim("worker-2").id == job.id  # lease lapsed, taken over
+        return {}
+
+    pool = WorkerPool(queue, {"release": handler}, workers=1, verbose=False)
+    pool._run_one(job)
+    assert pool.processed["done"] == 0
+    assert pool.processed["lost"] == 1
@@ -0,0 +1,131 @@
+import io
+import struct
+import zipfile
+
+import pytest
+
+from macho_fixtures import dsym, universal, zip_dsym
+from macho_thin import thin_buffer, thin_file, thin_symbol_file
+from macho_uuid import scan_buffer, scan_file, scan_symbol_file
+
+ARCHS = ["x86_64", "arm64", "arm64e"]
+
+
+def slice_bytes(data: bytes, arch: str) -> bytes:
+    s, = [s for s in scan_buffer(data) if s.arch == arch]
+    return data[s.offset:s.offset + s.size]
+
+
+@pytest.mark.parametrize("fat64", [False, True])
+def test_keeping_several_slices_writes_an_aligned_fat_file(fat64):
+    data, uuids = universal(ARCHS, fat64=fat64)
+    out = io.BytesIO()
+    kept, dropped, written = thin_buffer(data, ["arm64", "arm64e"], out)
+    result = out.getvalue()
+
+    assert (kept, dropped, written) == (["arm64", "arm64e"], ["x86_64"], len(result))
+    assert struct.unpack(">I", result[:4])[0] == (0xCAFEBABF if fat64 else 0xCAFEBABE)
+    slices = scan_buffer(result)
+    assert {s.arch: s.uuid for s in slices} == {a: uuids[a] for a in ("arm64", "arm64e")}
+    assert all(s.offset % (1 << 14) == 0 for s in slices)
+    for arch in ("arm64", "arm64e"):
+        assert slice_bytes(result, arch) == slice_bytes(data, arch)
+
+
+def test_keeping_one_slice_writes_a_thin_binary():
+    data, uuids = universal(ARCHS)
+    out = io.BytesIO()
+    assert thin_buffer(data, ["ARM64"], out)[:2] == (["arm64"], ["x86_64", "arm64e"])
+    assert out.getvalue() == slice_bytes(data, "arm64")
+    assert scan_buffer(out.getvalue())[0].uuid == uuids["arm64"]
+
+
+def test_no_matching_slice_writes_nothing():
+    data, _ = universal(ARCHS)
+    out = io.BytesIO()
+    assert thin_buffer(data, ["armv7"], out) == ([], ARCHS, 0)
+    assert out.getvalue() == b""
+
+
+def test_not_a_mach_o_raises():
+    with pytest.raises(ValueError):
+        thin_buffer(b"not a binary at all, just text", ["arm64"], io.BytesIO())
+
+
+def test_truncated_fat_file_raises():
+    data, _ = universal(ARCHS)
+    with pytest.raises(ValueError, match="Truncated"):
+        thin_buffer(data[:-100], ["arm64"], io.BytesIO())
+
+
+def test_thin_file_in_place_keeps_mode_and_reports_savings(tmp_path):
+    data, _ = universal(ARCHS)
+    path = tmp_path / "App"
+    path.write_bytes(data)
+    path.chmod(0o755)
+
+    report = thin_file(str(path), str(path), ["arm64"])
+    assert (report.kept, report.dropped, report.size_before) == (["arm64"], ["x86_64", "arm64e"], len(data))
+    assert report.saved == len(data) - path.stat().st_size > 0
+    assert path.stat().st_mode & 0o777 == 0o755
+    assert [s.arch for s in scan_file(str(path))] == ["arm64"]
+    assert [p.name for p in tmp_path.iterdir()] == ["App"]  # no temporary file left behind
+
+
+def test_thin_file_without_a_match_copies_unchanged(tmp_path):
+    data, _ = universal(ARCHS)
+    (tmp_path / "App").write_bytes(data)
+    report = thin_file(str(tmp_path / "App"), str(tmp_path / "out" / "App"), ["armv7"])
+    assert report.kept == [] and report.saved == 0
+    assert (tmp_path / "out" / "App").read_bytes() == data
+
+
+def test_dsym_bundle_is_copied_with_thinned_dwarf(tmp_path):
+    data, uuids = universal(ARCHS)
+    bundle = dsym(tmp_path / "in", "App", data)
+
+    output = thin_symbol_file(str(bundle), ["arm64"], str(tmp_path / "work"), verbose=False)
+    assert output == str(tmp_path / "work" / "App.app.dSYM")
+    assert (tmp_path / "work" / "App.app.dSYM" / "Contents" / "Info.plist").exists()
+    slices, = scan_symbol_file(output).values()
+    assert [(s.arch, s.uuid) for s in slices] == [("arm64", uuids["arm64"])]
+    assert [s.arch for s in scan_file(str(bundle / "Contents/Resources/DWARF/App"))] == ARCHS  # source untouched
+
+
+def test_dsym_zip_is_repackaged(tmp_path):
+    data, uuids = universal(ARCHS)
+    archive = zip_dsym(dsym(tmp_path / "in", "App", data), tmp_path / "App.app.dSYM.zip")
+
+    output = thin_symbol_file(str(archive), ["arm64", "arm64e"], str(tmp_path / "work"), verbose=False)
+    assert output == str(tmp_path / "work" / "App.app.dSYM.zip")
+    names = zipfile.ZipFile(output).namelist()
+    assert "App.app.dSYM/Contents/Info.plist" in names
+    slices, = scan_symbol_file(output).values()
+    assert {s.arch: s.uuid for s in slices} == {a: uuids[a] for a in ("arm64", "arm64e")}
+    assert sorted(p.name for p in (tmp_path / "work").iterdir()) == ["App.app.dSYM.zip"]
+
+
+@pytest.mark.parametrize("archs", [ARCHS, ["armv7"]])
+def test_nothing_to_drop_returns_the_original(tmp_path, archs):
+    data, _ = universal(ARCHS)
+    bundle = dsym(tmp_path / "in", "App", data)
+    assert thin_symbol_file(str(bundle), archs, str(tmp_path / "work"), verbose=False) == str(bundle)
+    assert not (tmp_path / "work").exists()
+
+
+def test_uploader_sends_the_thinned_copy(tmp_path, monkeypatch):
+    from script_loader import load_script
+    fastlane = load_script("py-fastlane.py")
+
+    data, uuids = universal(ARCHS)
+    bundle = dsym(tmp_path, "App", data)
+    seen = []
+
+    def run(self, job, upload_job, developer_dir, precheck):
+        seen.append([s.arch for found in scan_symbol_file(upload_job.symbol_file).values() for s in found])
+        return "ok"
+
+    monkeypatch.setattr(fastlane.DynatraceFastlaneUploader, "_process_symbols_job", run)
+    uploader = fastlane.DynatraceFastlaneUploader(archs=["arm64"])
+    assert uploader.process_symbols("app", "token", "./DTXDssClient", str(bundle), "com.example", "1.0", "1") == "ok"
+    assert seen == [["arm64"]]
@@ -0,0 +1,101 @@
+import uuid
+import zipfile
+
+import pytest
+
+from macho_fixtures import dsym, fat, thin, universal, zip_dsym
+from macho_uuid import dedupe_symbol_files, scan_buffer, scan_file, scan_symbol_file, scan_zip, symbol_file_uuids
+
+
+@pytest.mark.parametrize("fat64", [False, True])
+def test_fat_binary_reports_uuid_per_architecture(tmp_path, fat64):
+    data, uuids = universal(["x86_64", "arm64", "arm64e"], fat64=fat64)
+    path = tmp_path / "App"
+    path.write_bytes(data)
+
+    slices = scan_file(str(path))
+    assert {s.arch: s.uuid for s in slices} == uuids
+    assert all(s.offset % (1 << 14) == 0 for s in slices)
+
+
+def test_thin_binaries_in_both_byte_orders():
+    u = uuid.uuid4()
+    for arch in ("armv7", "arm64", "i386"):
+        for big_endian in (False, True):
+            slice_, = scan_buffer(thin(arch, u, big_endian=big_endian))
+            assert (slice_.arch, slice_.uuid) == (arch, str(u).upper())
+
+
+def test_non_mach_o_is_ignored(tmp_path):
+    # a Java class file shares the fat magic, with a huge "slice count"
+    assert scan_buffer(b"\xca\xfe\xba\xbe\x00\x00\x00\x34" + b"\0" * 64) == []
+    assert scan_buffer(b"plain text, not a binary") == []
+    empty = tmp_path / "empty"
+    empty.write_bytes(b"")
+    assert scan_file(str(empty)) == []
+
+
+@pytest.mark.parametrize("compression", [zipfile.ZIP_STORED, zipfile.ZIP_DEFLATED])
+def test_zip_members_are_scanned_in_place(tmp_path, compression):
+    data, uuids = universal(["arm64", "arm64e"])
+    archive = zip_dsym(dsym(tmp_path, "App", data), tmp_path / "App.app.dSYM.zip", compression)
+
+    found = scan_zip(str(archive))
+    assert list(found) == ["App.app.dSYM/Contents/Resources/DWARF/App"]
+    assert {s.arch: s.uuid for s in found["App.app.dSYM/Contents/Resources/DWARF/App"]} == uuids
+
+
+def test_bundle_zip_and_bare_binary_give_the_same_uuids(tmp_path):
+    data, uuids = universal(["arm64", "arm64e"])
+    bundle = dsym(tmp_path, "App", data)
+    archive = zip_dsym(bundle, tmp_path / "App.app.dSYM.zip")
+    bare = tmp_path / "App"
+    bare.write_bytes(data)
+
+    expected = frozenset(uuids.values())
+    assert symbol_file_uuids(str(bundle)) == symbol_file_uuids(str(archive)) == symbol_file_uuids(str(bare)) == expected
+    assert len(scan_symbol_file(str(bundle))) == 1
+
+
+def test_duplicates_collapse_to_the_first_file(tmp_path):
+    framework, _ = universal(["arm64", "arm64e"])
+    other, _ = universal(["arm64"])
+    first = dsym(tmp_path / "a", "Shared", framework)
+    copy = zip_dsym(dsym(tmp_path / "b", "Shared", framework), tmp_path / "Shared.app.dSYM.zip")
+    different = dsym(tmp_path / "c", "Other", other)
+    missing = tmp_path / "missing.zip"
+
+    unique, duplicates = dedupe_symbol_files([str(first), str(copy), str(different), str(missing)])
+    assert unique == [str(first), str(different), str(missing)]
+    assert duplicates == {str(copy): str(first)}
+
+
+def test_file_covering_uuids_of_two_earlier_files_is_kept(tmp_path):
+    a, b = uuid.uuid4(), uuid.uuid4()
+    only_a = tmp_path / "a"
+    only_a.write_bytes(thin("arm64", a))
+    only_b = tmp_path / "b"
+    only_b.write_bytes(thin("arm64e", b))
+    both = tmp_path / "both"
+    both.write_bytes(fat([("arm64", thin("arm64", a)), ("arm64e", thin("arm64e", b))]))
+
+    unique, duplicates = dedupe_symbol_files([str(only_a), str(only_b), str(both)])
+    assert unique == [str(only_a), str(only_b), str(both)] and duplicates == {}
+
+
+def test_duplicate_jobs_only_collapse_within_an_app_version(tmp_path):
+    from script_loader import load_script
+    fastlane = load_script("py-fastlane.py")
+
+    data, _ = universal(["arm64"])
+    first = dsym(tmp_path / "a", "Shared", data)
+    copy = dsym(tmp_path / "b", "Shared", data)
+
+    def job(path, version, job_id):
+        return fastlane.SymbolJob("app", "token", "./DTXDssClient", str(path), "com.example", "1.0", version,
+                                  job_id=job_id)
+
+    jobs = [job(first, "1", "one"), job(copy, "1", "two"), job(copy, "2", "three"), job(first, "1", "four")]
+    to_run, duplicate_of = fastlane.dedupe_symbol_jobs(jobs)
+    assert [j.job_id for j in to_run] == ["one", "three"]
+    assert duplicate_of == {"two": "one", "four": "one"}
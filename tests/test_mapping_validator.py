@@ -0,0 +1,45 @@
+import pytest
+
+from mapping_uploader import MappingUploader
+from mapping_validator import MappingValidationError, ValidatingReader
+
+VALID = "".join(f"com.example.Class{i} -> a{i}:\n    int field{i} -> a\n    1:4:void run():10:13 -> b\n"
+                for i in range(2000))
+
+
+def write(tmp_path, text: str) -> str:
+    path = tmp_path / "mapping.txt"
+    path.write_bytes(text.encode("utf-8"))
+    return str(path)
+
+
+def test_valid_mapping_reads_through(tmp_path):
+    path = write(tmp_path, VALID)
+    with ValidatingReader(path, chunk_size=8192) as reader:
+        assert b"".join(iter(lambda: reader.read(8192), b"")) == VALID.encode("utf-8")
+        assert reader.validator.classes == 2000
+
+
+def test_end_of_file_checks_run_before_the_last_chunk_is_returned(tmp_path):
+    # the truncated last line is only detectable at EOF
+    path = write(tmp_path, VALID + "com.example.Truncated -> ")
+    size = len(VALID) + len("com.example.Truncated -> ")
+    received = 0
+    with ValidatingReader(path) as reader:
+        with pytest.raises(MappingValidationError, match="malformed class mapping"):
+            while True:
+                chunk = reader.read(8192)
+                if not chunk:
+                    break
+                received += len(chunk)
+    assert received < size
+
+
+def test_invalid_mapping_never_reaches_dynatrace_complete(tmp_path, dynatrace):
+    path = write(tmp_path, VALID + "com.example.Truncated -> ")
+    uploader = MappingUploader("dev", "token", base_url=dynatrace.url, precheck=False, check_token=False,
+                               max_attempts=1, verbose=False)
+    with pytest.raises(MappingValidationError):
+        uploader.upload(path, "app", "com.example", "1", "1.0")
+    assert dynatrace.uploads == []
+    assert dynatrace.counts["bytes"] == 0
@@ -0,0 +1,144 @@
+import json
+
+import pytest
+
+import maven_metadata
+from fake_nexus import FakeNexus
+from maven_metadata import MavenMetadataResolver, MetadataNotFound
+
+REPOSITORY = "maven-releases"
+GROUP = "com.example"
+
+
+@pytest.fixture
+def nexus():
+    maven_metadata.clear_cache()
+    with FakeNexus() as server:
+        yield server
+    maven_metadata.clear_cache()
+
+
+def resolver(nexus, ttl=60.0):
+    return MavenMetadataResolver(nexus.url, REPOSITORY, ttl=ttl, verbose=False)
+
+
+def publish(nexus, version, filename=None, data=b"x"):
+    return nexus.add_artifact(REPOSITORY, GROUP, "app", version, filename or f"app-{version}.zip", data=data)
+
+
+def test_latest_and_release(nexus):
+    publish(nexus, "1.0.0")
+    publish(nexus, "1.1.0")
+    publish(nexus, "1.2.0-SNAPSHOT", "app-1.2.0-20250101.120000-1.zip")
+    r = resolver(nexus)
+    assert r.resolve_version(GROUP, "app", "LATEST") == "1.2.0-SNAPSHOT"
+    assert r.resolve_version(GROUP, "app", "RELEASE") == "1.1.0"
+    assert r.resolve_version(GROUP, "app", "1.0.0") == "1.0.0"
+    assert r.resolve(GROUP, "app", "RELEASE", packaging="zip").path == "com/example/app/1.1.0/app-1.1.0.zip"
+
+
+def test_snapshot_resolves_to_the_newest_build(nexus):
+    publish(nexus, "2.0.0-SNAPSHOT", "app-2.0.0-20250101.120000-1.zip")
+    publish(nexus, "2.0.0-SNAPSHOT", "app-2.0.0-20250102.090000-2.zip")
+    publish(nexus, "2.0.0-SNAPSHOT", "app-2.0.0-20250102.090000-2-sources.jar")
+    r = resolver(nexus)
+    assert r.resolve(GROUP, "app", "2.0.0-SNAPSHOT", packaging="zip").filename == "app-2.0.0-20250102.090000-2.zip"
+    assert (r.resolve(GROUP, "app", "2.0.0-SNAPSHOT", packaging="jar", classifier="sources").filename
+            == "app-2.0.0-20250102.090000-2-sources.jar")
+
+
+def test_missing_metadata_raises(nexus):
+    with pytest.raises(MetadataNotFound):
+        resolver(nexus).resolve_version(GROUP, "nothing", "LATEST")
+
+
+def test_fresh_entries_come_from_the_cache(nexus):
+    publish(nexus, "1.0.0")
+    r = resolver(nexus)
+    r.resolve_version(GROUP, "app", "LATEST")
+    publish(nexus, "1.1.0")
+    assert r.resolve_version(GROUP, "app", "LATEST") == "1.0.0"  # within the TTL
+    assert nexus.request_counts["metadata"] == 1
+
+
+def test_expired_entries_are_revalidated_with_the_etag(nexus):
+    publish(nexus, "1.0.0")
+    r = resolver(nexus, ttl=0)
+    assert r.resolve_version(GROUP, "app", "LATEST") == "1.0.0"
+    assert r.resolve_version(GROUP, "app", "LATEST") == "1.0.0"  # 304, parsed copy reused
+    assert nexus.request_counts["metadata"] == 2
+
+    publish(nexus, "1.1.0")
+    assert r.resolve_version(GROUP, "app", "LATEST") == "1.1.0"  # changed ETag, new body
+
+
+def test_etag_is_sent_on_revalidation(nexus, monkeypatch):
+    publish(nexus, "1.0.0")
+    r = resolver(nexus, ttl=0)
+    sent = []
+    get = r.http.get
+
+    def spy(url, **kwargs):
+        sent.append(kwargs.get("headers", {}).get("If-None-Match"))
+        response = get(url, **kwargs)
+        sent.append(response.status_code)
+        return response
+
+    monkeypatch.setattr(r, "http", type("Spy", (), {"get": staticmethod(spy)})())
+    r.resolve_version(GROUP, "app", "LATEST")
+    r.resolve_version(GROUP, "app", "LATEST")
+    assert sent[0] is None and sent[1] == 200
+    assert sent[2] and sent[3] == 304
+
+
+def metadata_json(version):
+    return json.dumps({
+        "versionCode": version.replace(".", ""),
+        "versionName": version,
+        "packageName": "com.example.app",
+        "symbolization": {"groupId": GROUP, "artifactId": "app", "versionId": version},
+        "dynatrace": {"applicationId": "app", "as": "ANDROID"},
+    }).encode("utf-8")
+
+
+def publish_release(nexus, version):
+    nexus.add_artifact(REPOSITORY, GROUP, "app", version, f"app-{version}.json", data=metadata_json(version))
+    nexus.add_artifact(REPOSITORY, GROUP, "app", version, f"app-{version}.txt", data=b"mapping")
+
+
+def test_flow_with_latest_picks_up_a_new_release_on_the_next_run(nexus, tmp_path, monkeypatch):
+    from release_flow import ReleaseFlow
+
+    monkeypatch.setattr(ReleaseFlow, "upload",
+                        lambda self, metadata, artifact_path, platform, developer_dir=None: True)
+
+    def run():
+        # as a new process would: fresh metadata cache, same stage cache file
+        maven_metadata.clear_cache()
+        flow = ReleaseFlow(nexus.url, "dev", "token", repository=REPOSITORY, work_dir=str(tmp_path / "work"),
+                           stage_cache=str(tmp_path / "stage-cache.json"))
+        return flow.run(GROUP, "app", "LATEST", "android")
+
+    publish_release(nexus, "1.0.0")
+    first = run()
+    publish_release(nexus, "1.1.0")
+    second = run()
+
+    assert first["metadata"]["version_name"] == "1.0.0"
+    assert second["metadata"]["version_name"] == "1.1.0"
+    assert second["artifact_path"].endswith("app-1.1.0.txt")
+
+
+def test_fixed_versions_are_cached_per_nexus():
+    from release_flow import ReleaseFlow
+    from stage_runner import StageRunner
+
+    flows = [ReleaseFlow(url, "dev", "token") for url in ("http://nexus-a", "http://nexus-b")]
+    (fetch,) = [s for s in flows[0].build_stages("android", version_id="1.0.0") if s.name == "fetch_metadata"]
+    assert fetch.cacheable
+
+    keys = set()
+    for flow in flows:
+        inputs = flow.initial_inputs(GROUP, "app", "1.0.0", "android")
+        keys.add(StageRunner.cache_key(fetch, {name: inputs[name] for name in fetch.inputs}))
+    assert len(keys) == 2
@@ -0,0 +1,124 @@
+import socket
+import stat
+
+import pytest
+
+from dynatrace_client import DynatraceClient, TokenError, symbol_file_key
+from fake_dynatrace import FakeDynatrace
+from mapping_uploader import MappingUploader
+from script_loader import load_script
+
+MAPPING = "".join(f"com.example.Class{i} -> a{i}:\n    int field -> a\n" for i in range(50))
+
+
+@pytest.fixture
+def mapping(tmp_path):
+    path = tmp_path / "mapping.txt"
+    path.write_text(MAPPING)
+    return str(path)
+
+
+def uploader(dynatrace, **kwargs):
+    return MappingUploader("dev", "token", base_url=dynatrace.url, check_token=False, verbose=False, **kwargs)
+
+
+def test_one_listing_answers_a_whole_batch(dynatrace):
+    dynatrace.add_symbol_file("app", "com.example", "android", "1", "1.0", size=10)
+    client = DynatraceClient("dev", base_url=dynatrace.url, verbose=False)
+    keys = [symbol_file_key("app", "com.example", "android", str(code), "1.0") for code in range(1, 6)]
+
+    present = client.existing_symbol_files("token", keys)
+    again = client.existing_symbol_files("token", keys[:1])
+
+    assert list(present) == [keys[0]] and present[keys[0]]["fileSize"] == 10
+    assert list(again) == [keys[0]]
+    assert dynatrace.counts["lists"] == 1
+
+
+def test_listing_expires_after_the_ttl(dynatrace):
+    client = DynatraceClient("dev", base_url=dynatrace.url, listing_ttl=0, verbose=False)
+    key = symbol_file_key("app", "com.example", "ios", "1", "1.0")
+    assert client.existing_symbol_files("token", [key]) == {}
+    dynatrace.add_symbol_file("app", "com.example", "IOS", "1", "1.0")
+    assert key in client.existing_symbol_files("token", [key])
+    assert dynatrace.counts["lists"] == 2
+
+
+def test_recorded_uploads_are_seen_without_a_new_listing(dynatrace):
+    client = DynatraceClient("dev", base_url=dynatrace.url, verbose=False)
+    key = symbol_file_key("app", "com.example", "ios", "1", "1.0")
+    assert client.existing_symbol_files("token", [key]) == {}
+    client.record_symbol_file(key, 42)
+    assert client.existing_symbol_files("token", [key]) == {key: {"fileSize": 42}}
+    assert dynatrace.counts["lists"] == 1
+
+
+def test_unreachable_listing_fails_open():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    client = DynatraceClient("dev", base_url=f"http://127.0.0.1:{port}", verbose=False)
+    assert client.existing_symbol_files("token", [symbol_file_key("a", "b", "ios", "1", "1")]) == {}
+
+
+def test_rejected_token_raises():
+    with FakeDynatrace(api_token="right") as dynatrace:
+        client = DynatraceClient("dev", base_url=dynatrace.url, verbose=False)
+        with pytest.raises(TokenError):
+            client.existing_symbol_files("wrong", [symbol_file_key("a", "b", "ios", "1", "1")])
+
+
+def test_mapping_with_the_listed_size_is_skipped(dynatrace, mapping):
+    dynatrace.add_symbol_file("app", "com.example", "ANDROID", "1", "1.0", size=len(MAPPING))
+    assert uploader(dynatrace).upload(mapping, "app", "com.example", "1", "1.0") is False
+    assert dynatrace.uploads == []
+
+
+def test_mapping_with_a_different_size_is_uploaded(dynatrace, mapping):
+    dynatrace.add_symbol_file("app", "com.example", "ANDROID", "1", "1.0", size=len(MAPPING) + 1)
+    assert uploader(dynatrace).upload(mapping, "app", "com.example", "1", "1.0") is True
+    assert [u["bytes"] for u in dynatrace.uploads] == [len(MAPPING)]
+
+
+def test_force_and_no_precheck_skip_the_listing(dynatrace, mapping):
+    dynatrace.add_symbol_file("app", "com.example", "ANDROID", "1", "1.0", size=len(MAPPING))
+    assert uploader(dynatrace, force=True).upload(mapping, "app", "com.example", "1", "1.0") is True
+    assert uploader(dynatrace, precheck=False).upload(mapping, "app", "com.example", "1", "1.0") is True
+    assert dynatrace.counts["lists"] == 0
+
+
+def test_fastlane_batch_skips_listed_dsyms(tmp_path, dynatrace):
+    fastlane = load_script("py-fastlane.py")
+    stub = tmp_path / "fastlane"
+    stub.write_text("#!/bin/sh\nexit 1\n")  # reaching fastlane at all would fail the jobs
+    stub.chmod(stub.stat().st_mode | stat.S_IEXEC)
+    dynatrace.add_symbol_file("app", "com.example", "IOS", "1", "1.0")
+    dynatrace.add_symbol_file("app", "com.example", "IOS", "2", "1.0")
+
+    jobs = []
+    for code in ("1", "2"):
+        path = tmp_path / f"{code}.zip"
+        path.write_bytes(code.encode())
+        jobs.append(fastlane.SymbolJob("app", "token", "./DTXDssClient", str(path), "com.example", "1.0", code,
+                                       server_url=dynatrace.url))
+    report = fastlane.DynatraceFastlaneUploader(fastlane_path=str(stub)).process_symbols_batch(jobs, dedupe=False)
+
+    assert [r["status"] for r in report] == ["exists", "exists"]
+    assert dynatrace.counts["lists"] == 1
+
+
+@pytest.mark.parametrize("argv, precheck", [([], True), (["--no-precheck"], False)])
+def test_release_passes_no_precheck_to_the_flow(monkeypatch, tmp_path, argv, precheck):
+    import post_release
+    import release_flow
+
+    seen = {}
+
+    def run(self, *args):
+        seen["precheck"] = self.precheck
+
+    monkeypatch.setattr(release_flow.ReleaseFlow, "run", run)
+    post_release.main(["release", "--nexus-url", "http://nexus.invalid", "--group-id", "com.example",
+                       "--artifact-id", "app", "--version", "1.0", "--platform", "android", "--env", "dev",
+                       "--token", "token", "--ledger", str(tmp_path / "ledger.json")] + argv)
+    assert seen["precheck"] is precheck
@@ -0,0 +1,79 @@
+import json
+
+import pytest
+
+from fake_nexus import FakeNexus
+from nexus_ops import NexusOperations
+from reconcile import MetadataIndex, find_gaps, uploaded_from_dynatrace
+
+REPOSITORY = "maven-releases"
+GROUP = "com.example"
+
+
+@pytest.fixture
+def nexus():
+    with FakeNexus() as server:
+        yield server
+
+
+def publish(nexus, version, metadata):
+    data = metadata if isinstance(metadata, bytes) else json.dumps(metadata).encode("utf-8")
+    nexus.add_artifact(REPOSITORY, GROUP, "app", version, f"app-{version}.json", data=data)
+
+
+def metadata(application_id, version_code, os_name=None):
+    dynatrace = {"applicationId": application_id}
+    if os_name:
+        dynatrace["as"] = os_name
+    return {"dynatrace": dynatrace, "versionCode": version_code}
+
+
+def collect(nexus, index_path):
+    index = MetadataIndex(NexusOperations(nexus.url, verbose=False), str(index_path), max_workers=2, verbose=False)
+    return index, index.collect(REPOSITORY, GROUP)
+
+
+def coordinates(version):
+    return [{"group_id": GROUP, "artifact_id": "app", "version_id": version, "path": f"com/example/app/{version}"}]
+
+
+def test_gaps_are_releases_without_an_upload():
+    expected = {("app", "1", "ANDROID"): coordinates("1.0"), ("app", "2", "IOS"): coordinates("2.0"),
+                ("app", "2", "ANDROID"): coordinates("2.0")}
+    gaps = find_gaps(expected, {("app", "1", "ANDROID"), ("app", "2", "ANDROID")})
+
+    assert [(g["version_code"], g["platform"]) for g in gaps] == [("2", "ios")]
+    assert gaps[0]["other_platform_uploaded"]
+    assert gaps[0]["version_id"] == "2.0"
+
+
+def test_uploads_without_a_platform_match_any_platform():
+    expected = {("app", "1", "ANDROID"): coordinates("1.0"), ("app", "1", "IOS"): coordinates("1.0"),
+                ("app", "2", "IOS"): coordinates("2.0")}
+    gaps = find_gaps(expected, {("app", "1", None)})
+
+    assert [(g["version_code"], g["platform"], g["other_platform_uploaded"]) for g in gaps] == [("2", "ios", False)]
+
+
+def test_index_keys_metadata_and_reuses_it_on_the_next_run(nexus, tmp_path):
+    publish(nexus, "1.0", metadata("app", 1))
+    publish(nexus, "2.0", metadata("app", 2, "ios"))
+    publish(nexus, "3.0", b"not json")
+
+    index, expected = collect(nexus, tmp_path / "index.json")
+    assert sorted(expected) == [("app", "1", "ANDROID"), ("app", "2", "IOS")]
+    assert expected[("app", "2", "IOS")][0]["version_id"] == "2.0"
+    assert (index.downloaded, index.reused) == (3, 0)
+
+    publish(nexus, "4.0", metadata("app", 4))
+    index, expected = collect(nexus, tmp_path / "index.json")
+    assert ("app", "4", "ANDROID") in expected and len(expected) == 3
+    assert (index.downloaded, index.reused) == (1, 3)
+
+
+def test_incomplete_dynatrace_entries_are_skipped(dynatrace):
+    dynatrace.add_symbol_file("app", "com.example", "android", "1", "1.0")
+    dynatrace.add_symbol_file("app", "com.example", "ios", None, "1.0")
+    dynatrace.add_symbol_file(None, "com.example", "ios", "2", "2.0")
+
+    assert uploaded_from_dynatrace("dev", "token", base_url=dynatrace.url) == {("app", "1", "ANDROID")}
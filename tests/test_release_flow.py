@@ -0,0 +1,41 @@
+import gaixie
+from release_flow import ReleaseFlow
+from stage_runner import StageRunner
+
+CLIENT_STAGES = ("install_client", "select_xcode", "link_lldb")
+
+
+def run_client_stages(tmp_path, monkeypatch, xcode: str, calls: list):
+    """One warm run of the iOS client branch, as a new process would (fresh flow, shared stage cache)"""
+    xcode = str(tmp_path / xcode)
+    (tmp_path / xcode).mkdir(parents=True, exist_ok=True)
+    plist = tmp_path / "Info.plist"
+    plist.write_text("<plist/>")
+    link = tmp_path / "LLDB.framework"
+
+    def link_lldb(self, developer_dir):
+        calls.append(("link_lldb", developer_dir))
+        if link.is_symlink():
+            link.unlink()
+        link.symlink_to(developer_dir)
+        return link
+
+    monkeypatch.setattr(gaixie.DynatraceSymbolManager, "download_client", lambda self: calls.append("install") or plist)
+    monkeypatch.setattr(gaixie.DynatraceSymbolManager, "select_xcode", lambda self: calls.append("select") or xcode)
+    monkeypatch.setattr(gaixie.DynatraceSymbolManager, "link_lldb", link_lldb)
+
+    flow = ReleaseFlow("http://nexus", "dev", "token", client_version="8.287.2.1009")
+    stages = [s for s in flow.build_stages("ios") if s.name in CLIENT_STAGES]
+    runner = StageRunner(stages, cache_path=str(tmp_path / "stage-cache.json"), verbose=False)
+    return runner.run(client_version="8.287.2.1009")
+
+
+def test_xcode_upgrade_is_picked_up_on_a_warm_run(tmp_path, monkeypatch):
+    calls = []
+    first = run_client_stages(tmp_path, monkeypatch, "Xcode-15.app/Contents/Developer", calls)
+    second = run_client_stages(tmp_path, monkeypatch, "Xcode-16.app/Contents/Developer", calls)
+
+    assert first["developer_dir"] == str(tmp_path / "Xcode-15.app/Contents/Developer")
+    assert second["developer_dir"] == str(tmp_path / "Xcode-16.app/Contents/Developer")
+    assert calls.count("install") == 1  # the client install still comes from the cache
+    assert calls[-1] == ("link_lldb", str(tmp_path / "Xcode-16.app/Contents/Developer"))
@@ -0,0 +1,37 @@
+import json
+
+from stage_runner import Stage, StageRunner
+
+
+def test_save_keeps_entries_written_by_another_runner(tmp_path):
+    cache_path = tmp_path / "stage-cache.json"
+    cache_path.write_text(json.dumps({"other": {"value": "old"}}))
+
+    def compute(x):
+        # another process updates its entry while this run is in progress
+        cache_path.write_text(json.dumps({"other": {"value": "new"}}))
+        return x * 2
+
+    runner = StageRunner([Stage("double", compute, inputs=["x"], outputs=["y"])],
+                         cache_path=str(cache_path), verbose=False)
+    assert runner.run(x=2)["y"] == 4
+
+    cache = json.loads(cache_path.read_text())
+    assert cache["other"] == {"value": "new"}
+    assert {"y": 4} in cache.values()
+
+
+def test_cached_outputs_are_reused(tmp_path):
+    calls = []
+
+    def compute(x):
+        calls.append(x)
+        return x * 2
+
+    def runner():
+        return StageRunner([Stage("double", compute, inputs=["x"], outputs=["y"])],
+                           cache_path=str(tmp_path / "stage-cache.json"), verbose=False)
+
+    assert runner().run(x=3)["y"] == 6
+    assert runner().run(x=3)["y"] == 6
+    assert calls == [3]
@@ -0,0 +1,50 @@
+import subprocess
+import sys
+import time
+
+import pytest
+
+from stream_run import MAX_LINE_BYTES, run_streaming
+
+
+def python(code):
+    return [sys.executable, "-c", code]
+
+
+def test_output_without_newlines_is_read_in_bounded_pieces():
+    size = MAX_LINE_BYTES * 3 + 10
+    result = run_streaming(python(f"import sys; sys.stdout.write('x' * {size})"), echo=False)
+    assert result.returncode == 0
+    assert max(len(line) for line in result.tail_lines) <= MAX_LINE_BYTES
+    assert len(result.tail) == size
+
+
+def test_fast_exit_is_not_delayed():
+    started = time.monotonic()
+    result = run_streaming(python("print('done')"), echo=False, timeout=30)
+    assert result.tail == "done\n"
+    assert not result.timed_out
+    assert time.monotonic() - started < 5
+
+
+def test_timeout_terminates_the_process_group():
+    started = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        run_streaming(python("import time; time.sleep(30)"), echo=False, timeout=0.5)
+    assert time.monotonic() - started < 5
+
+
+def test_sigterm_ignored_is_followed_by_sigkill():
+    code = "import signal, time; signal.signal(signal.SIGTERM, signal.SIG_IGN); print('ready', flush=True); time.sleep(30)"
+    started = time.monotonic()
+    result = run_streaming(python(code), echo=False, timeout=0.5, kill_grace=0.5, check=False)
+    assert result.timed_out
+    assert result.returncode == -9
+    assert time.monotonic() - started < 5
+
+
+def test_exit_status_is_the_returncode():
+    result = run_streaming(python("import sys; sys.exit(3)"), echo=False, check=False)
+    assert result.returncode == 3
+    with pytest.raises(subprocess.CalledProcessError):
+        run_streaming(python("import sys; sys.exit(3)"), echo=False)
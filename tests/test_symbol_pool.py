@@ -0,0 +1,117 @@
+import os
+import stat
+import textwrap
+import threading
+import time
+
+from concurrency import AdaptiveLimiter
+from script_loader import load_script
+from symbol_pool import PoolJob, SymbolJobPool
+
+
+def stub(tmp_path, name: str, body: str) -> str:
+    path = tmp_path / name
+    path.write_text("#!/bin/sh\n" + textwrap.dedent(body))
+    path.chmod(path.stat().st_mode | stat.S_IEXEC)
+    return str(path)
+
+
+def throttled_once(tmp_path) -> str:
+    """Fails with a Dynatrace 429 on its first run (per job id), succeeds afterwards"""
+    return stub(tmp_path, "dtx", f"""
+        marker="{tmp_path}/ran-$1"
+        if [ ! -e "$marker" ]; then
+            touch "$marker"
+            echo "Upload failed: HTTP 429 Too Many Requests, Retry-After: 0"
+            exit 1
+        fi
+        echo "uploaded $1"
+    """)
+
+
+def test_jobs_get_their_own_work_dir_and_developer_dir(tmp_path):
+    script = stub(tmp_path, "env", 'echo "dir=$DEVELOPER_DIR tmp=$TMPDIR cwd=$(pwd)"\n')
+    pool = SymbolJobPool(max_workers=2, verbose=False)
+    results = pool.run([PoolJob([script], developer_dir=f"/Xcode{i}.app", job_id=f"job{i}") for i in range(2)])
+    assert all(r.ok for r in results)
+    for i, result in enumerate(results):
+        line = result.tail.strip().splitlines()[-1]
+        assert f"dir=/Xcode{i}.app" in line
+        tmp = line.split("tmp=")[1].split(" ")[0]
+        assert f"dt-job-job{i}-" in tmp and line.endswith(f"cwd={os.path.realpath(tmp)}")
+
+
+def test_throttled_job_backs_off_and_retries(tmp_path):
+    script = throttled_once(tmp_path)
+    limiter = AdaptiveLimiter(initial=4, base_backoff=0.01)
+    pool = SymbolJobPool(max_workers=4, verbose=False, limiter=limiter, max_attempts=3)
+    results = pool.run([PoolJob([script, f"job{i}"], job_id=f"job{i}") for i in range(3)])
+    assert [r.ok for r in results] == [True, True, True]
+    assert limiter.metrics()["throttled_total"] >= 1
+
+
+def test_throttled_job_reports_failure_after_last_attempt(tmp_path):
+    script = stub(tmp_path, "dtx", 'echo "429 Too Many Requests"; exit 1\n')
+    limiter = AdaptiveLimiter(base_backoff=0.01)
+    result, = SymbolJobPool(verbose=False, limiter=limiter, max_attempts=2).run([PoolJob([script])])
+    assert not result.ok and "429" in result.tail
+    assert limiter.metrics()["throttled_total"] == 2
+
+
+def test_limiter_caps_concurrent_jobs(tmp_path):
+    # each job records the number of jobs running alongside it
+    script = stub(tmp_path, "slow", f"""
+        touch "{tmp_path}/running-$$"
+        ls "{tmp_path}" | grep -c running- >> "{tmp_path}/seen"
+        sleep 0.2
+        rm "{tmp_path}/running-$$"
+    """)
+    limiter = AdaptiveLimiter(initial=2, max_limit=2)
+    results = SymbolJobPool(max_workers=6, verbose=False, limiter=limiter).run([PoolJob([script]) for _ in range(6)])
+    assert all(r.ok for r in results)
+    assert max(int(n) for n in (tmp_path / "seen").read_text().split()) <= 2
+
+
+def test_parallel_upload_retries_429(tmp_path):
+    fastlane = load_script("py-fastlane.py")
+    script = stub(tmp_path, "fastlane", f"""
+        marker="{tmp_path}/ran"
+        if [ ! -e "$marker" ]; then touch "$marker"; echo "429 Too Many Requests"; exit 1; fi
+        echo ok
+    """)
+    dsym = tmp_path / "App.app.dSYM"
+    dsym.mkdir()
+    limiter = AdaptiveLimiter(base_backoff=0.01)
+    uploader = fastlane.DynatraceFastlaneUploader(fastlane_path=script, project_dir=str(tmp_path), limiter=limiter)
+    job = fastlane.SymbolJob("app", "token", "./DTXDssClient", str(dsym), "com.example", "1.0", "1")
+    result, = uploader.process_symbols_parallel([job], dedupe=False, precheck=False)
+    assert result["status"] == "ok"
+    assert limiter.metrics()["throttled_total"] == 1
+
+
+def test_logged_command_hides_the_api_token(tmp_path, capsys):
+    script = stub(tmp_path, "fastlane", "exit 0\n")
+    SymbolJobPool().run([PoolJob([script, "run", "dynatrace_process_symbols", "apitoken:dt0c01.SECRET", "appId:app"])])
+    out = capsys.readouterr().out
+    assert "SECRET" not in out
+    assert "apitoken:***" in out and "appId:app" in out
+
+
+def test_jobs_waiting_for_memory_do_not_hold_limiter_slots(tmp_path):
+    script = stub(tmp_path, "slow", "sleep 0.3\n")
+    limiter = AdaptiveLimiter(initial=4, max_limit=4, name="memory-first")
+    pool = SymbolJobPool(max_workers=4, memory_budget_mb=1024, per_job_memory_mb=1024, verbose=False,
+                         limiter=limiter)
+    seen = []
+
+    def watch():
+        for _ in range(30):
+            seen.append(limiter.metrics()["in_flight"])
+            time.sleep(0.02)
+
+    watcher = threading.Thread(target=watch)
+    watcher.start()
+    results = pool.run([PoolJob([script]) for _ in range(3)])
+    watcher.join()
+    assert all(r.ok for r in results)
+    assert max(seen) == 1  # only the job holding the memory has a slot
@@ -0,0 +1,103 @@
+import stat
+import subprocess
+import sys
+import textwrap
+
+import pytest
+
+from script_loader import load_script
+from upload_ledger import UploadLedger
+
+# Stands in for `fastlane run dynatrace_process_symbols ...`; exits with $STUB_FASTLANE_EXIT
+STUB = textwrap.dedent("""\
+    #!{python}
+    import os, sys
+    with open(os.environ["STUB_FASTLANE_LOG"], "a") as f:
+        f.write(sys.argv[2] + "\\n")
+    sys.exit(int(os.environ.get("STUB_FASTLANE_EXIT", "0")))
+""")
+
+
+@pytest.fixture
+def ledger(tmp_path):
+    return UploadLedger(str(tmp_path / "ledger.json"), verbose=False)
+
+
+@pytest.fixture
+def symbol_file(tmp_path):
+    path = tmp_path / "app.dSYM.zip"
+    path.write_bytes(b"not really a zip")
+    return str(path)
+
+
+def test_failure_does_not_overwrite_an_upload(ledger, symbol_file):
+    ledger.record("prod", "app", "100", symbol_file, success=True)
+    ledger.record("prod", "app", "100", symbol_file, success=False, detail="connection reset")
+
+    (entry,) = ledger.entries().values()
+    assert entry["status"] == "uploaded"
+    assert entry["last_failure"]["detail"] == "connection reset"
+    assert ledger.should_skip("prod", "app", "100", symbol_file)
+    assert ledger.summary()["failed_files"] == 1
+
+
+def test_failure_is_recorded_without_a_previous_upload(ledger, symbol_file):
+    ledger.record("prod", "app", "100", symbol_file, success=False, detail="boom")
+    (entry,) = ledger.entries().values()
+    assert entry["status"] == "failed"
+    assert not ledger.should_skip("prod", "app", "100", symbol_file)
+
+
+@pytest.fixture
+def uploader(tmp_path, ledger, monkeypatch):
+    monkeypatch.setenv("STUB_FASTLANE_LOG", str(tmp_path / "invocations"))
+    stub = tmp_path / "fastlane"
+    stub.write_text(STUB.format(python=sys.executable))
+    stub.chmod(stub.stat().st_mode | stat.S_IEXEC)
+    fastlane = load_script("py-fastlane.py")
+    return fastlane.DynatraceFastlaneUploader(fastlane_path=str(stub), project_dir=str(tmp_path), max_attempts=1,
+                                              ledger=ledger)
+
+
+def process(uploader, symbol_file):
+    return uploader.process_symbols("app", "token", "./DTXDssClient", symbol_file, "com.example", "1.0", "100",
+                                    debug_mode=False, environment="prod")
+
+
+def test_fastlane_upload_is_skipped_once_in_the_ledger(tmp_path, uploader, ledger, symbol_file):
+    assert process(uploader, symbol_file) is not None
+    assert process(uploader, symbol_file) is None
+    assert (tmp_path / "invocations").read_text().splitlines() == ["dynatrace_process_symbols"]
+    assert ledger.summary()["uploaded_files"] == 1
+    assert ledger.summary()["skipped_files"] == 1
+
+
+def test_fastlane_failure_is_recorded(tmp_path, uploader, ledger, symbol_file, monkeypatch):
+    monkeypatch.setenv("STUB_FASTLANE_EXIT", "1")
+    with pytest.raises(subprocess.CalledProcessError):
+        process(uploader, symbol_file)
+    (entry,) = ledger.entries().values()
+    assert entry["status"] == "failed"
+    assert ledger.summary()["failed_files"] == 1
+
+
+def test_a_dsym_bundle_is_hashed_with_its_contents(ledger, tmp_path):
+    bundle = tmp_path / "app.dSYM"
+    dwarf = bundle / "Contents" / "Resources" / "DWARF" / "app"
+    dwarf.parent.mkdir(parents=True)
+    dwarf.write_bytes(b"dwarf")
+    ledger.record("prod", "app", "100", str(bundle), success=True)
+    assert ledger.should_skip("prod", "app", "100", str(bundle))
+
+    dwarf.write_bytes(b"rebuilt dwarf")
+    assert not ledger.should_skip("prod", "app", "100", str(bundle))
+
+
+def test_parallel_uploads_are_skipped_once_in_the_ledger(tmp_path, uploader, ledger, symbol_file):
+    fastlane = load_script("py-fastlane.py")
+    jobs = [fastlane.SymbolJob("app", "token", "./DTXDssClient", symbol_file, "com.example", "1.0", "100")]
+    first = uploader.process_symbols_parallel(jobs, max_workers=1, dedupe=False, precheck=False, environment="prod")
+    second = uploader.process_symbols_parallel(jobs, max_workers=1, dedupe=False, precheck=False, environment="prod")
+    assert [r["status"] for r in first + second] == ["ok", "skipped"]
+    assert (tmp_path / "invocations").read_text().splitlines() == ["dynatrace_process_symbols"]
+    assert ledger.summary()["uploaded_files"] == 1
@@ -0,0 +1,174 @@
+import atexit
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+TRACE_ENV = "POST_RELEASE_TRACE"
+STEP_SUMMARY_ENV = "GITHUB_STEP_SUMMARY"
+
+
+class Tracer:
+    """
+    Lightweight span recorder.
+
+    Spans are kept in memory and written as a Chrome trace (chrome://tracing,
+    Perfetto) and/or a markdown timing table for $GITHUB_STEP_SUMMARY.
+    """
+
+    def __init__(self):
+        self.spans: List[Dict[str, Any]] = []
+        self._lock = threading.Lock()
+        self._origin = time.perf_counter()
+        self._wall_origin = time.time()
+
+    def _now_us(self) -> float:
+        return (time.perf_counter() - self._origin) * 1e6
+
+    @contextmanager
+    def span(self, name: str, category: str = "post-release", **args: Any):
+        """Record the duration of the enclosed block"""
+        start = self._now_us()
+        error = None
+        try:
+            yield
+        except BaseException as e:
+            error = type(e).__name__
+            raise
+        finally:
+            end = self._now_us()
+            event = {
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": round(start, 1),
+                "dur": round(end - start, 1),
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": {k: str(v) for k, v in args.items()},
+            }
+            if error:
+                event["args"]["error"] = error
+            with self._lock:
+                self.spans.append(event)
+
+    # ----------------------------
+    # Output
+    # ----------------------------
+
+    def chrome_trace(self) -> Dict[str, Any]:
+        with self._lock:
+            events = sorted(self.spans, key=lambda e: e["ts"])
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {"start_time": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime(self._wall_origin))},
+        }
+
+    def write_chrome_trace(self, path: str) -> str:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.chrome_trace(), f)
+        return path
+
+    def summary_rows(self) -> List[Dict[str, Any]]:
+        """Per span name: calls, total and max seconds, in order of first start"""
+        with self._lock:
+            events = sorted(self.spans, key=lambda e: e["ts"])
+        rows: Dict[str, Dict[str, Any]] = {}
+        for e in events:
+            row = rows.setdefault(e["name"], {"name": e["name"], "calls": 0, "total": 0.0, "max": 0.0, "errors": 0})
+            seconds = e["dur"] / 1e6
+            row["calls"] += 1
+            row["total"] += seconds
+            row["max"] = max(row["max"], seconds)
+            row["errors"] += 1 if "error" in e["args"] else 0
+        return list(rows.values())
+
+    def markdown_table(self, title: str = "Post-release timing") -> str:
+        with self._lock:
+            if not self.spans:
+                return ""
+            wall = (max(e["ts"] + e["dur"] for e in self.spans) - min(e["ts"] for e in self.spans)) / 1e6
+        lines = [
+            f"### ⏱️ {title}",
+            "",
+            "| Stage | Calls | Total (s) | Max (s) | % of wall | Errors |",
+            "|---|---:|---:|---:|---:|---:|",
+        ]
+        for row in self.summary_rows():
+            share = row["total"] / wall * 100 if wall else 0.0
+            lines.append(f"| `{row['name']}` | {row['calls']} | {row['total']:.2f} | {row['max']:.2f} "
+                         f"| {share:.0f}% | {row['errors']} |")
+        lines.append("")
+        lines.append(f"Wall time: **{wall:.2f}s**. Nested spans overlap, so percentages can add up to more than 100%.")
+        return "\n".join(lines) + "\n"
+
+    def write_step_summary(self, path: Optional[str] = None) -> Optional[str]:
+        """Append the timing table to $GITHUB_STEP_SUMMARY (no-op outside GitHub Actions)"""
+        path = path or os.environ.get(STEP_SUMMARY_ENV)
+        table = self.markdown_table()
+        if not path or not table:
+            return None
+        with open(path, "a", encoding="utf-8") as f:
+            f.write(table)
+        return path
+
+
+_tracer = Tracer()
+
+
+def get_tracer() -> Tracer:
+    return _tracer
+
+
+def span(name: str, **args: Any):
+    """Context manager recording a span on the process-wide tracer"""
+    return _tracer.span(name, **args)
+
+
+def traced(name: Optional[str] = None, fields: Iterable[str] = ()) -> Callable:
+    """
+    Decorator recording a span per call.
+
+    Args:
+        name: Span name (defaults to the function's qualified name)
+        fields: Argument names whose values are attached to the span
+    """
+    fields = tuple(fields)
+
+    def decorator(func: Callable) -> Callable:
+        span_name = name or func.__qualname__
+        signature = inspect.signature(func) if fields else None
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            span_args = {}
+            if signature:
+                try:
+                    bound = signature.bind_partial(*args, **kwargs).arguments
+                    span_args = {f: bound[f] for f in fields if f in bound}
+                except TypeError:
+                    pass
+            with _tracer.span(span_name, **span_args):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _flush_at_exit():
+    if not _tracer.spans:
+        return
+    trace_path = os.environ.get(TRACE_ENV)
+    if trace_path:
+        _tracer.write_chrome_trace(trace_path)
+        print(f"📝 Trace written to {trace_path}")
+    _tracer.write_step_summary()
+
+
+atexit.register(_flush_at_exit)
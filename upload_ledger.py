@@ -0,0 +1,205 @@
+import fcntl
+import hashlib
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from metrics import CACHE_LOOKUPS
+
+
+class UploadLedger:
+    """
+    Local record of symbol/mapping uploads, keyed by
+    (environment, applicationId, versionCode, content hash).
+
+    Reruns of the post-release workflow consult the ledger before uploading
+    and skip files that were already uploaded successfully.
+    """
+
+    def __init__(self, path: str = ".upload-ledger.json", verbose: bool = True):
+        self.path = Path(path).resolve()
+        self.lock_path = self.path.with_name(self.path.name + ".lock")
+        self.verbose = verbose
+        self.skipped_files = 0
+        self.skipped_bytes = 0
+        self.uploaded_files = 0
+        self.uploaded_bytes = 0
+        self.failed_files = 0
+        self._lock = threading.Lock()
+
+    # ----------------------------
+    # Helper methods
+    # ----------------------------
+
+    def _log(self, message: str):
+        if self.verbose:
+            print(message)
+
+    @staticmethod
+    def _files(path: str):
+        """The file itself, or every file of a directory (.dSYM bundle) in a stable order"""
+        if not os.path.isdir(path):
+            return [path]
+        return sorted(os.path.join(root, name) for root, _, names in os.walk(path) for name in names)
+
+    @classmethod
+    def file_digest(cls, file_path: str, chunk_size: int = 1024 * 1024) -> str:
+        """Return the sha256 hex digest of a file (or a bundle's names and contents), read in chunks"""
+        digest = hashlib.sha256()
+        for path in cls._files(file_path):
+            if path != file_path:
+                digest.update(os.path.relpath(path, file_path).encode("utf-8") + b"\0")
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(chunk_size), b""):
+                    digest.update(chunk)
+        return digest.hexdigest()
+
+    @classmethod
+    def file_size(cls, file_path: str) -> int:
+        return sum(os.path.getsize(path) for path in cls._files(file_path))
+
+    @staticmethod
+    def make_key(environment: str, application_id: str, version_code: str, digest: str) -> str:
+        return f"{environment}|{application_id}|{version_code}|{digest}"
+
+    @contextmanager
+    def _locked(self):
+        """Serialize ledger updates across processes"""
+        self.lock_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.lock_path, "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _load(self) -> Dict[str, Any]:
+        if not self.path.exists():
+            return {}
+        try:
+            with self.path.open("r", encoding="utf-8") as f:
+                return json.load(f).get("entries", {})
+        except (json.JSONDecodeError, OSError) as e:
+            self._log(f"⚠️ Ignoring unreadable upload ledger {self.path}: {e}")
+            return {}
+
+    def _save(self, entries: Dict[str, Any]):
+        """Write the ledger via a temp file + rename so readers never see a partial file"""
+        fd, tmp_path = tempfile.mkstemp(prefix=self.path.name, dir=self.path.parent)
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"entries": entries}, f, indent=2, sort_keys=True)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            Path(tmp_path).unlink(missing_ok=True)
+            raise
+
+    # ----------------------------
+    # Public functions
+    # ----------------------------
+
+    def entries(self) -> Dict[str, Any]:
+        """Every recorded upload, by ledger key"""
+        return self._load()
+
+    def lookup(self, environment: str, application_id: str, version_code: str, digest: str) -> Optional[Dict[str, Any]]:
+        """Return the recorded entry for this upload key, if any"""
+        return self._load().get(self.make_key(environment, application_id, version_code, digest))
+
+    def should_skip(self, environment: str, application_id: str, version_code: str,
+                    file_path: str, force: bool = False, digest: Optional[str] = None) -> bool:
+        """
+        Check whether the file was already uploaded for this key.
+
+        Args:
+            environment: Dynatrace environment (dev, pat, prod)
+            application_id: Dynatrace application ID
+            version_code: App version code
+            file_path: Symbol or mapping file to upload
+            force: Ignore the ledger and always upload
+            digest: Precomputed sha256 of file_path
+
+        Returns:
+            bool: True if the upload can be skipped
+        """
+        if force:
+            return False
+
+        digest = digest or self.file_digest(file_path)
+        entry = self.lookup(environment, application_id, version_code, digest)
+        if not entry or entry.get("status") != "uploaded":
+            CACHE_LOOKUPS.inc(cache="upload_ledger", result="miss")
+            return False
+
+        CACHE_LOOKUPS.inc(cache="upload_ledger", result="hit")
+        size = self.file_size(file_path)
+        with self._lock:
+            self.skipped_files += 1
+            self.skipped_bytes += size
+        self._log(f"⏭️  Skipping {file_path}: already uploaded to {environment} for {application_id} ({version_code})")
+        return True
+
+    def record(self, environment: str, application_id: str, version_code: str,
+               file_path: str, success: bool, digest: Optional[str] = None, detail: str = "",
+               skipped: bool = False):
+        """
+        Record the outcome of an upload attempt (skipped: found already present, counted as skipped).
+
+        A failure never replaces an "uploaded" entry (e.g. a rerun that lost a race
+        or hit a transient error); it is kept under "last_failure" instead.
+        """
+        digest = digest or self.file_digest(file_path)
+        size = self.file_size(file_path)
+        key = self.make_key(environment, application_id, version_code, digest)
+        timestamp = time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime())
+
+        with self._locked():
+            entries = self._load()
+            previous = entries.get(key)
+            if not success and previous and previous.get("status") == "uploaded":
+                previous["last_failure"] = {"detail": detail, "timestamp": timestamp}
+            else:
+                entries[key] = {
+                    "status": "uploaded" if success else "failed",
+                    "file": str(Path(file_path).name),
+                    "bytes": size,
+                    "detail": detail,
+                    "timestamp": timestamp,
+                }
+            self._save(entries)
+
+        with self._lock:
+            if success and skipped:
+                self.skipped_files += 1
+                self.skipped_bytes += size
+            elif success:
+                self.uploaded_files += 1
+                self.uploaded_bytes += size
+            else:
+                self.failed_files += 1
+
+    def summary(self) -> Dict[str, int]:
+        """Counts for this run"""
+        with self._lock:
+            return {
+                "uploaded_files": self.uploaded_files,
+                "uploaded_bytes": self.uploaded_bytes,
+                "skipped_files": self.skipped_files,
+                "skipped_bytes": self.skipped_bytes,
+                "failed_files": self.failed_files,
+            }
+
+    def print_summary(self) -> None:
+        """Print the run summary"""
+        s = self.summary()
+        print("\n=== Upload Summary ===")
+        print(f"Uploaded: {s['uploaded_files']} file(s), {s['uploaded_bytes']} bytes")
+        print(f"Skipped (already uploaded): {s['skipped_files']} file(s), {s['skipped_bytes']} bytes")
+        print(f"Failed: {s['failed_files']} file(s)")